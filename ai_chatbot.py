@@ -10,6 +10,7 @@ from typing import Dict, Optional, Any
 import logging
 import os
 from dotenv import load_dotenv
+from config import COURT_HOURS
 
 load_dotenv()
 
@@ -45,14 +46,9 @@ class PadelReservationChatbot:
         # Se puede expandir fácilmente agregando más canchas aquí
         self.available_courts = ["MONEX", "GOCSA", "WOODWARD", "TEDS"]
         
-        # Horarios de operación (opcional - puedes configurar restricciones aquí)
+        # Horarios de operación (se configuran en config.COURT_HOURS)
         # Formato: {"cancha": {"inicio": "HH:MM", "fin": "HH:MM"}}
-        self.court_hours = {
-            "MONEX": {"inicio": "06:00", "fin": "23:00"},
-            "GOCSA": {"inicio": "06:00", "fin": "23:00"},
-            "WOODWARD": {"inicio": "06:00", "fin": "23:00"},
-            "TEDS": {"inicio": "06:00", "fin": "23:00"},
-        }
+        self.court_hours = COURT_HOURS
     
     def extract_reservation_info(self, message: str, context: Dict = None) -> Dict[str, Any]:
         """
@@ -0,0 +1,139 @@
+"""
+Cache en memoria de la disponibilidad del scraper (availability_store.py)
+Las canchas de cada fecha se leen de la base de datos una sola vez por proceso y
+se vuelven a leer solo cuando un scraping cambió algún horario de esa fecha.
+Junto a los horarios se guarda el bitmap de bloques ocupados de cada cancha
+(slot_bitmap.py), para responder reservas de más de una hora sin recorrer listas.
+Con el refresco en proceso activo (availability_refresh.py), una fecha vieja se sigue
+sirviendo mientras se pide su refresco en segundo plano
+"""
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import pytz
+from database import SessionLocal
+from availability_store import get_scrape_info, get_slots
+from availability_refresh import get_availability_refresher
+from slot_bitmap import DayBitmap
+from slot_records import DaySlots
+from config import TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHE_AGE_HOURS = 24  # Más viejo que esto no se sirve ni mientras se refresca
+# Duración de cada horario del scraper (playtomic_automation se queda con el de 60 minutos)
+SCRAPED_SLOT_MINUTES = 60
+
+
+def court_bitmaps(courts: DaySlots) -> Dict[str, DayBitmap]:
+    """
+    Bloques ocupados de cada cancha según sus horarios libres
+
+    Cada horario libre cubre SCRAPED_SLOT_MINUTES desde su inicio; el resto del
+    día se considera ocupado.
+    """
+    times_by_court: Dict[str, List[str]] = {}
+    for slot in courts:
+        times_by_court.setdefault(slot.name, []).append(slot.time)
+    return {
+        court_name: DayBitmap(~DayBitmap.from_start_times(times, SCRAPED_SLOT_MINUTES).bits)
+        for court_name, times in times_by_court.items()
+    }
+
+
+class AvailabilityCache:
+    """
+    Disponibilidad del scraper compartida por todos los threads del proceso
+
+    Cada consulta verifica con una búsqueda indexada el changed_at de la fecha; solo
+    si cambió se vuelven a leer sus horarios. Mientras tanto las consultas son
+    búsquedas en un diccionario. Nunca se espera un refresco: si la fecha está vieja
+    para su tramo se pide refrescarla y se responde con lo guardado. Al recargar una
+    fecha se descartan las fechas que ya pasaron.
+    """
+
+    def __init__(self, max_age_hours: float = MAX_CACHE_AGE_HOURS):
+        self.max_age_hours = max_age_hours
+        self._lock = threading.Lock()
+        # Fecha -> (changed_at, canchas, bloques ocupados por cancha)
+        self._entries: Dict[str, Tuple[datetime, DaySlots, Dict[str, DayBitmap]]] = {}
+
+    def get_courts(self, date_str: str, duration_minutes: int = SCRAPED_SLOT_MINUTES) -> Optional[DaySlots]:
+        """
+        Canchas disponibles de una fecha
+
+        Args:
+            date_str: Fecha en formato YYYY-MM-DD
+            duration_minutes: Duración de la reserva; con más de SCRAPED_SLOT_MINUTES
+                solo quedan los horarios con la cancha libre toda la duración
+
+        Returns:
+            DaySlots de la fecha (inmutable, compartido entre threads), o None si la fecha no
+            se scrapeó o el scraping está expirado
+        """
+        db = SessionLocal()
+        try:
+            refresher = get_availability_refresher()
+            scrape_info = get_scrape_info(db, date_str)
+            if scrape_info is None:
+                logger.debug(f"Fecha {date_str} sin scraping")
+                if refresher:
+                    refresher.request_refresh(date_str)
+                return None
+
+            scraped_at, changed_at = scrape_info
+            age_seconds = (datetime.utcnow() - scraped_at).total_seconds()
+            if refresher:
+                max_age = refresher.max_age_seconds(date_str)
+                if max_age is not None and age_seconds >= max_age:
+                    refresher.request_refresh(date_str)
+            if age_seconds / 3600 > self.max_age_hours:
+                logger.info(f"⚠️  Cache expirado para {date_str} (edad: {age_seconds / 3600:.1f} horas)")
+                return None
+
+            entry = self._entries.get(date_str)
+            if entry is None or entry[0] != changed_at:
+                with self._lock:
+                    entry = self._entries.get(date_str)
+                    if entry is None or entry[0] != changed_at:
+                        courts = get_slots(db, date_str)
+                        entry = (changed_at, courts, court_bitmaps(courts))
+                        self._evict_past_dates()
+                        self._entries[date_str] = entry
+                        logger.info(f"📂 Disponibilidad de {date_str} cargada ({len(courts)} horarios)")
+
+            _, courts, bitmaps = entry
+            if duration_minutes <= SCRAPED_SLOT_MINUTES:
+                return courts
+            return courts.filter(lambda slot: bitmaps[slot.name].is_free(
+                int(slot.time[:2]) * 60 + int(slot.time[3:]), duration_minutes
+            ))
+        except Exception as e:
+            logger.warning(f"⚠️  Error cargando cache: {e}")
+            return None
+        finally:
+            db.close()
+
+
+    def _evict_past_dates(self):
+        """Descartar las fechas anteriores a hoy (se llama con el lock tomado)"""
+        today = datetime.now(pytz.timezone(TIMEZONE)).strftime('%Y-%m-%d')
+        for date_str in [date_str for date_str in self._entries if date_str < today]:
+            del self._entries[date_str]
+
+
+# Instancia global del cache
+_availability_cache: Optional[AvailabilityCache] = None
+_availability_cache_lock = threading.Lock()
+
+
+def get_availability_cache() -> AvailabilityCache:
+    """Obtener el cache de disponibilidad compartido del proceso"""
+    global _availability_cache
+
+    if _availability_cache is None:
+        with _availability_cache_lock:
+            if _availability_cache is None:
+                _availability_cache = AvailabilityCache()
+    return _availability_cache
@@ -0,0 +1,232 @@
+"""
+Refresco en proceso de la disponibilidad del scraper (availability_store.py)
+Reemplaza la ejecución periódica externa (ejecutar_scraper_periodico.bat): hoy se
+refresca cada pocos minutos, los días cercanos con menos frecuencia y las fechas
+lejanas rara vez. Los lectores nunca esperan un refresco: el cache sigue sirviendo
+los horarios guardados y solo pide refrescar la fecha en segundo plano
+(stale-while-revalidate)
+"""
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional, Set, Tuple
+import pytz
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from database import SessionLocal
+from availability_store import get_scraped_at, purge_changes
+from playtomic_automation import get_playtomic_instance
+from scraper_playtomic import HostRateLimiter, scrape_day
+from config import (
+    TIMEZONE,
+    SCRAPER_MAX_DAYS,
+    SCRAPER_CONCURRENCY,
+    AVAILABILITY_REFRESH_TODAY_SECONDS,
+    AVAILABILITY_REFRESH_NEAR_DAYS,
+    AVAILABILITY_REFRESH_NEAR_SECONDS,
+    AVAILABILITY_REFRESH_FAR_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# Una fecha se refresca cuando su scraping tiene al menos esta fracción de la
+# frecuencia de su tramo (así un refresco pedido por un lector no se repite enseguida)
+STALE_FRACTION = 0.9
+
+
+def refresh_tiers() -> List[Tuple[str, range, int]]:
+    """
+    Tramos de fechas con su frecuencia de refresco
+
+    Returns:
+        Lista de (nombre, días desde hoy, segundos entre refrescos)
+    """
+    near_end = min(1 + AVAILABILITY_REFRESH_NEAR_DAYS, SCRAPER_MAX_DAYS)
+    return [
+        ("today", range(0, min(1, SCRAPER_MAX_DAYS)), AVAILABILITY_REFRESH_TODAY_SECONDS),
+        ("near", range(1, near_end), AVAILABILITY_REFRESH_NEAR_SECONDS),
+        ("far", range(near_end, SCRAPER_MAX_DAYS), AVAILABILITY_REFRESH_FAR_SECONDS),
+    ]
+
+
+class AvailabilityRefresher:
+    """
+    Refresca la disponibilidad por tramos con un AsyncIOScheduler
+
+    Cada tramo es un job periódico que solo vuelve a consultar las fechas cuyo
+    scraping ya está viejo para ese tramo. request_refresh() se puede llamar desde
+    cualquier thread: agenda el refresco de una fecha y vuelve de inmediato.
+    """
+
+    def __init__(self, playtomic=None):
+        """
+        Args:
+            playtomic: Instancia de PlaytomicAutomation (opcional, se crea al arrancar)
+        """
+        self.playtomic = playtomic
+        self.timezone = pytz.timezone(TIMEZONE)
+        self.scheduler = AsyncIOScheduler(timezone=TIMEZONE)
+        self._own_instance = playtomic is None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._rate_limiter: Optional[HostRateLimiter] = None
+        # Fechas con un refresco en curso o agendado
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _today(self) -> datetime:
+        return datetime.now(self.timezone).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+
+    def max_age_seconds(self, date_str: str) -> Optional[int]:
+        """
+        Segundos tras los cuales la disponibilidad de una fecha se considera vieja
+
+        Returns:
+            int: Frecuencia del tramo de la fecha, o None si está fuera del horizonte
+        """
+        try:
+            offset = (datetime.strptime(date_str, '%Y-%m-%d') - self._today()).days
+        except ValueError:
+            return None
+        for _, offsets, interval in refresh_tiers():
+            if offset in offsets:
+                return interval
+        return None
+
+    def request_refresh(self, date_str: str) -> bool:
+        """
+        Agendar el refresco de una fecha sin esperarlo
+
+        Returns:
+            bool: True si se agendó (False si ya estaba en curso o fuera del horizonte)
+        """
+        if not self.scheduler.running or self.max_age_seconds(date_str) is None:
+            return False
+        with self._lock:
+            if date_str in self._pending:
+                return False
+            self._pending.add(date_str)
+        try:
+            self.scheduler.add_job(self._refresh_requested, args=[date_str])
+        except Exception as e:
+            with self._lock:
+                self._pending.discard(date_str)
+            logger.warning(f"⚠️  No se pudo agendar el refresco de {date_str}: {e}")
+            return False
+        logger.info(f"🔄 Refresco de disponibilidad de {date_str} agendado")
+        return True
+
+    async def _refresh_requested(self, date_str: str):
+        with self._lock:
+            self._pending.discard(date_str)
+        await self.refresh_dates([datetime.strptime(date_str, '%Y-%m-%d')])
+
+    async def refresh_tier(self, name: str, offsets: range, interval: int):
+        """Refrescar las fechas viejas de un tramo"""
+        today = self._today()
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            dates = []
+            for offset in offsets:
+                date = today + timedelta(days=offset)
+                scraped_at = get_scraped_at(db, date.strftime('%Y-%m-%d'))
+                if scraped_at is None or (now - scraped_at).total_seconds() >= interval * STALE_FRACTION:
+                    dates.append(date)
+        finally:
+            db.close()
+
+        if dates:
+            logger.info(f"🔄 Refrescando disponibilidad ({name}): {len(dates)} fechas")
+            await self.refresh_dates(dates)
+
+    async def refresh_dates(self, dates: List[datetime]):
+        """Consultar Playtomic y guardar lo que cambió en los horarios de las fechas dadas"""
+        with self._lock:
+            dates = [date for date in dates if date.strftime('%Y-%m-%d') not in self._pending]
+            self._pending.update(date.strftime('%Y-%m-%d') for date in dates)
+        if not dates:
+            return
+
+        try:
+            await asyncio.gather(*[
+                scrape_day(self.playtomic, date, self._semaphore, self._rate_limiter)
+                for date in dates
+            ])
+        finally:
+            with self._lock:
+                self._pending.difference_update(date.strftime('%Y-%m-%d') for date in dates)
+
+    def purge_changes(self):
+        """Borrar los cambios de disponibilidad viejos"""
+        db = SessionLocal()
+        try:
+            deleted = purge_changes(db)
+            if deleted:
+                logger.info(f"🧹 {deleted} cambios de disponibilidad viejos borrados")
+        except Exception as e:
+            logger.error(f"❌ Error borrando cambios de disponibilidad: {e}")
+        finally:
+            db.close()
+
+    async def start(self):
+        """Arrancar los jobs de refresco (en el event loop actual)"""
+        if self.scheduler.running:
+            return
+        if self.playtomic is None:
+            self.playtomic = await get_playtomic_instance()
+        self._semaphore = asyncio.Semaphore(SCRAPER_CONCURRENCY)
+        self._rate_limiter = HostRateLimiter()
+
+        for name, offsets, interval in refresh_tiers():
+            if not offsets:
+                continue
+            self.scheduler.add_job(
+                self.refresh_tier,
+                trigger=IntervalTrigger(seconds=interval),
+                args=[name, offsets, interval],
+                id=f"availability_refresh_{name}",
+                max_instances=1,
+                coalesce=True,
+                next_run_time=datetime.now(self.timezone)
+            )
+        self.scheduler.add_job(
+            self.purge_changes,
+            trigger=IntervalTrigger(hours=1),
+            id="availability_changes_purge"
+        )
+        self.scheduler.start()
+        logger.info("✅ Refresco de disponibilidad iniciado")
+
+    async def stop(self):
+        """Detener los jobs de refresco"""
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+        if self._own_instance and self.playtomic:
+            await self.playtomic.close()
+            self.playtomic = None
+        logger.info("Refresco de disponibilidad detenido")
+
+
+# Instancia global del refresco
+_availability_refresher: Optional[AvailabilityRefresher] = None
+
+
+def get_availability_refresher() -> Optional[AvailabilityRefresher]:
+    """Obtener el refresco activo (None si está desactivado)"""
+    return _availability_refresher
+
+
+async def start_availability_refresher(playtomic=None) -> AvailabilityRefresher:
+    """
+    Crear y arrancar el refresco de disponibilidad
+
+    Returns:
+        AvailabilityRefresher: Refresco activo
+    """
+    global _availability_refresher
+
+    if _availability_refresher is None:
+        _availability_refresher = AvailabilityRefresher(playtomic)
+        await _availability_refresher.start()
+    return _availability_refresher
@@ -0,0 +1,234 @@
+"""
+Disponibilidad del scraper de Playtomic guardada en la base de datos
+Cada horario libre es una fila (fecha, hora, cancha, precio, scraped_at) indexada
+por fecha y hora. Cada scraping se compara con los horarios guardados y solo se
+escribe la diferencia, en una sola transacción por fecha, así que el bot (u otro
+proceso) nunca ve una fecha a medio escribir. Los horarios que se liberan u ocupan
+quedan en availability_changes y se publican a los suscriptores del proceso
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from sqlalchemy.orm import Session
+from database import AvailabilityScrape, AvailabilitySlot, AvailabilityChange
+from slot_records import DaySlots, Slot
+
+logger = logging.getLogger(__name__)
+
+# Textos que el scraper a veces captura como si fueran canchas
+INVALID_COURT_NAMES = {'Playtomic Logo', 'Logo', ''}
+
+# Tipos de cambio entre dos scrapings
+CHANGE_OPENED = 'opened'  # El horario se liberó
+CHANGE_TAKEN = 'taken'  # El horario se ocupó
+
+# Tiempo que se conservan los cambios en availability_changes
+CHANGE_RETENTION = timedelta(days=7)
+
+# Suscriptores en proceso del feed de cambios
+_subscribers: List[Callable[[List[Dict[str, Any]]], None]] = []
+_subscribers_lock = threading.Lock()
+
+
+def is_valid_court(court: Any) -> bool:
+    """Indica si una entrada de disponibilidad (Slot o dict) es una cancha real (descarta logos, etc.)"""
+    if isinstance(court, Slot):
+        name = court.name
+    elif isinstance(court, dict):
+        name = court.get('name')
+    else:
+        return False
+    if not isinstance(name, str):
+        return False
+    name = name.strip()
+    return name not in INVALID_COURT_NAMES and len(name) > 3
+
+
+def _publish_changes(changes: List[Dict[str, Any]]):
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        try:
+            callback(changes)
+        except Exception as e:
+            logger.error(f"❌ Error en suscriptor de cambios de disponibilidad: {e}")
+
+
+def subscribe_changes(callback: Callable[[List[Dict[str, Any]]], None]):
+    """
+    Recibir en este proceso los cambios de disponibilidad detectados
+
+    El callback se llama tras guardar cada fecha que cambió, en el thread del
+    scraper, con la lista de cambios ({'id', 'date', 'time', 'name', 'change',
+    'price', 'detected_at'}); no debe bloquear.
+    """
+    with _subscribers_lock:
+        if callback not in _subscribers:
+            _subscribers.append(callback)
+
+
+def unsubscribe_changes(callback: Callable[[List[Dict[str, Any]]], None]):
+    """Dejar de recibir cambios de disponibilidad"""
+    with _subscribers_lock:
+        if callback in _subscribers:
+            _subscribers.remove(callback)
+
+
+def _change_to_dict(change: AvailabilityChange) -> Dict[str, Any]:
+    return {
+        'id': change.id,
+        'date': change.date,
+        'time': change.time,
+        'name': change.court_name,
+        'change': change.change,
+        'price': change.price,
+        'detected_at': change.detected_at
+    }
+
+
+def update_date_slots(
+    db: Session,
+    date_str: str,
+    courts: Iterable[Union[Slot, Dict[str, Any]]],
+    scraped_at: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """
+    Guardar un nuevo scraping de una fecha, escribiendo solo lo que cambió
+
+    Compara las canchas con los horarios guardados: los horarios nuevos se
+    insertan (CHANGE_OPENED), los que ya no aparecen se borran (CHANGE_TAKEN) y
+    cada cambio queda en availability_changes y se publica a los suscriptores.
+    El primer scraping de una fecha solo guarda la línea base, sin cambios.
+    Todo ocurre en una sola transacción.
+
+    Args:
+        db: Sesión de base de datos
+        date_str: Fecha en formato YYYY-MM-DD
+        courts: Canchas devueltas por el scraper (DaySlots, Slot o dicts {'name', 'time', 'price'})
+        scraped_at: Momento del scraping (UTC, por defecto ahora)
+
+    Returns:
+        Lista de cambios detectados (vacía si la fecha no cambió)
+    """
+    scraped_at = scraped_at or datetime.utcnow()
+    if not isinstance(courts, DaySlots):
+        courts = DaySlots(date_str, courts)
+    new_prices = {(slot.time, slot.name): slot.price for slot in courts if is_valid_court(slot)}
+
+    try:
+        scrape = db.query(AvailabilityScrape).filter(AvailabilityScrape.date == date_str).first()
+        current = {
+            (slot.time, slot.court_name): slot
+            for slot in db.query(AvailabilitySlot).filter(AvailabilitySlot.date == date_str)
+        }
+
+        changes = []
+        for key in current.keys() - new_prices.keys():
+            db.delete(current[key])
+            changes.append(AvailabilityChange(
+                date=date_str, time=key[0], court_name=key[1], change=CHANGE_TAKEN,
+                price=current[key].price, detected_at=scraped_at
+            ))
+        for key in new_prices.keys() - current.keys():
+            db.add(AvailabilitySlot(
+                date=date_str, time=key[0], court_name=key[1], price=new_prices[key], scraped_at=scraped_at
+            ))
+            changes.append(AvailabilityChange(
+                date=date_str, time=key[0], court_name=key[1], change=CHANGE_OPENED,
+                price=new_prices[key], detected_at=scraped_at
+            ))
+        prices_changed = False
+        for key in new_prices.keys() & current.keys():
+            if current[key].price != new_prices[key]:
+                current[key].price = new_prices[key]
+                prices_changed = True
+
+        if not scrape:
+            # Línea base: no hay scraping anterior con qué comparar
+            scrape = AvailabilityScrape(date=date_str)
+            db.add(scrape)
+            changes = []
+        else:
+            changes.sort(key=lambda change: (change.time, change.court_name))
+            db.add_all(changes)
+        if changes or prices_changed or scrape.changed_at is None:
+            scrape.changed_at = scraped_at
+        scrape.scraped_at = scraped_at
+        scrape.slot_count = len(new_prices)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    changes = [_change_to_dict(change) for change in changes]
+    if changes:
+        logger.info(f"🔔 {date_str}: {len(changes)} horarios cambiaron")
+        _publish_changes(changes)
+    return changes
+
+
+def get_scraped_at(db: Session, date_str: str) -> Optional[datetime]:
+    """Momento (UTC) del último scraping de una fecha, None si nunca se scrapeó"""
+    scrape = db.query(AvailabilityScrape.scraped_at).filter(AvailabilityScrape.date == date_str).first()
+    return scrape[0] if scrape else None
+
+
+def get_scrape_info(db: Session, date_str: str) -> Optional[Tuple[datetime, datetime]]:
+    """
+    Último scraping de una fecha
+
+    Returns:
+        Tupla (scraped_at, changed_at) en UTC, o None si nunca se scrapeó. Los
+        horarios solo cambian cuando cambia changed_at
+    """
+    scrape = db.query(
+        AvailabilityScrape.scraped_at, AvailabilityScrape.changed_at
+    ).filter(AvailabilityScrape.date == date_str).first()
+    if not scrape:
+        return None
+    return scrape[0], scrape[1] or scrape[0]
+
+
+def get_slots(db: Session, date_str: str, time_slot: Optional[str] = None) -> DaySlots:
+    """
+    Horarios libres de una fecha (y opcionalmente de una hora)
+
+    Returns:
+        DaySlots ordenados por hora y cancha
+    """
+    query = db.query(
+        AvailabilitySlot.court_name, AvailabilitySlot.time, AvailabilitySlot.price
+    ).filter(AvailabilitySlot.date == date_str)
+    if time_slot:
+        query = query.filter(AvailabilitySlot.time == time_slot)
+
+    return DaySlots(date_str, (Slot(court_name, time, date_str, price) for court_name, time, price in query))
+
+
+def get_changes(db: Session, since_id: int = 0, date_str: Optional[str] = None, limit: int = 500) -> List[Dict[str, Any]]:
+    """
+    Cambios de disponibilidad guardados, en orden de detección
+
+    Args:
+        since_id: Devolver solo los cambios con id mayor (para leer el feed por partes)
+        date_str: Solo los cambios de esta fecha (opcional)
+        limit: Máximo de cambios a devolver
+    """
+    query = db.query(AvailabilityChange).filter(AvailabilityChange.id > since_id)
+    if date_str:
+        query = query.filter(AvailabilityChange.date == date_str)
+    return [_change_to_dict(change) for change in query.order_by(AvailabilityChange.id).limit(limit)]
+
+
+def purge_changes(db: Session, older_than: timedelta = CHANGE_RETENTION) -> int:
+    """Borrar los cambios detectados hace más de `older_than`"""
+    try:
+        deleted = db.query(AvailabilityChange).filter(
+            AvailabilityChange.detected_at < datetime.utcnow() - older_than
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    except Exception:
+        db.rollback()
+        raise
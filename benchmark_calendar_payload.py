@@ -0,0 +1,117 @@
+"""
+Benchmark del tamaño de las respuestas de Google Calendar con y sin proyección de campos
+Ejecuta las mismas consultas que el bot pidiendo el recurso completo y pidiendo solo
+los campos que usa (parámetro `fields`), y compara bytes (JSON y gzip) y latencia
+"""
+import asyncio
+import gzip
+import logging
+import time
+from datetime import datetime, timedelta
+from google_calendar_client import (
+    get_google_calendar_instance,
+    EVENT_LIST_FIELDS,
+    CALENDAR_LIST_FIELDS,
+    FREEBUSY_FIELDS
+)
+from config import COURT_CALENDAR_MAPPING, TIMEZONE
+import pytz
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Repeticiones por consulta para promediar la latencia
+REPETITIONS = 5
+
+
+def measure(request) -> dict:
+    """
+    Ejecutar una petición de la API varias veces y medir su respuesta
+
+    Se usa el transporte HTTP del servicio directamente para obtener el cuerpo
+    crudo; httplib2 lo descomprime, así que el tamaño gzip se estima comprimiendo.
+    """
+    elapsed = []
+    content = b''
+    for _ in range(REPETITIONS):
+        started = time.perf_counter()
+        response, content = request.http.request(
+            request.uri,
+            method=request.method,
+            body=request.body,
+            headers=request.headers
+        )
+        elapsed.append(time.perf_counter() - started)
+        if response.status >= 400:
+            raise RuntimeError(f"HTTP {response.status}: {content[:200]!r}")
+    return {
+        'json_bytes': len(content),
+        'gzip_bytes': len(gzip.compress(content)),
+        'ms': sorted(elapsed)[len(elapsed) // 2] * 1000,
+    }
+
+
+async def benchmark_calendar_payload():
+    """Comparar el tamaño de las respuestas completas contra las proyectadas"""
+    logger.info("=" * 60)
+    logger.info("📦 BENCHMARK DE PAYLOAD DE GOOGLE CALENDAR")
+    logger.info("=" * 60)
+
+    calendar_client = await get_google_calendar_instance()
+    service = calendar_client._get_service()
+
+    tz = pytz.timezone(TIMEZONE)
+    start_of_day = tz.localize(datetime.combine(datetime.now(tz).date(), datetime.min.time()))
+    end_of_range = start_of_day + timedelta(days=7)
+    calendar_ids = list(dict.fromkeys(COURT_CALENDAR_MAPPING.values()))
+
+    def events_list(fields=None):
+        kwargs = {'fields': fields} if fields else {}
+        return service.events().list(
+            calendarId=calendar_ids[0],
+            timeMin=start_of_day.isoformat(),
+            timeMax=end_of_range.isoformat(),
+            singleEvents=True,
+            orderBy='startTime',
+            **kwargs
+        )
+
+    def freebusy(fields=None):
+        kwargs = {'fields': fields} if fields else {}
+        return service.freebusy().query(body={
+            'timeMin': start_of_day.isoformat(),
+            'timeMax': end_of_range.isoformat(),
+            'timeZone': TIMEZONE,
+            'items': [{'id': calendar_id} for calendar_id in calendar_ids]
+        }, **kwargs)
+
+    def calendar_list(fields=None):
+        kwargs = {'fields': fields} if fields else {}
+        return service.calendarList().list(**kwargs)
+
+    cases = [
+        ("events.list (7 días)", events_list, EVENT_LIST_FIELDS),
+        ("freebusy.query (7 días)", freebusy, FREEBUSY_FIELDS),
+        ("calendarList.list", calendar_list, CALENDAR_LIST_FIELDS),
+    ]
+
+    logger.info(f"\n{'Consulta':<26}{'JSON':>18}{'gzip':>18}{'Latencia (ms)':>20}")
+    for name, build_request, fields in cases:
+        full = measure(build_request())
+        partial = measure(build_request(fields))
+        logger.info(
+            f"{name:<26}"
+            f"{full['json_bytes']:>8} → {partial['json_bytes']:<7}"
+            f"{full['gzip_bytes']:>8} → {partial['gzip_bytes']:<7}"
+            f"{full['ms']:>9.0f} → {partial['ms']:<8.0f}"
+        )
+
+    logger.info("\n✅ Benchmark completado")
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark_calendar_payload())
@@ -0,0 +1,149 @@
+"""
+Índice en memoria de intervalos ocupados por calendario y día
+Permite responder consultas de disponibilidad repetidas sin llamar a Google Calendar
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+Interval = Tuple[datetime, datetime]
+
+
+class _DayIntervals:
+    """Intervalos ocupados de un día, fusionados y ordenados para búsquedas con bisect"""
+
+    __slots__ = ('loaded_at', 'starts', 'ends')
+
+    def __init__(self, intervals: List[Interval], loaded_at: float):
+        self.loaded_at = loaded_at
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                # Fusionar intervalos solapados o contiguos
+                if end > self.ends[-1]:
+                    self.ends[-1] = end
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Interval]:
+        """Intervalos que se solapan con [start, end)"""
+        # Los intervalos no se solapan entre sí, así que los fines también están ordenados
+        first = bisect_right(self.ends, start)
+        last = bisect_left(self.starts, end)
+        return list(zip(self.starts[first:last], self.ends[first:last]))
+
+
+class BusyIntervalIndex:
+    """
+    Índice de intervalos ocupados por calendario y día con expiración (TTL)
+
+    Se indexa por calendar_id (no por nombre de cancha) porque varias canchas
+    pueden compartir calendario: una escritura invalida a todas las que lo usan.
+
+    Cada calendario tiene una generación que invalidate() incrementa. Quien consulta
+    la API lee la generación antes de la consulta y la pasa a store_days(): si hubo
+    una escritura mientras tanto, el resultado (anterior a la escritura) no se guarda.
+    """
+
+    def __init__(self, ttl_seconds: float = 60):
+        self.ttl_seconds = ttl_seconds
+        self._days: Dict[Tuple[str, date], _DayIntervals] = {}
+        self._lock = threading.Lock()
+        # Generación por calendario y generación común (invalidate() sin calendario)
+        self._generations: Dict[str, int] = {}
+        self._base_generation = 0
+
+    def generation(self, calendar_id: str) -> int:
+        """Generación actual de un calendario (cambia con cada invalidación que lo afecta)"""
+        with self._lock:
+            return self._base_generation + self._generations.get(calendar_id, 0)
+
+    def _get_day(self, calendar_id: str, day: date) -> Optional[_DayIntervals]:
+        entry = self._days.get((calendar_id, day))
+        if entry is None:
+            return None
+        if time.monotonic() - entry.loaded_at > self.ttl_seconds:
+            with self._lock:
+                if self._days.get((calendar_id, day)) is entry:
+                    del self._days[(calendar_id, day)]
+            return None
+        return entry
+
+    def store_days(
+        self,
+        calendar_id: str,
+        days: List[date],
+        intervals: List[Interval],
+        generation: Optional[int] = None
+    ) -> bool:
+        """
+        Guardar los intervalos ocupados de días completos de un calendario
+
+        Args:
+            calendar_id: ID del calendario
+            days: Días completos cubiertos por la consulta
+            intervals: Intervalos ocupados (en la zona horaria local) de esos días
+            generation: Generación leída antes de la consulta (ver generation()); si
+                cambió, el calendario se escribió durante la consulta y no se guarda
+
+        Returns:
+            bool: True si se guardó
+        """
+        if self.ttl_seconds <= 0:
+            return False
+
+        by_day: Dict[date, List[Interval]] = {day: [] for day in days}
+        for start, end in intervals:
+            # Un intervalo que cruza la medianoche se guarda en cada día que toca
+            day = start.date()
+            last_day = max(start, end - timedelta(microseconds=1)).date()
+            while day <= last_day:
+                if day in by_day:
+                    by_day[day].append((start, end))
+                day += timedelta(days=1)
+
+        loaded_at = time.monotonic()
+        with self._lock:
+            if generation is not None and generation != self._base_generation + self._generations.get(calendar_id, 0):
+                return False
+            for day, day_intervals in by_day.items():
+                self._days[(calendar_id, day)] = _DayIntervals(day_intervals, loaded_at)
+        return True
+
+    def get_overlapping(self, calendar_id: str, days: List[date], start: datetime, end: datetime) -> Optional[List[Interval]]:
+        """
+        Intervalos ocupados que se solapan con [start, end)
+
+        Returns:
+            Lista de intervalos (sin duplicados), None si algún día no está en el índice
+        """
+        result = []
+        for day in days:
+            entry = self._get_day(calendar_id, day)
+            if entry is None:
+                return None
+            for interval in entry.overlapping(start, end):
+                if interval not in result:
+                    result.append(interval)
+        return result
+
+    def invalidate(self, calendar_id: Optional[str] = None, day: Optional[date] = None):
+        """
+        Invalidar entradas del índice
+
+        Args:
+            calendar_id: Calendario a invalidar (opcional, todos si no se especifica)
+            day: Día a invalidar (opcional, todos si no se especifica)
+        """
+        with self._lock:
+            if calendar_id is None:
+                self._base_generation += 1
+            else:
+                self._generations[calendar_id] = self._generations.get(calendar_id, 0) + 1
+            for key in list(self._days.keys()):
+                if (calendar_id is None or key[0] == calendar_id) and (day is None or key[1] == day):
+                    del self._days[key]
@@ -0,0 +1,472 @@
+"""
+Mirror local de los calendarios de canchas en la base de datos
+Se mantiene al día con la sincronización incremental de Google Calendar (syncToken)
+y, opcionalmente, con notificaciones push que llegan a /calendar/notifications. Solo
+se copian los eventos desde CALENDAR_MIRROR_PAST_DAYS días antes de hoy
+"""
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Set, Tuple
+import pytz
+from googleapiclient.errors import HttpError
+from database import SessionLocal, CalendarEvent, CalendarSyncState
+from config import (
+    COURT_CALENDAR_MAPPING,
+    TIMEZONE,
+    CALENDAR_MIRROR_SYNC_INTERVAL_SECONDS,
+    CALENDAR_MIRROR_MAX_AGE_SECONDS,
+    CALENDAR_MIRROR_PAST_DAYS,
+    CALENDAR_WEBHOOK_URL,
+    CALENDAR_WEBHOOK_TOKEN
+)
+
+logger = logging.getLogger(__name__)
+
+# Los canales de notificación se renuevan un poco antes de expirar
+CHANNEL_RENEW_MARGIN = timedelta(hours=1)
+
+# Campos que usa _apply_changes (más los tokens de paginación y sincronización)
+SYNC_FIELDS = 'items(id,status,transparency,summary,start,end,updated),nextPageToken,nextSyncToken'
+
+
+def _to_utc_naive(value: datetime) -> datetime:
+    """Convertir un datetime con zona horaria a UTC sin tzinfo (formato guardado en la BD)"""
+    return value.astimezone(pytz.utc).replace(tzinfo=None)
+
+
+class CalendarMirror:
+    """
+    Copia local de los eventos de cada calendario de cancha
+
+    La primera sincronización descarga los eventos desde CALENDAR_MIRROR_PAST_DAYS
+    días antes de hoy; las siguientes solo piden los cambios desde el último
+    nextSyncToken. Las lecturas de disponibilidad se resuelven con consultas
+    indexadas sobre la copia local. Las notificaciones push se atienden en un solo
+    thread: varias notificaciones de un calendario mientras se sincroniza se juntan
+    en una sola sincronización más.
+    """
+
+    def __init__(self, calendar_client):
+        self.calendar_client = calendar_client
+        self.timezone = pytz.timezone(TIMEZONE)
+        self._synced_at: Dict[str, float] = {}
+        self._sync_locks: Dict[str, threading.Lock] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Calendarios notificados que esperan sincronizarse
+        self._notified: Set[str] = set()
+        self._notified_lock = threading.Lock()
+        self._notify_event = threading.Event()
+        self._notify_thread: Optional[threading.Thread] = None
+
+    @property
+    def calendar_ids(self) -> List[str]:
+        return list(dict.fromkeys(COURT_CALENDAR_MAPPING.values()))
+
+    def _time_min(self) -> datetime:
+        """Inicio del rango que guarda la copia local"""
+        today = datetime.now(self.timezone).replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+        return self.timezone.localize(today - timedelta(days=CALENDAR_MIRROR_PAST_DAYS))
+
+    def _parse_event_time(self, value: Dict[str, str], all_day: bool) -> datetime:
+        """Parsear 'start'/'end' de un evento a UTC sin tzinfo"""
+        if all_day:
+            day = datetime.strptime(value['date'], '%Y-%m-%d')
+            return _to_utc_naive(self.timezone.localize(day))
+        return _to_utc_naive(datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00')))
+
+    def _apply_changes(self, db, calendar_id: str, items: List[Dict[str, Any]]) -> int:
+        """Aplicar a la copia local los eventos devueltos por la API"""
+        changed = 0
+        for item in items:
+            existing = db.query(CalendarEvent).filter(
+                CalendarEvent.calendar_id == calendar_id,
+                CalendarEvent.event_id == item['id']
+            ).first()
+
+            # Eventos cancelados o transparentes no ocupan la cancha (igual que FreeBusy)
+            if item.get('status') == 'cancelled' or item.get('transparency') == 'transparent':
+                if existing:
+                    db.delete(existing)
+                    changed += 1
+                continue
+
+            start = item.get('start', {})
+            end = item.get('end', {})
+            all_day = 'dateTime' not in start
+            if not (start.get('dateTime') or start.get('date')) or not (end.get('dateTime') or end.get('date')):
+                continue
+
+            if not existing:
+                existing = CalendarEvent(calendar_id=calendar_id, event_id=item['id'])
+                db.add(existing)
+            existing.summary = item.get('summary')
+            existing.start_time = self._parse_event_time(start, all_day)
+            existing.end_time = self._parse_event_time(end, all_day)
+            existing.all_day = all_day
+            existing.updated = item.get('updated')
+            changed += 1
+        return changed
+
+    def sync_calendar(self, calendar_id: str) -> bool:
+        """
+        Sincronizar un calendario con la copia local
+
+        Usa el syncToken guardado si existe; si Google lo invalida (410 Gone)
+        se descarta la copia y se hace una sincronización completa.
+
+        Returns:
+            bool: True si la sincronización terminó correctamente
+        """
+        lock = self._sync_locks.setdefault(calendar_id, threading.Lock())
+        with lock:
+            db = SessionLocal()
+            try:
+                state = db.query(CalendarSyncState).filter(
+                    CalendarSyncState.calendar_id == calendar_id
+                ).first()
+                if not state:
+                    state = CalendarSyncState(calendar_id=calendar_id)
+                    db.add(state)
+
+                service = self.calendar_client._get_service()
+                full_sync = not state.sync_token
+                if full_sync:
+                    db.query(CalendarEvent).filter(CalendarEvent.calendar_id == calendar_id).delete()
+
+                page_token = None
+                changed = 0
+                while True:
+                    params = {
+                        'calendarId': calendar_id,
+                        'singleEvents': True,
+                        'maxResults': 2500,
+                        'pageToken': page_token,
+                        'fields': SYNC_FIELDS,
+                    }
+                    if full_sync:
+                        params['timeMin'] = self._time_min().isoformat()
+                    else:
+                        params['syncToken'] = state.sync_token
+
+                    try:
+                        result = self.calendar_client._execute(service.events().list(**params))
+                    except HttpError as e:
+                        if e.resp.status == 410 and not full_sync:
+                            # Google invalidó el token: descartar la copia y empezar de cero
+                            logger.info(f"🔄 syncToken inválido para {calendar_id}, sincronización completa")
+                            full_sync = True
+                            state.sync_token = None
+                            page_token = None
+                            db.query(CalendarEvent).filter(CalendarEvent.calendar_id == calendar_id).delete()
+                            continue
+                        raise
+
+                    changed += self._apply_changes(db, calendar_id, result.get('items', []))
+                    page_token = result.get('nextPageToken')
+                    if not page_token:
+                        state.sync_token = result.get('nextSyncToken')
+                        break
+
+                state.last_synced_at = datetime.utcnow()
+                db.commit()
+                self._synced_at[calendar_id] = time.monotonic()
+
+                if changed:
+                    # La copia local cambió: el índice en memoria ya no es confiable
+                    self.calendar_client.busy_index.invalidate(calendar_id)
+                    logger.info(f"✅ Mirror de {calendar_id} actualizado ({changed} cambios)")
+                return True
+
+            except Exception as e:
+                db.rollback()
+                logger.error(f"❌ Error sincronizando calendario {calendar_id}: {e}")
+                return False
+            finally:
+                db.close()
+
+    def apply_local_write(
+        self,
+        calendar_id: str,
+        event: Optional[Dict[str, Any]] = None,
+        deleted_event_id: Optional[str] = None
+    ):
+        """
+        Reflejar en la copia local un evento que creamos, modificamos o borramos
+
+        Las lecturas desde el mirror ven la escritura sin esperar la próxima
+        sincronización. Si no se puede aplicar, el calendario deja de estar al día
+        y las lecturas vuelven a la API hasta que se sincronice de nuevo.
+
+        Args:
+            calendar_id: Calendario del evento
+            event: Evento devuelto por la API (creado o modificado)
+            deleted_event_id: ID del evento borrado
+        """
+        item = event if event is not None else {'id': deleted_event_id, 'status': 'cancelled'}
+        if not item or not item.get('id'):
+            return
+        # Con el lock de la sincronización una sincronización en curso no pisa la escritura
+        lock = self._sync_locks.setdefault(calendar_id, threading.Lock())
+        with lock:
+            db = SessionLocal()
+            try:
+                self._apply_changes(db, calendar_id, [item])
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self._synced_at.pop(calendar_id, None)
+                logger.warning(f"⚠️  No se pudo reflejar el evento {item.get('id')} en el mirror de {calendar_id}: {e}")
+            finally:
+                db.close()
+
+    def sync_all(self):
+        """Sincronizar todos los calendarios de canchas"""
+        for calendar_id in self.calendar_ids:
+            self.sync_calendar(calendar_id)
+
+    def is_fresh(self, calendar_ids: List[str], time_min: Optional[datetime] = None) -> bool:
+        """
+        Indica si la copia local de todos los calendarios es lo bastante reciente
+
+        Args:
+            time_min: Inicio de la consulta (opcional); antes de _time_min() la copia
+                no tiene los eventos
+        """
+        if time_min is not None and time_min < self._time_min():
+            return False
+        now = time.monotonic()
+        return all(
+            now - self._synced_at.get(calendar_id, float('-inf')) <= CALENDAR_MIRROR_MAX_AGE_SECONDS
+            for calendar_id in calendar_ids
+        )
+
+    def get_busy_intervals(
+        self,
+        calendar_ids: List[str],
+        time_min: datetime,
+        time_max: datetime
+    ) -> Dict[str, List[Tuple[datetime, datetime]]]:
+        """
+        Obtener intervalos ocupados desde la copia local
+
+        Returns:
+            Dict {calendar_id: [(inicio, fin), ...]} en la zona horaria configurada
+        """
+        db = SessionLocal()
+        try:
+            rows = db.query(
+                CalendarEvent.calendar_id, CalendarEvent.start_time, CalendarEvent.end_time
+            ).filter(
+                CalendarEvent.calendar_id.in_(calendar_ids),
+                CalendarEvent.start_time < _to_utc_naive(time_max),
+                CalendarEvent.end_time > _to_utc_naive(time_min)
+            ).order_by(CalendarEvent.start_time).all()
+        finally:
+            db.close()
+
+        busy = {calendar_id: [] for calendar_id in calendar_ids}
+        for calendar_id, start_time, end_time in rows:
+            busy[calendar_id].append((
+                pytz.utc.localize(start_time).astimezone(self.timezone),
+                pytz.utc.localize(end_time).astimezone(self.timezone)
+            ))
+        return busy
+
+    def get_events(self, calendar_id: str, time_min: datetime, time_max: datetime) -> List[Dict[str, Any]]:
+        """
+        Obtener eventos desde la copia local con el mismo formato que devuelve la API
+
+        Returns:
+            Lista de eventos ordenados por hora de inicio
+        """
+        db = SessionLocal()
+        try:
+            rows = db.query(CalendarEvent).filter(
+                CalendarEvent.calendar_id == calendar_id,
+                CalendarEvent.start_time < _to_utc_naive(time_max),
+                CalendarEvent.end_time > _to_utc_naive(time_min)
+            ).order_by(CalendarEvent.start_time).all()
+        finally:
+            db.close()
+
+        events = []
+        for row in rows:
+            start = pytz.utc.localize(row.start_time).astimezone(self.timezone)
+            end = pytz.utc.localize(row.end_time).astimezone(self.timezone)
+            if row.all_day:
+                events.append({
+                    'id': row.event_id,
+                    'summary': row.summary,
+                    'start': {'date': start.strftime('%Y-%m-%d')},
+                    'end': {'date': end.strftime('%Y-%m-%d')},
+                })
+            else:
+                events.append({
+                    'id': row.event_id,
+                    'summary': row.summary,
+                    'start': {'dateTime': start.isoformat(), 'timeZone': TIMEZONE},
+                    'end': {'dateTime': end.isoformat(), 'timeZone': TIMEZONE},
+                })
+        return events
+
+    def watch_calendar(self, calendar_id: str) -> bool:
+        """
+        Registrar (o renovar) un canal de notificaciones push para un calendario
+
+        Returns:
+            bool: True si el canal quedó activo
+        """
+        if not CALENDAR_WEBHOOK_URL:
+            return False
+
+        db = SessionLocal()
+        try:
+            state = db.query(CalendarSyncState).filter(
+                CalendarSyncState.calendar_id == calendar_id
+            ).first()
+            if not state:
+                state = CalendarSyncState(calendar_id=calendar_id)
+                db.add(state)
+
+            if state.channel_expiration and state.channel_expiration - CHANNEL_RENEW_MARGIN > datetime.utcnow():
+                return True
+
+            body = {
+                'id': str(uuid.uuid4()),
+                'type': 'web_hook',
+                'address': CALENDAR_WEBHOOK_URL,
+            }
+            if CALENDAR_WEBHOOK_TOKEN:
+                body['token'] = CALENDAR_WEBHOOK_TOKEN
+
+            channel = self.calendar_client._execute(self.calendar_client._get_service().events().watch(
+                calendarId=calendar_id,
+                body=body
+            ), idempotent=False)
+
+            state.channel_id = channel.get('id')
+            state.channel_resource_id = channel.get('resourceId')
+            expiration_ms = channel.get('expiration')
+            state.channel_expiration = (
+                datetime.utcfromtimestamp(int(expiration_ms) / 1000) if expiration_ms else None
+            )
+            db.commit()
+            logger.info(f"✅ Canal de notificaciones registrado para {calendar_id}")
+            return True
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error registrando canal de notificaciones para {calendar_id}: {e}")
+            return False
+        finally:
+            db.close()
+
+    def handle_notification(self, channel_id: str, resource_state: str, token: Optional[str] = None) -> bool:
+        """
+        Procesar una notificación push de Google Calendar
+
+        Args:
+            channel_id: Cabecera X-Goog-Channel-ID
+            resource_state: Cabecera X-Goog-Resource-State ('sync', 'exists', 'not_exists')
+            token: Cabecera X-Goog-Channel-Token
+
+        Returns:
+            bool: True si la notificación corresponde a un canal conocido
+        """
+        if CALENDAR_WEBHOOK_TOKEN and token != CALENDAR_WEBHOOK_TOKEN:
+            logger.warning("⚠️  Notificación de calendario con token inválido")
+            return False
+
+        db = SessionLocal()
+        try:
+            state = db.query(CalendarSyncState).filter(
+                CalendarSyncState.channel_id == channel_id
+            ).first()
+            calendar_id = state.calendar_id if state else None
+        finally:
+            db.close()
+
+        if not calendar_id:
+            logger.warning(f"⚠️  Notificación de un canal desconocido: {channel_id}")
+            return False
+
+        # 'sync' solo confirma que el canal se creó
+        if resource_state != 'sync':
+            self._queue_sync(calendar_id)
+        return True
+
+    def _queue_sync(self, calendar_id: str):
+        """Agendar la sincronización de un calendario notificado (se juntan las repetidas)"""
+        with self._notified_lock:
+            self._notified.add(calendar_id)
+            if self._notify_thread is None or not self._notify_thread.is_alive():
+                self._notify_thread = threading.Thread(
+                    target=self._run_notifications, name="calendar-mirror-notifications", daemon=True
+                )
+                self._notify_thread.start()
+        self._notify_event.set()
+
+    def _run_notifications(self):
+        """Sincronizar los calendarios notificados, de a uno y sin repetir"""
+        while not self._stop_event.is_set():
+            self._notify_event.wait()
+            self._notify_event.clear()
+            with self._notified_lock:
+                calendar_ids, self._notified = self._notified, set()
+            for calendar_id in calendar_ids:
+                if self._stop_event.is_set():
+                    break
+                self.sync_calendar(calendar_id)
+
+    def _run(self):
+        """Bucle de sincronización periódica (respaldo de las notificaciones push)"""
+        while not self._stop_event.is_set():
+            for calendar_id in self.calendar_ids:
+                self.sync_calendar(calendar_id)
+                self.watch_calendar(calendar_id)
+            self._stop_event.wait(CALENDAR_MIRROR_SYNC_INTERVAL_SECONDS)
+
+    def start(self):
+        """Sincronizar y arrancar el thread de sincronización periódica"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="calendar-mirror", daemon=True)
+        self._thread.start()
+        self.calendar_client.mirror = self
+        logger.info("✅ Mirror de calendarios iniciado")
+
+    def stop(self):
+        """Detener la sincronización periódica y la de notificaciones"""
+        self._stop_event.set()
+        self._notify_event.set()
+        if self.calendar_client.mirror is self:
+            self.calendar_client.mirror = None
+
+
+# Instancia global del mirror
+_calendar_mirror: Optional[CalendarMirror] = None
+
+
+def get_calendar_mirror() -> Optional[CalendarMirror]:
+    """Obtener el mirror de calendarios activo (None si está desactivado)"""
+    return _calendar_mirror
+
+
+def start_calendar_mirror(calendar_client) -> CalendarMirror:
+    """
+    Crear y arrancar el mirror de calendarios para un cliente autenticado
+
+    Returns:
+        CalendarMirror: Mirror activo
+    """
+    global _calendar_mirror
+
+    if _calendar_mirror is None:
+        _calendar_mirror = CalendarMirror(calendar_client)
+        _calendar_mirror.start()
+    return _calendar_mirror
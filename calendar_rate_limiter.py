@@ -0,0 +1,93 @@
+"""
+Limitador adaptativo de concurrencia para Google Calendar API
+Ajusta cuántas llamadas pueden estar en curso a la vez con AIMD: sube de a poco
+mientras Google responde bien y baja a la mitad cuando devuelve errores de cuota
+"""
+import random
+import threading
+import time
+
+
+def backoff_delay(attempt: int, base_seconds: float = 0.5, max_seconds: float = 32.0) -> float:
+    """
+    Espera antes del reintento número `attempt` (0, 1, 2...)
+
+    Backoff exponencial con "full jitter": un valor aleatorio entre 0 y
+    base * 2^attempt, para que los clientes que fallaron a la vez no reintenten
+    todos al mismo tiempo.
+    """
+    return random.uniform(0, min(max_seconds, base_seconds * (2 ** attempt)))
+
+
+class AdaptiveRateLimiter:
+    """
+    Límite de llamadas concurrentes con incremento aditivo y decremento multiplicativo
+
+    - Cada respuesta exitosa suma 1/límite (el límite crece ~1 por cada "ronda")
+    - Cada error de cuota multiplica el límite por `decrease_factor`, como
+      máximo una vez por `cooldown_seconds` para que una ráfaga de errores de las
+      llamadas que ya estaban en curso no lo hunda hasta el mínimo
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 32,
+        decrease_factor: float = 0.5,
+        cooldown_seconds: float = 1.0
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.cooldown_seconds = cooldown_seconds
+        self._limit = max(min_limit, min(max_limit, initial_limit))
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Número de llamadas que pueden estar en curso a la vez"""
+        return max(1, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        """Número de llamadas en curso"""
+        return self._in_flight
+
+    def acquire(self):
+        """Esperar hasta que haya lugar para una llamada más"""
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self):
+        """Liberar el lugar de una llamada terminada"""
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
+
+    def on_success(self):
+        """Incremento aditivo tras una respuesta exitosa"""
+        with self._condition:
+            self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            self._condition.notify_all()
+
+    def on_throttled(self):
+        """Decremento multiplicativo tras un error de cuota (429 / 403 rateLimitExceeded)"""
+        with self._condition:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown_seconds:
+                return
+            self._last_decrease = now
+            self._limit = max(self.min_limit, self._limit * self.decrease_factor)
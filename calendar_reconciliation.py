@@ -0,0 +1,383 @@
+"""
+Conciliación entre la tabla de reservas y Google Calendar
+Detecta reservas cuyo evento fue eliminado o movido en el calendario (ej. por el
+personal del club) y reservas confirmadas que nunca llegaron al calendario, y
+opcionalmente corrige el registro local. Cada calendario guarda una marca de agua
+(CalendarSyncState.reconciled_at): las pasadas siguientes solo revisan los eventos
+modificados desde entonces
+"""
+import argparse
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import pytz
+from sqlalchemy.orm import Session
+from database import SessionLocal, Reservation, CalendarSyncState
+from reservation_ledger import release_reservation, resize_reservation, SlotUnavailableError
+from calendar_sync import get_calendar_sync_worker, sync_reservation
+from config import (
+    COURT_CALENDAR_MAPPING,
+    GOOGLE_CALENDAR_ID,
+    TIMEZONE,
+    CALENDAR_RECONCILE_INTERVAL_SECONDS,
+    CALENDAR_RECONCILE_DAYS,
+    CALENDAR_RECONCILE_FIX
+)
+
+logger = logging.getLogger(__name__)
+
+# Campos que se comparan con la reserva
+RECONCILE_EVENT_FIELDS = 'id,status,start,end'
+RECONCILE_LIST_FIELDS = f'items({RECONCILE_EVENT_FIELDS}),nextPageToken'
+# La marca de agua se retrasa un poco para no perder cambios por diferencias de reloj
+RECONCILE_OVERLAP = timedelta(minutes=5)
+# Sin write-behind, una reserva 'pending' más vieja que esto quedó a medio sincronizar
+PENDING_GRACE_PERIOD = timedelta(minutes=10)
+
+
+def _calendar_id(court_name: str) -> str:
+    return COURT_CALENDAR_MAPPING.get(court_name, GOOGLE_CALENDAR_ID)
+
+
+class CalendarReconciler:
+    """
+    Compara las reservas activas de los próximos CALENDAR_RECONCILE_DAYS días con
+    sus eventos de Google Calendar
+
+    La primera pasada de cada calendario lee todos los eventos de sus reservas con
+    el endpoint batch; las siguientes piden en un solo lote (una consulta por
+    calendario con updatedMin) solo los eventos modificados desde la marca de agua.
+    """
+
+    def __init__(self, calendar_client):
+        """
+        Args:
+            calendar_client: GoogleCalendarClient autenticado
+        """
+        self.calendar_client = calendar_client
+        self.timezone = pytz.timezone(TIMEZONE)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _local_naive(self, value: Dict[str, str]) -> Optional[datetime]:
+        """Parsear 'start'/'end' de un evento a hora local sin tzinfo (como Reservation.date)"""
+        if not value.get('dateTime'):
+            return None
+        parsed = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            return parsed
+        return parsed.astimezone(self.timezone).replace(tzinfo=None)
+
+    def _window(self) -> Tuple[datetime, datetime]:
+        """Rango revisado: desde el inicio de hoy hasta CALENDAR_RECONCILE_DAYS días después"""
+        today = datetime.now(self.timezone).replace(hour=0, minute=0, second=0, microsecond=0)
+        return today, today + timedelta(days=CALENDAR_RECONCILE_DAYS)
+
+    def _changed_events(self, states: Dict[str, CalendarSyncState]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Pedir los eventos modificados desde la marca de agua de cada calendario
+
+        No se filtra por fecha del evento: un evento movido fuera del rango revisado
+        también cuenta como cambio de su reserva.
+
+        Returns:
+            Eventos por calendario {calendar_id: {event_id: evento}}; los calendarios
+            cuya lectura falló (o necesitan una revisión completa) no aparecen
+        """
+        service = self.calendar_client._get_service()
+        calendar_ids = list(states)
+
+        def list_request(calendar_id: str, page_token: Optional[str] = None):
+            return service.events().list(
+                calendarId=calendar_id,
+                updatedMin=pytz.utc.localize(states[calendar_id].reconciled_at).isoformat(),
+                showDeleted=True,
+                singleEvents=True,
+                maxResults=2500,
+                pageToken=page_token,
+                fields=RECONCILE_LIST_FIELDS
+            )
+
+        changed: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        results = self.calendar_client._execute_batch([list_request(calendar_id) for calendar_id in calendar_ids])
+        for calendar_id, result in zip(calendar_ids, results):
+            if not result["ok"]:
+                # 410: updatedMin demasiado antiguo, hay que revisar todo el calendario
+                if result["status"] != 410:
+                    logger.warning(f"⚠️  No se pudieron leer los cambios de {calendar_id}: {result['error']}")
+                continue
+
+            page = result["result"]
+            items = list(page.get('items', []))
+            try:
+                while page.get('nextPageToken'):
+                    page = self.calendar_client._execute(list_request(calendar_id, page['nextPageToken']))
+                    items.extend(page.get('items', []))
+            except Exception as e:
+                logger.warning(f"⚠️  No se pudieron leer los cambios de {calendar_id}: {e}")
+                continue
+            changed[calendar_id] = {item['id']: item for item in items}
+        return changed
+
+    def _fetch_events(self, reservations: List[Reservation]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """
+        Leer con el endpoint batch los eventos de varias reservas
+
+        Returns:
+            Dict {reservation.id: evento o None si fue eliminado}; las reservas cuya
+            lectura falló no aparecen
+        """
+        results = self.calendar_client.get_events_batch(
+            [
+                {"event_id": reservation.google_calendar_event_id, "court_name": reservation.court_name}
+                for reservation in reservations
+            ],
+            fields=RECONCILE_EVENT_FIELDS
+        )
+        events = {}
+        for reservation, result in zip(reservations, results):
+            if result["ok"]:
+                events[reservation.id] = result["result"]
+            elif result["status"] in (404, 410):
+                events[reservation.id] = None
+            else:
+                logger.warning(f"⚠️  No se pudo leer el evento de la reserva {reservation.id}: {result['error']}")
+        return events
+
+    def _check(self, db: Session, reservation: Reservation, event: Optional[Dict[str, Any]], report: Dict[str, Any], fix: bool) -> bool:
+        """
+        Comparar una reserva con su evento y corregirla si corresponde
+
+        Returns:
+            bool: False si se intentó corregir una diferencia y no se pudo
+        """
+        if event is None or event.get('status') == 'cancelled':
+            report["deleted"].append(reservation.id)
+            logger.info(f"🔎 Reserva {reservation.id}: su evento fue eliminado de Google Calendar")
+            if fix:
+                release_reservation(db, reservation, "Evento eliminado en Google Calendar")
+                report["fixed"] += 1
+            return True
+
+        start = self._local_naive(event.get('start', {}))
+        end = self._local_naive(event.get('end', {}))
+        if not start or not end:
+            return True
+        duration_minutes = int((end - start).total_seconds() // 60)
+        if start == reservation.date and duration_minutes == (reservation.duration_minutes or 60):
+            return True
+
+        report["moved"].append(reservation.id)
+        logger.info(
+            f"🔎 Reserva {reservation.id}: el evento está el {start.strftime('%d/%m/%Y %H:%M')} "
+            f"({duration_minutes} min) y no el {reservation.date.strftime('%d/%m/%Y %H:%M')}"
+        )
+        if fix:
+            try:
+                # resize_reservation toma los bloques a partir de la nueva hora de inicio
+                reservation.date = start
+                resize_reservation(db, reservation, duration_minutes)
+                report["fixed"] += 1
+            except SlotUnavailableError as e:
+                report["unresolved"].append(reservation.id)
+                logger.warning(f"⚠️  No se pudo mover la reserva {reservation.id}; revisar manualmente: {e}")
+                return False
+        return True
+
+    def _check_unsynced(self, db: Session, time_min: datetime, time_max: datetime, report: Dict[str, Any], fix: bool):
+        """Buscar reservas activas sin evento (escrituras fallidas) y volver a crearlo"""
+        unsynced = Reservation.calendar_sync_status == "failed"
+        if get_calendar_sync_worker() is None:
+            # Sin sincronizador nadie va a retomar las reservas que quedaron pendientes
+            unsynced = unsynced | (
+                (Reservation.calendar_sync_status == "pending") &
+                (Reservation.created_at < datetime.utcnow() - PENDING_GRACE_PERIOD)
+            )
+        reservations = db.query(Reservation).filter(
+            Reservation.status != "cancelled",
+            Reservation.google_calendar_event_id.is_(None),
+            Reservation.date >= time_min.replace(tzinfo=None),
+            Reservation.date < time_max.replace(tzinfo=None),
+            unsynced
+        ).all()
+
+        for reservation in reservations:
+            report["unsynced"].append(reservation.id)
+            logger.info(f"🔎 Reserva {reservation.id}: confirmada pero sin evento en Google Calendar")
+            if not fix:
+                continue
+            reservation.calendar_sync_status = "pending"
+            reservation.calendar_sync_attempts = 0
+            try:
+                if sync_reservation(self.calendar_client, db, reservation):
+                    report["fixed"] += 1
+            except Exception as e:
+                logger.warning(f"⚠️  No se pudo crear el evento de la reserva {reservation.id}: {e}")
+                report["errors"] += 1
+
+    def reconcile(self, fix: bool = CALENDAR_RECONCILE_FIX, full: bool = False) -> Dict[str, Any]:
+        """
+        Ejecutar una pasada de conciliación
+
+        Args:
+            fix: Corregir el registro local (si es False solo se reporta)
+            full: Ignorar las marcas de agua y revisar todas las reservas del rango
+
+        Returns:
+            Dict con los IDs de reservas con evento eliminado ('deleted'), movido
+            ('moved'), inexistente ('unsynced') o movido sin poder corregirse
+            ('unresolved'), y los contadores 'checked', 'fixed' y 'errors'
+        """
+        report = {"checked": 0, "deleted": [], "moved": [], "unsynced": [], "unresolved": [], "fixed": 0, "errors": 0}
+        with self._lock:
+            db = SessionLocal()
+            try:
+                started_at = datetime.utcnow()
+                time_min, time_max = self._window()
+                reservations = db.query(Reservation).filter(
+                    Reservation.status != "cancelled",
+                    Reservation.google_calendar_event_id.isnot(None),
+                    Reservation.date >= time_min.replace(tzinfo=None),
+                    Reservation.date < time_max.replace(tzinfo=None)
+                ).all()
+                by_calendar: Dict[str, List[Reservation]] = {}
+                for reservation in reservations:
+                    by_calendar.setdefault(_calendar_id(reservation.court_name), []).append(reservation)
+
+                calendar_ids = list(dict.fromkeys(list(COURT_CALENDAR_MAPPING.values()) + list(by_calendar)))
+                states = {
+                    state.calendar_id: state
+                    for state in db.query(CalendarSyncState).filter(CalendarSyncState.calendar_id.in_(calendar_ids))
+                }
+
+                # Calendarios con marca de agua: solo los eventos modificados desde entonces
+                incremental = {
+                    calendar_id: state for calendar_id, state in states.items()
+                    if state.reconciled_at and not full
+                }
+                changed = self._changed_events(incremental) if incremental else {}
+                to_check: List[Tuple[Reservation, Optional[Dict[str, Any]]]] = []
+                to_fetch: List[Reservation] = []
+                for calendar_id, calendar_reservations in by_calendar.items():
+                    if calendar_id in changed:
+                        to_check.extend(
+                            (reservation, changed[calendar_id][reservation.google_calendar_event_id])
+                            for reservation in calendar_reservations
+                            if reservation.google_calendar_event_id in changed[calendar_id]
+                        )
+                    else:
+                        to_fetch.extend(calendar_reservations)
+
+                # Calendarios sin marca de agua o cuya lectura de cambios falló: leer los eventos de todas sus reservas
+                fetched = self._fetch_events(to_fetch) if to_fetch else {}
+                to_check.extend((reservation, fetched[reservation.id]) for reservation in to_fetch if reservation.id in fetched)
+                unread = {_calendar_id(reservation.court_name) for reservation in to_fetch if reservation.id not in fetched}
+
+                for reservation, event in to_check:
+                    report["checked"] += 1
+                    if not self._check(db, reservation, event, report, fix):
+                        # La marca de agua no avanza: la próxima pasada vuelve a ver el evento
+                        unread.add(_calendar_id(reservation.court_name))
+
+                self._check_unsynced(db, time_min, time_max, report, fix)
+
+                # Avanzar la marca de agua de los calendarios revisados por completo y sin
+                # diferencias pendientes; si solo se reporta, la próxima pasada vuelve a
+                # ver las mismas diferencias
+                if fix:
+                    for calendar_id in calendar_ids:
+                        if calendar_id in unread:
+                            continue
+                        state = db.query(CalendarSyncState).filter(
+                            CalendarSyncState.calendar_id == calendar_id
+                        ).first()
+                        if not state:
+                            state = CalendarSyncState(calendar_id=calendar_id)
+                            db.add(state)
+                        state.reconciled_at = started_at - RECONCILE_OVERLAP
+                    db.commit()
+            except Exception as e:
+                db.rollback()
+                report["errors"] += 1
+                logger.error(f"❌ Error conciliando reservas con Google Calendar: {e}")
+            finally:
+                db.close()
+
+        drift = len(report["deleted"]) + len(report["moved"]) + len(report["unsynced"])
+        if drift:
+            logger.info(
+                f"🔎 Conciliación: {report['checked']} reservas revisadas, {len(report['deleted'])} eliminadas, "
+                f"{len(report['moved'])} movidas, {len(report['unsynced'])} sin evento, {report['fixed']} corregidas, "
+                f"{len(report['unresolved'])} sin poder corregir"
+            )
+        return report
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.reconcile()
+            self._stop_event.wait(CALENDAR_RECONCILE_INTERVAL_SECONDS)
+
+    def start(self):
+        """Arrancar la conciliación periódica"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="calendar-reconciliation", daemon=True)
+        self._thread.start()
+        logger.info("✅ Conciliación de reservas con Google Calendar iniciada")
+
+    def stop(self):
+        """Detener la conciliación periódica"""
+        self._stop_event.set()
+
+
+# Instancia global del conciliador
+_calendar_reconciler: Optional[CalendarReconciler] = None
+
+
+def get_calendar_reconciler() -> Optional[CalendarReconciler]:
+    """Obtener el conciliador activo (None si está desactivado)"""
+    return _calendar_reconciler
+
+
+def start_calendar_reconciler(calendar_client) -> CalendarReconciler:
+    """
+    Crear y arrancar el conciliador de reservas
+
+    Returns:
+        CalendarReconciler: Conciliador activo
+    """
+    global _calendar_reconciler
+
+    if _calendar_reconciler is None:
+        _calendar_reconciler = CalendarReconciler(calendar_client)
+        _calendar_reconciler.start()
+    return _calendar_reconciler
+
+
+async def main():
+    """Ejecutar una pasada desde la línea de comandos"""
+    from database import init_db
+    from google_calendar_client import get_google_calendar_instance
+
+    parser = argparse.ArgumentParser(description="Conciliar la tabla de reservas con Google Calendar")
+    parser.add_argument('--fix', action='store_true', help="Corregir el registro local (por defecto solo reporta)")
+    parser.add_argument('--full', action='store_true', help="Revisar todas las reservas ignorando la marca de agua")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    init_db()
+    calendar_client = await get_google_calendar_instance()
+    report = CalendarReconciler(calendar_client).reconcile(fix=args.fix, full=args.full)
+    print(
+        f"Revisadas: {report['checked']} | Eventos eliminados: {report['deleted']} | "
+        f"Movidos: {report['moved']} | Sin evento: {report['unsynced']} | Corregidas: {report['fixed']} | "
+        f"Sin poder corregir: {report['unresolved']}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,207 @@
+"""
+Sincronización en segundo plano de reservas locales hacia Google Calendar (write-behind)
+Las reservas se confirman al guardarse en la BD (reservation_ledger.py); este módulo
+crea los eventos de Google Calendar y guarda su ID y link en la reserva
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+from sqlalchemy.orm import Session
+from database import SessionLocal, Reservation
+from calendar_rate_limiter import backoff_delay
+from config import CALENDAR_SYNC_INTERVAL_SECONDS, CALENDAR_SYNC_MAX_ATTEMPTS
+
+logger = logging.getLogger(__name__)
+
+# Reservas procesadas por pasada
+SYNC_BATCH_SIZE = 50
+# Espera máxima entre reintentos de una misma reserva
+SYNC_MAX_RETRY_DELAY_SECONDS = 3600
+
+
+def sync_reservation(calendar_client, db: Session, reservation: Reservation) -> bool:
+    """
+    Crear el evento de Google Calendar de una reserva y guardar su ID y link
+
+    El evento usa la clave de la reserva como ID, así que reintentar después de un
+    fallo (o de un corte entre crear el evento y guardar la reserva) no lo duplica.
+
+    Returns:
+        bool: True si la reserva quedó sincronizada
+
+    Raises:
+        CalendarError: Google Calendar saturado o caído (la reserva queda pendiente)
+    """
+    reservation.calendar_sync_attempts = (reservation.calendar_sync_attempts or 0) + 1
+    try:
+        event = calendar_client.create_event(
+            court_name=reservation.court_name,
+            date=reservation.date,
+            time_slot=reservation.date.strftime("%H:%M"),
+            duration_minutes=reservation.duration_minutes or 60,
+            name=reservation.name or (reservation.user.name if reservation.user else None),
+            event_id=reservation.idempotency_key
+        )
+    except Exception as e:
+        _schedule_retry(reservation, str(e))
+        db.commit()
+        raise
+
+    if not event or not event.get('id'):
+        _schedule_retry(reservation, "Google Calendar rechazó el evento")
+        if reservation.calendar_sync_attempts >= CALENDAR_SYNC_MAX_ATTEMPTS:
+            reservation.calendar_sync_status = "failed"
+            reservation.calendar_sync_next_at = None
+            logger.error(f"❌ Reserva {reservation.id} sin evento en Google Calendar tras {reservation.calendar_sync_attempts} intentos")
+        db.commit()
+        return False
+
+    reservation.google_calendar_event_id = event.get('id')
+    reservation.google_calendar_link = event.get('htmlLink')
+    reservation.calendar_sync_status = "synced"
+    reservation.calendar_sync_error = None
+    reservation.calendar_sync_next_at = None
+    db.commit()
+    logger.info(f"📆 Reserva {reservation.id} sincronizada con Google Calendar")
+    return True
+
+
+def sync_reservation_by_id(calendar_client, reservation_id: int) -> bool:
+    """
+    Sincronizar una reserva con su propia sesión de BD
+
+    Para llamar desde un thread del executor: la sesión del que confirma la reserva
+    no se comparte entre threads.
+
+    Returns:
+        bool: True si la reserva quedó sincronizada
+
+    Raises:
+        CalendarError: Google Calendar saturado o caído (la reserva queda pendiente)
+    """
+    db = SessionLocal()
+    try:
+        reservation = db.query(Reservation).filter(Reservation.id == reservation_id).first()
+        if not reservation:
+            logger.error(f"❌ Reserva {reservation_id} no encontrada para sincronizar")
+            return False
+        return sync_reservation(calendar_client, db, reservation)
+    finally:
+        db.close()
+
+
+def _schedule_retry(reservation: Reservation, error: str):
+    """Guardar el error y programar el próximo intento con backoff exponencial"""
+    delay = backoff_delay(
+        reservation.calendar_sync_attempts - 1,
+        CALENDAR_SYNC_INTERVAL_SECONDS,
+        SYNC_MAX_RETRY_DELAY_SECONDS
+    )
+    reservation.calendar_sync_error = error
+    reservation.calendar_sync_next_at = datetime.utcnow() + timedelta(seconds=delay)
+
+
+class CalendarSyncWorker:
+    """
+    Thread que crea en Google Calendar los eventos de las reservas pendientes
+
+    Se despierta cada CALENDAR_SYNC_INTERVAL_SECONDS o inmediatamente con notify().
+    Al arrancar procesa lo que haya quedado pendiente (ej. tras un reinicio).
+    """
+
+    def __init__(self, calendar_client, on_failed: Optional[Callable[[Reservation], None]] = None):
+        """
+        Args:
+            calendar_client: GoogleCalendarClient autenticado
+            on_failed: Función opcional llamada cuando una reserva queda como 'failed'
+        """
+        self.calendar_client = calendar_client
+        self.on_failed = on_failed
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def notify(self):
+        """Avisar que hay una reserva nueva para sincronizar"""
+        self._wake_event.set()
+
+    def sync_pending(self) -> int:
+        """
+        Sincronizar las reservas pendientes cuyo reintento ya venció
+
+        Returns:
+            int: Número de reservas sincronizadas
+        """
+        db = SessionLocal()
+        synced = 0
+        try:
+            now = datetime.utcnow()
+            pending = db.query(Reservation).filter(
+                Reservation.calendar_sync_status == "pending",
+                Reservation.status != "cancelled",
+                (Reservation.calendar_sync_next_at.is_(None)) | (Reservation.calendar_sync_next_at <= now)
+            ).order_by(Reservation.created_at).limit(SYNC_BATCH_SIZE).all()
+
+            for reservation in pending:
+                if self._stop_event.is_set():
+                    break
+                try:
+                    if sync_reservation(self.calendar_client, db, reservation):
+                        synced += 1
+                    elif reservation.calendar_sync_status == "failed" and self.on_failed:
+                        self.on_failed(reservation)
+                except Exception as e:
+                    # Google saturado o caído: el resto de la pasada fallaría igual
+                    logger.warning(f"⚠️  Sincronización de reservas pausada: {e}")
+                    break
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error sincronizando reservas con Google Calendar: {e}")
+        finally:
+            db.close()
+        return synced
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake_event.clear()
+            self.sync_pending()
+            self._wake_event.wait(CALENDAR_SYNC_INTERVAL_SECONDS)
+
+    def start(self):
+        """Arrancar el thread de sincronización"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="calendar-sync", daemon=True)
+        self._thread.start()
+        logger.info("✅ Sincronización de reservas con Google Calendar iniciada")
+
+    def stop(self):
+        """Detener el thread de sincronización"""
+        self._stop_event.set()
+        self._wake_event.set()
+
+
+# Instancia global del sincronizador
+_calendar_sync_worker: Optional[CalendarSyncWorker] = None
+
+
+def get_calendar_sync_worker() -> Optional[CalendarSyncWorker]:
+    """Obtener el sincronizador activo (None si el modo write-behind está desactivado)"""
+    return _calendar_sync_worker
+
+
+def start_calendar_sync_worker(calendar_client, on_failed: Optional[Callable[[Reservation], None]] = None) -> CalendarSyncWorker:
+    """
+    Crear y arrancar el sincronizador de reservas
+
+    Returns:
+        CalendarSyncWorker: Sincronizador activo
+    """
+    global _calendar_sync_worker
+
+    if _calendar_sync_worker is None:
+        _calendar_sync_worker = CalendarSyncWorker(calendar_client, on_failed)
+        _calendar_sync_worker.start()
+    return _calendar_sync_worker
@@ -23,6 +23,18 @@ PLAYTOMIC_COURT_MAPPING = {
     "TEDS": os.getenv("PLAYTOMIC_TEDS_ID", "")  # Necesitarás obtener este ID
 }
 
+# Scraper de disponibilidad (scraper_playtomic.py)
+SCRAPER_MAX_DAYS = int(os.getenv("SCRAPER_MAX_DAYS", "14"))  # Horizonte máximo (hoy incluido)
+SCRAPER_CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", "4"))  # Días consultados en paralelo
+SCRAPER_MIN_INTERVAL_SECONDS = float(os.getenv("SCRAPER_MIN_INTERVAL_SECONDS", "0.25"))  # Entre peticiones al mismo host
+
+# Refresco en proceso de la disponibilidad (availability_refresh.py), por tramos de fechas
+AVAILABILITY_REFRESH_ENABLED = os.getenv("AVAILABILITY_REFRESH_ENABLED", "true").lower() == "true"
+AVAILABILITY_REFRESH_TODAY_SECONDS = int(os.getenv("AVAILABILITY_REFRESH_TODAY_SECONDS", "300"))  # Hoy
+AVAILABILITY_REFRESH_NEAR_DAYS = int(os.getenv("AVAILABILITY_REFRESH_NEAR_DAYS", "3"))  # Días siguientes a hoy que son "cercanos"
+AVAILABILITY_REFRESH_NEAR_SECONDS = int(os.getenv("AVAILABILITY_REFRESH_NEAR_SECONDS", "1800"))
+AVAILABILITY_REFRESH_FAR_SECONDS = int(os.getenv("AVAILABILITY_REFRESH_FAR_SECONDS", "10800"))  # Resto hasta SCRAPER_MAX_DAYS
+
 # Configuración WhatsApp
 WHATSAPP_SESSION_PATH = Path(os.getenv("WHATSAPP_SESSION_PATH", "./whatsapp_session"))
 
@@ -50,8 +62,12 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 
 # Configuración Google Calendar
 GOOGLE_CREDENTIALS_FILE = os.getenv("GOOGLE_CREDENTIALS_FILE", "credentials.json")
-GOOGLE_TOKEN_FILE = os.getenv("GOOGLE_TOKEN_FILE", "token.pickle")
+GOOGLE_TOKEN_FILE = os.getenv("GOOGLE_TOKEN_FILE", "token.json")
+GOOGLE_LEGACY_TOKEN_FILE = os.getenv("GOOGLE_LEGACY_TOKEN_FILE", "token.pickle")  # Se migra a GOOGLE_TOKEN_FILE
+GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS", "300"))  # Refrescar antes de expirar
 GOOGLE_CALENDAR_ID = os.getenv("GOOGLE_CALENDAR_ID", "primary")  # "primary" o ID de calendario específico (legacy, usar COURT_CALENDAR_MAPPING)
+# Endpoint alternativo de la API, ej: http://localhost:8085/ (fake_calendar_server.py). Sin OAuth
+GOOGLE_CALENDAR_API_ENDPOINT = os.getenv("GOOGLE_CALENDAR_API_ENDPOINT", "")
 
 # Mapeo de canchas a Calendar IDs de Google Calendar
 # Para obtener los IDs: ejecuta obtener_calendarios.py o ve a Google Calendar > Configuración
@@ -62,6 +78,58 @@ COURT_CALENDAR_MAPPING = {
     "TEDS": os.getenv("GOOGLE_CALENDAR_TEDS_ID", "primary"),  # Reemplaza con el ID real
 }
 
+# Horarios de operación de cada cancha
+# Formato: {"cancha": {"inicio": "HH:MM", "fin": "HH:MM"}}
+COURT_HOURS = {
+    "MONEX": {"inicio": "06:00", "fin": "23:00"},
+    "GOCSA": {"inicio": "06:00", "fin": "23:00"},
+    "WOODWARD": {"inicio": "06:00", "fin": "23:00"},
+    "TEDS": {"inicio": "06:00", "fin": "23:00"},
+}
+
+# Intervalo entre horarios de inicio ofrecidos (ej. 30 -> 18:00, 18:30, 19:00...)
+SLOT_STEP_MINUTES = int(os.getenv("SLOT_STEP_MINUTES", "30"))
+
+# Número máximo de llamadas concurrentes a Google Calendar (un transporte HTTP por worker)
+CALENDAR_MAX_WORKERS = int(os.getenv("CALENDAR_MAX_WORKERS", "4"))
+
+# Timeout de cada petición HTTP a Google Calendar
+CALENDAR_HTTP_TIMEOUT_SECONDS = int(os.getenv("CALENDAR_HTTP_TIMEOUT_SECONDS", "10"))
+# Reintentos ante errores de cuota (429 / 403 rateLimitExceeded) o errores 5xx
+CALENDAR_MAX_RETRIES = int(os.getenv("CALENDAR_MAX_RETRIES", "5"))
+# Backoff exponencial con jitter entre reintentos (base y tope en segundos)
+CALENDAR_BACKOFF_BASE_SECONDS = float(os.getenv("CALENDAR_BACKOFF_BASE_SECONDS", "0.5"))
+CALENDAR_BACKOFF_MAX_SECONDS = float(os.getenv("CALENDAR_BACKOFF_MAX_SECONDS", "32"))
+# Tope de llamadas concurrentes del limitador adaptativo (empieza en CALENDAR_MAX_WORKERS)
+CALENDAR_MAX_CONCURRENCY = int(os.getenv("CALENDAR_MAX_CONCURRENCY", "16"))
+
+# Write-behind: la reserva se confirma al guardarla en la BD y el evento de Google
+# Calendar se crea en segundo plano (calendar_sync.py)
+CALENDAR_WRITE_BEHIND = os.getenv("CALENDAR_WRITE_BEHIND", "false").lower() == "true"
+CALENDAR_SYNC_INTERVAL_SECONDS = int(os.getenv("CALENDAR_SYNC_INTERVAL_SECONDS", "30"))
+CALENDAR_SYNC_MAX_ATTEMPTS = int(os.getenv("CALENDAR_SYNC_MAX_ATTEMPTS", "5"))  # Luego queda como 'failed'
+
+# Conciliación periódica de la tabla de reservas con Google Calendar (calendar_reconciliation.py)
+CALENDAR_RECONCILE_ENABLED = os.getenv("CALENDAR_RECONCILE_ENABLED", "false").lower() == "true"
+CALENDAR_RECONCILE_INTERVAL_SECONDS = int(os.getenv("CALENDAR_RECONCILE_INTERVAL_SECONDS", "900"))
+CALENDAR_RECONCILE_DAYS = int(os.getenv("CALENDAR_RECONCILE_DAYS", "14"))  # Días hacia adelante que se revisan
+CALENDAR_RECONCILE_FIX = os.getenv("CALENDAR_RECONCILE_FIX", "true").lower() == "true"  # false = solo reportar
+
+# Segundos que se retiene una cancha entre elegirla y confirmar la reserva
+SLOT_HOLD_TTL_SECONDS = int(os.getenv("SLOT_HOLD_TTL_SECONDS", "300"))
+
+# Segundos que se reutilizan los intervalos ocupados ya consultados (0 = desactivado)
+CALENDAR_BUSY_CACHE_TTL_SECONDS = int(os.getenv("CALENDAR_BUSY_CACHE_TTL_SECONDS", "120"))
+
+# Mirror local de los calendarios (sincronización incremental con syncToken)
+CALENDAR_MIRROR_ENABLED = os.getenv("CALENDAR_MIRROR_ENABLED", "false").lower() == "true"
+CALENDAR_MIRROR_SYNC_INTERVAL_SECONDS = int(os.getenv("CALENDAR_MIRROR_SYNC_INTERVAL_SECONDS", "60"))
+CALENDAR_MIRROR_MAX_AGE_SECONDS = int(os.getenv("CALENDAR_MIRROR_MAX_AGE_SECONDS", "300"))  # Más viejo que esto no se usa
+CALENDAR_MIRROR_PAST_DAYS = int(os.getenv("CALENDAR_MIRROR_PAST_DAYS", "1"))  # Días pasados que baja la sincronización completa
+# URL pública (HTTPS) para notificaciones push de Google Calendar, ej: https://tu-dominio.com/calendar/notifications
+CALENDAR_WEBHOOK_URL = os.getenv("CALENDAR_WEBHOOK_URL", "")
+CALENDAR_WEBHOOK_TOKEN = os.getenv("CALENDAR_WEBHOOK_TOKEN", "")
+
 # Validación (comentada para desarrollo - descomentar en producción)
 # if not PLAYTOMIC_EMAIL or not PLAYTOMIC_PASSWORD:
 #     raise ValueError("PLAYTOMIC_EMAIL y PLAYTOMIC_PASSWORD deben estar configurados en .env")
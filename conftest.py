@@ -0,0 +1,22 @@
+"""
+Entorno común de las pruebas
+config.py lee las variables de entorno al importarse, así que la base de datos
+SQLite temporal se configura aquí, antes que cualquier módulo de prueba. El Google
+Calendar falso es un fixture de sesión que solo piden las pruebas de Calendar
+"""
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/pruebas.db")
+
+
+@pytest.fixture(scope="session")
+def fake_calendar():
+    """Servidor falso de Google Calendar y cliente que apunta a él (ver testing_support.py)"""
+    from testing_support import start_fake_calendar, stop_fake_calendar
+
+    fake = start_fake_calendar()
+    yield fake
+    stop_fake_calendar(fake)
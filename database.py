@@ -1,12 +1,15 @@
 """
 Modelos de base de datos para el sistema de reservas
 """
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import create_engine, inspect, text, Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
+import logging
 from config import DATABASE_URL
 
+logger = logging.getLogger(__name__)
+
 Base = declarative_base()
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -30,6 +33,15 @@ class User(Base):
 class Reservation(Base):
     """Reserva de cancha de pádel"""
     __tablename__ = "reservations"
+    __table_args__ = (
+        # Una sola reserva activa por cancha y hora de inicio
+        Index(
+            "uq_reservations_active_slot", "court_name", "date",
+            unique=True,
+            sqlite_where=text("status != 'cancelled'"),
+            postgresql_where=text("status != 'cancelled'"),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -47,8 +59,84 @@ class Reservation(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     notes = Column(Text, nullable=True)
+    # Clave determinística (cancha + hora + teléfono): evita reservas duplicadas al reintentar.
+    # También es el ID del evento en Google Calendar
+    idempotency_key = Column(String, unique=True, index=True, nullable=True)
+    # Sincronización con Google Calendar en segundo plano (ver calendar_sync.py)
+    calendar_sync_status = Column(String, nullable=True, index=True)  # pending, synced, failed (None = legacy)
+    calendar_sync_attempts = Column(Integer, default=0)
+    calendar_sync_error = Column(Text, nullable=True)
+    calendar_sync_next_at = Column(DateTime, nullable=True)  # UTC, próximo reintento
     
     user = relationship("User", back_populates="reservations")
+    slots = relationship("SlotLedger", back_populates="reservation", cascade="all, delete-orphan")
+
+
+class SlotLedger(Base):
+    """
+    Bloques de 15 minutos tomados por cancha (ver reservation_ledger.py)
+    
+    La restricción única (cancha, inicio del bloque) impide que dos reservas se
+    solapen aunque las escriban procesos distintos al mismo tiempo. Los bloques sin
+    reserva son retenciones temporales (holder + expires_at) mientras el usuario
+    confirma (ver slot_holds.py).
+    """
+    __tablename__ = "slot_ledger"
+    __table_args__ = (
+        UniqueConstraint("court_name", "slot_start", name="uq_slot_ledger_court_slot"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    court_name = Column(String, nullable=False)
+    slot_start = Column(DateTime, nullable=False)  # Hora local, múltiplo de 15 minutos
+    reservation_id = Column(Integer, ForeignKey("reservations.id"), nullable=True, index=True)
+    holder = Column(String, nullable=True, index=True)  # Teléfono del usuario que retiene el bloque
+    expires_at = Column(DateTime, nullable=True)  # UTC; solo en retenciones
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    reservation = relationship("Reservation", back_populates="slots")
+
+
+class AvailabilityScrape(Base):
+    """Última lectura del scraper para cada fecha (ver availability_store.py)"""
+    __tablename__ = "availability_scrapes"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    date = Column(String, unique=True, index=True, nullable=False)  # YYYY-MM-DD
+    scraped_at = Column(DateTime, nullable=False)  # UTC
+    changed_at = Column(DateTime, nullable=True)  # UTC, último scraping que cambió algún horario
+    slot_count = Column(Integer, default=0)
+
+
+class AvailabilitySlot(Base):
+    """Horario libre de una cancha según el scraper de Playtomic"""
+    __tablename__ = "availability_slots"
+    __table_args__ = (
+        Index("ix_availability_slots_date_time", "date", "time"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    date = Column(String, nullable=False)  # YYYY-MM-DD
+    time = Column(String, nullable=False)  # HH:MM
+    court_name = Column(String, nullable=False)
+    price = Column(String, nullable=True)
+    scraped_at = Column(DateTime, nullable=False)  # UTC, scraping en que apareció
+
+
+class AvailabilityChange(Base):
+    """Horario que se liberó u ocupó entre dos scrapings de una fecha"""
+    __tablename__ = "availability_changes"
+    __table_args__ = (
+        Index("ix_availability_changes_date_time", "date", "time"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    date = Column(String, nullable=False)  # YYYY-MM-DD
+    time = Column(String, nullable=False)  # HH:MM
+    court_name = Column(String, nullable=False)
+    change = Column(String, nullable=False)  # opened, taken
+    price = Column(String, nullable=True)
+    detected_at = Column(DateTime, nullable=False, index=True)  # UTC
 
 
 class ConversationState(Base):
@@ -62,9 +150,75 @@ class ConversationState(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class CalendarEvent(Base):
+    """Copia local de un evento de Google Calendar (mirror incremental)"""
+    __tablename__ = "calendar_events"
+    __table_args__ = (
+        UniqueConstraint("calendar_id", "event_id", name="uq_calendar_event"),
+        Index("ix_calendar_events_range", "calendar_id", "start_time", "end_time"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    calendar_id = Column(String, nullable=False)
+    event_id = Column(String, nullable=False)
+    summary = Column(String, nullable=True)
+    start_time = Column(DateTime, nullable=False)  # UTC
+    end_time = Column(DateTime, nullable=False)  # UTC
+    all_day = Column(Boolean, default=False)
+    updated = Column(String, nullable=True)  # Campo 'updated' del evento (RFC3339)
+
+
+class CalendarSyncState(Base):
+    """Estado de sincronización incremental de un calendario"""
+    __tablename__ = "calendar_sync_states"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    calendar_id = Column(String, unique=True, index=True, nullable=False)
+    sync_token = Column(String, nullable=True)  # nextSyncToken de la última sincronización
+    last_synced_at = Column(DateTime, nullable=True)
+    channel_id = Column(String, nullable=True, index=True)  # Canal de notificaciones push
+    channel_resource_id = Column(String, nullable=True)
+    channel_expiration = Column(DateTime, nullable=True)
+    reconciled_at = Column(DateTime, nullable=True)  # UTC; marca de agua de calendar_reconciliation.py
+
+
+def _add_missing_columns():
+    """
+    Agregar a las tablas existentes las columnas nuevas de los modelos
+    
+    create_all() no modifica tablas que ya existen; las columnas nuevas son
+    opcionales, así que basta con un ALTER TABLE ADD COLUMN.
+    """
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing = [column for column in table.columns if column.name not in existing]
+        if not missing:
+            continue
+        with engine.begin() as connection:
+            for column in missing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+
+def _add_missing_indexes():
+    """Crear los índices nuevos de tablas existentes (create_all() solo los crea con la tabla)"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                # Ej. un índice único sobre datos que ya tienen duplicados
+                logger.warning(f"⚠️  No se pudo crear el índice {index.name}: {e}")
+
+
 def init_db():
     """Inicializar la base de datos creando las tablas"""
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    _add_missing_indexes()
 
 
 def get_db():
@@ -0,0 +1,473 @@
+"""
+Servidor local que imita Google Calendar API v3 para pruebas y benchmarks sin red
+Implementa events (insert/list/get/update/patch/delete/watch), freeBusy, calendarList
+y el endpoint batch, guardando todo en memoria. Permite inyectar latencia y errores.
+
+Uso:
+    python fake_calendar_server.py --port 8085 --latency-ms 80 --rate-limit-rate 0.05
+    GOOGLE_CALENDAR_API_ENDPOINT=http://localhost:8085/ python main.py
+
+Configuración en caliente:
+    POST /_fake/config  {"latency_ms": 50, "error_rate": 0.1, "max_qps": 20}
+    POST /_fake/reset   Borra eventos y estadísticas
+    GET  /_fake/stats   Peticiones atendidas y errores inyectados
+
+El parámetro `fields` se acepta pero se ignora: siempre se devuelve el recurso completo.
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from email.parser import BytesParser
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from flask import Flask, Response, request
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = '/calendar/v3'
+BATCH_PATH = '/batch/calendar/v3'
+# Cabecera interna para distinguir las peticiones que vienen dentro de un batch
+BATCH_ITEM_HEADER = 'X-Fake-Batch-Item'
+
+
+class FakeCalendarConfig:
+    """Latencia y errores inyectados (se pueden cambiar mientras el servidor corre)"""
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        latency_jitter_ms: float = 0,
+        error_rate: float = 0,
+        rate_limit_rate: float = 0,
+        max_qps: int = 0,
+        freebusy_error_calendar: str = ''
+    ):
+        self.latency_ms = latency_ms  # Latencia fija por petición HTTP
+        self.latency_jitter_ms = latency_jitter_ms  # Latencia aleatoria adicional (0..jitter)
+        self.error_rate = error_rate  # Fracción de peticiones que responden 500 backendError
+        self.rate_limit_rate = rate_limit_rate  # Fracción que responde 403 rateLimitExceeded
+        self.max_qps = max_qps  # Peticiones por segundo antes de responder 429 (0 = sin límite)
+        self.freebusy_error_calendar = freebusy_error_calendar  # Calendario que FreeBusy responde con errors
+
+    def update(self, values: Dict[str, Any]):
+        for key, value in values.items():
+            if hasattr(self, key):
+                setattr(self, key, type(getattr(self, key))(value))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class FakeCalendarStore:
+    """Eventos en memoria por calendario, con números de secuencia para syncToken"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        self.sequence = 0
+
+    def next_sequence(self) -> int:
+        self.sequence += 1
+        return self.sequence
+
+
+def _now_rfc3339() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def _parse_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _event_time(value: Dict[str, Any]) -> Optional[datetime]:
+    """Inicio/fin de un evento como datetime con zona horaria"""
+    if value.get('dateTime'):
+        parsed = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=ZoneInfo(value.get('timeZone') or 'UTC'))
+        return parsed
+    if value.get('date'):
+        return datetime.fromisoformat(value['date']).replace(tzinfo=timezone.utc)
+    return None
+
+
+def _public(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Evento sin los campos internos del servidor"""
+    return {key: value for key, value in event.items() if not key.startswith('_')}
+
+
+def _error(status: int, reason: str, message: str) -> Response:
+    body = {
+        'error': {
+            'code': status,
+            'message': message,
+            'errors': [{'domain': 'global', 'reason': reason, 'message': message}],
+        }
+    }
+    return Response(json.dumps(body), status=status, mimetype='application/json')
+
+
+def _json(data: Any, status: int = 200) -> Response:
+    return Response(json.dumps(data), status=status, mimetype='application/json')
+
+
+def create_app(config: Optional[FakeCalendarConfig] = None) -> Flask:
+    """
+    Crear la aplicación Flask del servidor falso
+
+    Args:
+        config: Latencia y errores a inyectar (opcional)
+    """
+    app = Flask(__name__)
+    config = config or FakeCalendarConfig()
+    store = FakeCalendarStore()
+    stats = defaultdict(int)
+    stats_lock = threading.Lock()
+    qps_window = {'second': 0, 'count': 0}
+    app.config['FAKE_CALENDAR_CONFIG'] = config
+    app.config['FAKE_CALENDAR_STORE'] = store
+
+    def count(key: str):
+        with stats_lock:
+            stats[key] += 1
+
+    @app.before_request
+    def inject_latency_and_errors():
+        if request.path.startswith('/_fake'):
+            return None
+        is_batch_item = request.headers.get(BATCH_ITEM_HEADER) == '1'
+        if request.path != BATCH_PATH:
+            count('requests')
+
+        # La latencia se paga una vez por petición HTTP (un batch completo cuenta como una)
+        if not is_batch_item and (config.latency_ms or config.latency_jitter_ms):
+            time.sleep((config.latency_ms + random.uniform(0, config.latency_jitter_ms)) / 1000)
+
+        # Los errores se inyectan por operación, igual que la cuota de Google
+        if request.path == BATCH_PATH:
+            return None
+        if config.max_qps:
+            with stats_lock:
+                second = int(time.monotonic())
+                if qps_window['second'] != second:
+                    qps_window['second'] = second
+                    qps_window['count'] = 0
+                qps_window['count'] += 1
+                over_quota = qps_window['count'] > config.max_qps
+            if over_quota:
+                count('rate_limited')
+                return _error(429, 'rateLimitExceeded', 'Rate Limit Exceeded')
+        if config.rate_limit_rate and random.random() < config.rate_limit_rate:
+            count('rate_limited')
+            return _error(403, 'rateLimitExceeded', 'Rate Limit Exceeded')
+        if config.error_rate and random.random() < config.error_rate:
+            count('server_errors')
+            return _error(500, 'backendError', 'Backend Error')
+        return None
+
+    # ---------------------------------------------------------------- events
+
+    @app.route(f'{API_PREFIX}/calendars/<calendar_id>/events', methods=['POST'])
+    def insert_event(calendar_id):
+        body = request.get_json(force=True) or {}
+        event_id = body.get('id') or uuid.uuid4().hex
+        with store.lock:
+            if event_id in store.events[calendar_id]:
+                # Google responde 409 aunque el evento esté cancelado
+                return _error(409, 'duplicate', 'The requested identifier already exists.')
+            now = _now_rfc3339()
+            event = dict(body)
+            event.update({
+                'kind': 'calendar#event',
+                'id': event_id,
+                'status': body.get('status', 'confirmed'),
+                'htmlLink': f'{request.host_url}calendar/event?eid={event_id}',
+                'created': now,
+                'updated': now,
+                'etag': f'"{store.next_sequence()}"',
+                '_sequence': store.sequence,
+            })
+            store.events[calendar_id][event_id] = event
+            count('events_inserted')
+            return _json(_public(event))
+
+    @app.route(f'{API_PREFIX}/calendars/<calendar_id>/events', methods=['GET'])
+    def list_events(calendar_id):
+        sync_token = request.args.get('syncToken')
+        page_token = request.args.get('pageToken')
+        max_results = int(request.args.get('maxResults', 250))
+        show_deleted = request.args.get('showDeleted') == 'true' or bool(sync_token)
+        time_min = _parse_time(request.args['timeMin']) if request.args.get('timeMin') else None
+        time_max = _parse_time(request.args['timeMax']) if request.args.get('timeMax') else None
+        updated_min = _parse_time(request.args['updatedMin']) if request.args.get('updatedMin') else None
+
+        with store.lock:
+            if sync_token and not sync_token.isdigit():
+                return _error(410, 'fullSyncRequired', 'Sync token is no longer valid, a full sync is required.')
+            since = int(sync_token) if sync_token else 0
+            items = []
+            for event in store.events[calendar_id].values():
+                if event['_sequence'] <= since:
+                    continue
+                if event.get('status') == 'cancelled' and not show_deleted:
+                    continue
+                if updated_min and _parse_time(event['updated']) < updated_min:
+                    continue
+                start = _event_time(event.get('start', {}))
+                end = _event_time(event.get('end', {}))
+                if time_min and end and end <= time_min:
+                    continue
+                if time_max and start and start >= time_max:
+                    continue
+                items.append(event)
+            current_sequence = store.sequence
+
+        if request.args.get('orderBy') == 'startTime':
+            items.sort(key=lambda event: _event_time(event.get('start', {})) or datetime.min.replace(tzinfo=timezone.utc))
+        else:
+            items.sort(key=lambda event: event['_sequence'])
+
+        offset = int(page_token) if page_token else 0
+        page = items[offset:offset + max_results]
+        result = {
+            'kind': 'calendar#events',
+            'summary': calendar_id,
+            'updated': _now_rfc3339(),
+            'items': [_public(event) for event in page],
+        }
+        if offset + max_results < len(items):
+            result['nextPageToken'] = str(offset + max_results)
+        else:
+            result['nextSyncToken'] = str(current_sequence)
+        return _json(result)
+
+    @app.route(f'{API_PREFIX}/calendars/<calendar_id>/events/<event_id>', methods=['GET'])
+    def get_event(calendar_id, event_id):
+        with store.lock:
+            event = store.events[calendar_id].get(event_id)
+            if event is None:
+                return _error(404, 'notFound', 'Not Found')
+            return _json(_public(event))
+
+    @app.route(f'{API_PREFIX}/calendars/<calendar_id>/events/<event_id>', methods=['PUT', 'PATCH'])
+    def update_event(calendar_id, event_id):
+        body = request.get_json(force=True) or {}
+        with store.lock:
+            event = store.events[calendar_id].get(event_id)
+            if event is None:
+                return _error(404, 'notFound', 'Not Found')
+            if request.method == 'PUT':
+                kept = {key: event[key] for key in ('kind', 'id', 'htmlLink', 'created')}
+                event.clear()
+                event.update(kept)
+                event['status'] = 'confirmed'
+            event.update({key: value for key, value in body.items() if key != 'id'})
+            event['updated'] = _now_rfc3339()
+            event['etag'] = f'"{store.next_sequence()}"'
+            event['_sequence'] = store.sequence
+            count('events_updated')
+            return _json(_public(event))
+
+    @app.route(f'{API_PREFIX}/calendars/<calendar_id>/events/<event_id>', methods=['DELETE'])
+    def delete_event(calendar_id, event_id):
+        with store.lock:
+            event = store.events[calendar_id].get(event_id)
+            if event is None:
+                return _error(404, 'notFound', 'Not Found')
+            if event.get('status') == 'cancelled':
+                return _error(410, 'deleted', 'Resource has been deleted')
+            # Igual que Google: el evento queda cancelado (visible con showDeleted/syncToken)
+            event['status'] = 'cancelled'
+            event['updated'] = _now_rfc3339()
+            event['_sequence'] = store.next_sequence()
+            count('events_deleted')
+            return Response(status=204)
+
+    @app.route(f'{API_PREFIX}/calendars/<calendar_id>/events/watch', methods=['POST'])
+    def watch_events(calendar_id):
+        body = request.get_json(force=True) or {}
+        expiration = int((time.time() + 7 * 24 * 3600) * 1000)
+        return _json({
+            'kind': 'api#channel',
+            'id': body.get('id'),
+            'resourceId': uuid.uuid4().hex,
+            'resourceUri': f'{request.host_url}calendar/v3/calendars/{calendar_id}/events',
+            'expiration': str(expiration),
+        })
+
+    # ------------------------------------------------------ freeBusy / lists
+
+    @app.route(f'{API_PREFIX}/freeBusy', methods=['POST'])
+    def freebusy():
+        body = request.get_json(force=True) or {}
+        time_min = _parse_time(body['timeMin'])
+        time_max = _parse_time(body['timeMax'])
+        calendars = {}
+        with store.lock:
+            for item in body.get('items', []):
+                calendar_id = item['id']
+                if calendar_id == config.freebusy_error_calendar:
+                    calendars[calendar_id] = {'errors': [{'domain': 'global', 'reason': 'notFound'}], 'busy': []}
+                    continue
+                intervals: List[Tuple[datetime, datetime]] = []
+                for event in store.events[calendar_id].values():
+                    if event.get('status') == 'cancelled' or event.get('transparency') == 'transparent':
+                        continue
+                    start = _event_time(event.get('start', {}))
+                    end = _event_time(event.get('end', {}))
+                    if start and end and start < time_max and end > time_min:
+                        intervals.append((max(start, time_min), min(end, time_max)))
+                # FreeBusy devuelve los intervalos fusionados
+                merged: List[List[datetime]] = []
+                for start, end in sorted(intervals):
+                    if merged and start <= merged[-1][1]:
+                        merged[-1][1] = max(merged[-1][1], end)
+                    else:
+                        merged.append([start, end])
+                calendars[calendar_id] = {
+                    'busy': [
+                        {
+                            'start': start.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                            'end': end.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                        }
+                        for start, end in merged
+                    ]
+                }
+        return _json({
+            'kind': 'calendar#freeBusy',
+            'timeMin': body['timeMin'],
+            'timeMax': body['timeMax'],
+            'calendars': calendars,
+        })
+
+    @app.route(f'{API_PREFIX}/users/me/calendarList', methods=['GET'])
+    def calendar_list():
+        with store.lock:
+            calendar_ids = sorted(store.events.keys()) or ['primary']
+        return _json({
+            'kind': 'calendar#calendarList',
+            'items': [
+                {'id': calendar_id, 'summary': calendar_id, 'accessRole': 'owner', 'primary': calendar_id == 'primary'}
+                for calendar_id in calendar_ids
+            ],
+        })
+
+    # ----------------------------------------------------------------- batch
+
+    @app.route(BATCH_PATH, methods=['POST'])
+    def batch():
+        content_type = request.headers.get('Content-Type', '')
+        message = BytesParser().parsebytes(
+            f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8') + request.get_data()
+        )
+        if not message.is_multipart():
+            return _error(400, 'badRequest', 'Batch request must be multipart/mixed')
+
+        boundary = f'batch_{uuid.uuid4().hex}'
+        parts = []
+        client = app.test_client()
+        for part in message.get_payload():
+            raw = part.get_payload()
+            if isinstance(raw, list):
+                raw = raw[0].as_string()
+            head, _, body = raw.replace('\r\n', '\n').partition('\n\n')
+            request_line, *header_lines = head.split('\n')
+            method, path, _ = request_line.split(' ', 2)
+            headers = {BATCH_ITEM_HEADER: '1'}
+            for line in header_lines:
+                name, _, value = line.partition(':')
+                if name.lower() not in ('content-length', 'host'):
+                    headers[name.strip()] = value.strip()
+
+            response = client.open(path, method=method, data=body.encode('utf-8'), headers=headers)
+            content_id = part.get('Content-ID', '<>')
+            parts.append(
+                f'--{boundary}\r\n'
+                f'Content-Type: application/http\r\n'
+                f'Content-ID: <response-{content_id[1:-1]}>\r\n\r\n'
+                f'HTTP/1.1 {response.status}\r\n'
+                f'Content-Type: application/json; charset=UTF-8\r\n\r\n'
+                f'{response.get_data(as_text=True)}\r\n'
+            )
+        count('batches')
+        payload = ''.join(parts) + f'--{boundary}--\r\n'
+        return Response(payload, status=200, content_type=f'multipart/mixed; boundary={boundary}')
+
+    # -------------------------------------------------------------- control
+
+    @app.route('/_fake/config', methods=['GET', 'POST'])
+    def fake_config():
+        if request.method == 'POST':
+            config.update(request.get_json(force=True) or {})
+            logger.info(f"⚙️  Configuración actualizada: {config.to_dict()}")
+        return _json(config.to_dict())
+
+    @app.route('/_fake/reset', methods=['POST'])
+    def fake_reset():
+        with store.lock:
+            store.events.clear()
+            store.sequence = 0
+        with stats_lock:
+            stats.clear()
+        return _json({'ok': True})
+
+    @app.route('/_fake/stats', methods=['GET'])
+    def fake_stats():
+        with stats_lock:
+            data = dict(stats)
+        with store.lock:
+            data['events'] = sum(len(events) for events in store.events.values())
+        return _json(data)
+
+    return app
+
+
+def start_fake_calendar_server(host: str = '127.0.0.1', port: int = 0, config: Optional[FakeCalendarConfig] = None):
+    """
+    Iniciar el servidor en un thread daemon (para scripts de prueba)
+
+    Returns:
+        (servidor, URL base terminada en "/") - detener con servidor.shutdown()
+    """
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, create_app(config), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True, name='fake-calendar')
+    thread.start()
+    return server, f'http://{host}:{server.server_port}/'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor local que imita Google Calendar API v3')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8085)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Latencia fija por petición')
+    parser.add_argument('--latency-jitter-ms', type=float, default=0, help='Latencia aleatoria adicional')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fracción de respuestas 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0, help='Fracción de respuestas 403 rateLimitExceeded')
+    parser.add_argument('--max-qps', type=int, default=0, help='Peticiones por segundo antes de responder 429')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    config = FakeCalendarConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        max_qps=args.max_qps
+    )
+    logger.info(f"🧪 Google Calendar falso en http://{args.host}:{args.port}/ ({config.to_dict()})")
+    create_app(config).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,40 +3,251 @@ Cliente para Google Calendar API
 Maneja la autenticación y creación de eventos en Google Calendar
 """
 import os
+import json
+import hashlib
 import pickle
 import logging
+import tempfile
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Callable
 from dateutil.parser import parse as parse_date
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from googleapiclient.errors import HttpError
+from calendar_busy_index import BusyIntervalIndex
+from calendar_rate_limiter import AdaptiveRateLimiter, backoff_delay
+from slot_bitmap import DayBitmap
+from single_flight import SingleFlight
 from config import (
     GOOGLE_CREDENTIALS_FILE,
     GOOGLE_TOKEN_FILE,
+    GOOGLE_LEGACY_TOKEN_FILE,
+    GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS,
     GOOGLE_CALENDAR_ID,
+    GOOGLE_CALENDAR_API_ENDPOINT,
     COURT_CALENDAR_MAPPING,
-    TIMEZONE
+    TIMEZONE,
+    CALENDAR_MAX_WORKERS,
+    CALENDAR_BUSY_CACHE_TTL_SECONDS,
+    COURT_HOURS,
+    SLOT_STEP_MINUTES,
+    CALENDAR_HTTP_TIMEOUT_SECONDS,
+    CALENDAR_MAX_RETRIES,
+    CALENDAR_BACKOFF_BASE_SECONDS,
+    CALENDAR_BACKOFF_MAX_SECONDS,
+    CALENDAR_MAX_CONCURRENCY
 )
 import pytz
+import httplib2
 
 # Scopes necesarios para Google Calendar
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
+# Máximo de peticiones por lote que acepta el endpoint batch de Google Calendar
+BATCH_MAX_REQUESTS = 50
+
+# Proyecciones (partial response): cada llamada pide solo los campos que usa.
+# La respuesta además llega comprimida: googleapiclient envía Accept-Encoding gzip
+EVENT_FIELDS = 'id,htmlLink,summary,start,end'
+EVENT_LIST_FIELDS = 'items(id,summary,status,transparency,start,end,htmlLink)'
+CALENDAR_LIST_FIELDS = 'items(id,summary,primary,accessRole,timeZone)'
+FREEBUSY_FIELDS = 'calendars'
+
+# Motivos de un 403 que indican límite de velocidad (se reintenta con backoff)
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+# Motivos de un 403 que indican cuota diaria agotada (no tiene sentido reintentar)
+QUOTA_EXCEEDED_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+
 logger = logging.getLogger(__name__)
 
 
+class CalendarError(Exception):
+    """Error de Google Calendar que los llamadores deben distinguir de una respuesta vacía"""
+    
+    def __init__(self, message: str, status: Optional[int] = None, reason: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+
+
+class CalendarRateLimitError(CalendarError):
+    """Cuota de Google Calendar agotada (persistió tras los reintentos con backoff)"""
+
+
+class CalendarUnavailableError(CalendarError):
+    """Google Calendar no respondió o devolvió errores 5xx tras los reintentos"""
+
+
+# Documento de discovery de Calendar v3, cargado una sola vez por proceso
+_discovery_documents: Dict[str, Dict[str, Any]] = {}
+_discovery_lock = threading.Lock()
+
+
+def _get_discovery_document(api_endpoint: str = '') -> Optional[Dict[str, Any]]:
+    """
+    Obtener el documento de discovery incluido en google-api-python-client
+    
+    Evita descargarlo de la red y parsear ~130 KB de JSON cada vez que se construye
+    un servicio (uno por thread).
+    """
+    if api_endpoint not in _discovery_documents:
+        with _discovery_lock:
+            if api_endpoint not in _discovery_documents:
+                document = get_static_doc('calendar', 'v3')
+                if not document:
+                    return None
+                document = json.loads(document)
+                if api_endpoint:
+                    # rootUrl también define la URL del endpoint batch
+                    root_url = api_endpoint.rstrip('/') + '/'
+                    document['rootUrl'] = root_url
+                    document['baseUrl'] = root_url + document['servicePath']
+                _discovery_documents[api_endpoint] = document
+    return _discovery_documents[api_endpoint]
+
+
+def _build_service(api_endpoint: str = '', **kwargs):
+    """Construir el servicio de Calendar usando el documento de discovery local"""
+    document = _get_discovery_document(api_endpoint)
+    if document is None:
+        if api_endpoint:
+            kwargs['client_options'] = {'api_endpoint': api_endpoint}
+        return build('calendar', 'v3', cache_discovery=False, **kwargs)
+    return build_from_document(document, **kwargs)
+
+
+def _save_credentials(creds: Credentials, path: str):
+    """Guardar credenciales como JSON de forma atómica (archivo temporal + rename)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.token-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as token:
+            token.write(creds.to_json())
+            token.flush()
+            os.fsync(token.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _load_credentials() -> Optional[Credentials]:
+    """
+    Cargar credenciales guardadas
+    
+    Lee el token JSON; si no existe, migra el token.pickle legado al formato JSON.
+    """
+    if os.path.exists(GOOGLE_TOKEN_FILE):
+        try:
+            return Credentials.from_authorized_user_file(GOOGLE_TOKEN_FILE, SCOPES)
+        except (ValueError, UnicodeDecodeError):
+            # GOOGLE_TOKEN_FILE todavía apunta a un token en formato pickle
+            legacy_file = GOOGLE_TOKEN_FILE
+    else:
+        legacy_file = GOOGLE_LEGACY_TOKEN_FILE
+    
+    if legacy_file and os.path.exists(legacy_file):
+        with open(legacy_file, 'rb') as token:
+            creds = pickle.load(token)
+        _save_credentials(creds, GOOGLE_TOKEN_FILE)
+        logger.info(f"🔄 Token migrado de {legacy_file} a {GOOGLE_TOKEN_FILE}")
+        return creds
+    
+    return None
+
+
+def reservation_event_id(court_name: str, start_datetime: datetime, phone_number: str) -> str:
+    """
+    ID determinístico de una reserva (cancha + inicio + teléfono)
+    
+    Se usa como ID del evento en Google Calendar y como clave única en la tabla
+    de reservas: reintentar la misma reserva no crea duplicados. El hash en
+    hexadecimal cumple el formato de IDs de Calendar (base32hex, 5-1024 caracteres).
+    """
+    if start_datetime.tzinfo is None:
+        start_datetime = pytz.timezone(TIMEZONE).localize(start_datetime)
+    start_utc = start_datetime.astimezone(pytz.utc).strftime('%Y%m%dT%H%M')
+    key = f"{court_name.upper()}|{start_utc}|{phone_number}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def _new_http() -> httplib2.Http:
+    """Transporte HTTP con timeout para no quedar bloqueados en una petición colgada"""
+    return httplib2.Http(timeout=CALENDAR_HTTP_TIMEOUT_SECONDS)
+
+
+def _error_reason(error: HttpError) -> Optional[str]:
+    """Motivo (campo `reason`) de un HttpError de Google, si viene en la respuesta"""
+    try:
+        details = json.loads(error.content.decode('utf-8')).get('error', {})
+    except (ValueError, AttributeError):
+        return None
+    errors = details.get('errors') or []
+    if errors:
+        return errors[0].get('reason')
+    return details.get('status')
+
+
+def _is_rate_limited(status: int, reason: Optional[str]) -> bool:
+    return status == 429 or (status == 403 and reason in RATE_LIMIT_REASONS)
+
+
+def _parse_rfc3339(value: str) -> datetime:
+    """Parsear una fecha RFC3339 devuelta por la API (ej. '2024-12-15T18:00:00Z')"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
 class GoogleCalendarClient:
     """
     Cliente para interactuar con Google Calendar API
+    
+    Los errores puntuales se registran y se devuelve None/[]/False como siempre,
+    pero si la cuota sigue agotada o Google no responde tras los reintentos se
+    lanza CalendarRateLimitError / CalendarUnavailableError para que el llamador
+    no lo confunda con "no hay disponibilidad".
     """
     
-    def __init__(self):
+    def __init__(self, api_endpoint: Optional[str] = None):
+        """
+        Args:
+            api_endpoint: URL de un servidor compatible con la API (ej. fake_calendar_server.py);
+                por defecto GOOGLE_CALENDAR_API_ENDPOINT, y vacío usa Google
+        """
+        self.api_endpoint = GOOGLE_CALENDAR_API_ENDPOINT if api_endpoint is None else api_endpoint
         self.service = None
         self.credentials = None
         self.authenticated = False
+        # httplib2 no es thread-safe: cada thread usa su propio servicio/transporte
+        self._local = threading.local()
+        # Executor acotado para las llamadas bloqueantes desde código asíncrono
+        self.executor = ThreadPoolExecutor(
+            max_workers=CALENDAR_MAX_WORKERS,
+            thread_name_prefix="google-calendar"
+        )
+        # Intervalos ocupados por calendario y día, invalidados en nuestras escrituras
+        self.busy_index = BusyIntervalIndex(ttl_seconds=CALENDAR_BUSY_CACHE_TTL_SECONDS)
+        # Lecturas idénticas concurrentes comparten una sola llamada a la API
+        self.single_flight = SingleFlight()
+        # Concurrencia adaptativa compartida por todas las llamadas (AIMD sobre errores de cuota)
+        self.rate_limiter = AdaptiveRateLimiter(
+            initial_limit=CALENDAR_MAX_WORKERS,
+            max_limit=CALENDAR_MAX_CONCURRENCY
+        )
+        # Mirror local sincronizado incrementalmente (ver calendar_mirror.py), opcional
+        self.mirror = None
+        # Refresco proactivo del token en segundo plano
+        self._refresh_timer: Optional[threading.Timer] = None
+        self._credentials_lock = threading.Lock()
         
     def authenticate(self) -> bool:
         """
@@ -45,13 +256,18 @@ class GoogleCalendarClient:
         Returns:
             bool: True si la autenticación fue exitosa
         """
+        if self.api_endpoint:
+            # Servidor local de pruebas (fake_calendar_server.py): no usa OAuth
+            self.service = _build_service(self.api_endpoint, http=_new_http())
+            self.authenticated = True
+            self._local = threading.local()
+            self._local.service = self.service
+            logger.info(f"🧪 Usando Google Calendar en {self.api_endpoint}")
+            return True
+        
         try:
-            creds = None
-            
             # Cargar token existente si existe
-            if os.path.exists(GOOGLE_TOKEN_FILE):
-                with open(GOOGLE_TOKEN_FILE, 'rb') as token:
-                    creds = pickle.load(token)
+            creds = _load_credentials()
             
             # Si no hay credenciales válidas, autenticar
             if not creds or not creds.valid:
@@ -70,13 +286,17 @@ class GoogleCalendarClient:
                     creds = flow.run_local_server(port=0)
                 
                 # Guardar token para futuras ejecuciones
-                with open(GOOGLE_TOKEN_FILE, 'wb') as token:
-                    pickle.dump(creds, token)
+                _save_credentials(creds, GOOGLE_TOKEN_FILE)
             
             # Construir servicio de Google Calendar
-            self.service = build('calendar', 'v3', credentials=creds)
+            self.service = _build_service(http=AuthorizedHttp(creds, http=_new_http()))
             self.credentials = creds
             self.authenticated = True
+            self._schedule_token_refresh()
+            
+            # El servicio recién construido pertenece al thread que autenticó
+            self._local = threading.local()
+            self._local.service = self.service
             
             logger.info("✅ Autenticación con Google Calendar exitosa")
             return True
@@ -86,6 +306,122 @@ class GoogleCalendarClient:
             self.authenticated = False
             return False
     
+    def _schedule_token_refresh(self, delay: Optional[float] = None):
+        """
+        Programar el refresco del token antes de que expire
+        
+        Así ninguna petición del bot paga el refresco síncrono del token.
+        """
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+        
+        if delay is None:
+            expiry = self.credentials.expiry if self.credentials else None
+            if not expiry or not self.credentials.refresh_token:
+                return
+            # `expiry` de google-auth es UTC sin tzinfo
+            seconds_left = (expiry - datetime.utcnow()).total_seconds()
+            delay = max(0, seconds_left - GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS)
+        
+        self._refresh_timer = threading.Timer(delay, self._refresh_token)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+    
+    def _refresh_token(self):
+        """Refrescar el token en segundo plano y guardarlo"""
+        try:
+            with self._credentials_lock:
+                self.credentials.refresh(Request())
+                _save_credentials(self.credentials, GOOGLE_TOKEN_FILE)
+            logger.info("🔄 Token de Google Calendar refrescado")
+            self._schedule_token_refresh()
+        except Exception as e:
+            logger.warning(f"⚠️  No se pudo refrescar el token de Google Calendar: {e}")
+            # Reintentar en un minuto; mientras tanto el transporte refresca al recibir un 401
+            self._schedule_token_refresh(delay=60)
+    
+    def _get_service(self):
+        """
+        Obtener el servicio de Google Calendar del thread actual
+        
+        Cada thread construye su propio servicio con un transporte HTTP autorizado
+        independiente, porque httplib2.Http no se puede compartir entre threads.
+        """
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            http = AuthorizedHttp(self.credentials, http=_new_http()) if self.credentials else _new_http()
+            service = _build_service(self.api_endpoint, http=http)
+            self._local.service = service
+        return service
+    
+    def _execute(self, request, idempotent: bool = True) -> Any:
+        """
+        Ejecutar una petición de la API respetando el limitador y reintentando con backoff
+        
+        Los errores de cuota (429 / 403 rateLimitExceeded) reducen la concurrencia y
+        se reintentan siempre: Google no procesó la petición. Los errores 5xx y de red
+        solo se reintentan si la petición es idempotente (ej. un insert sin ID podría
+        haberse aplicado). El resto de HttpError (404, 409...) se propaga tal cual.
+        
+        Raises:
+            CalendarRateLimitError: La cuota sigue agotada tras CALENDAR_MAX_RETRIES
+            CalendarUnavailableError: Google sigue fallando tras CALENDAR_MAX_RETRIES
+            HttpError: Errores que no son de cuota ni del servidor
+        """
+        attempt = 0
+        while True:
+            retry_after = None
+            with self.rate_limiter:
+                try:
+                    result = request.execute()
+                    self.rate_limiter.on_success()
+                    return result
+                except HttpError as e:
+                    status = e.resp.status
+                    reason = _error_reason(e)
+                    if status == 403 and reason in QUOTA_EXCEEDED_REASONS:
+                        raise CalendarRateLimitError(f"Cuota diaria de Google Calendar agotada: {reason}", status, reason) from e
+                    if _is_rate_limited(status, reason):
+                        self.rate_limiter.on_throttled()
+                        error = CalendarRateLimitError(f"Límite de velocidad de Google Calendar: {reason or status}", status, reason)
+                        retry_after = e.resp.get('retry-after')
+                    elif status >= 500 and idempotent:
+                        error = CalendarUnavailableError(f"Google Calendar devolvió {status}", status, reason)
+                    else:
+                        raise
+                    cause = e
+                except (httplib2.HttpLib2Error, OSError) as e:
+                    # Timeouts y errores de conexión
+                    if not idempotent:
+                        raise CalendarUnavailableError(f"Error de conexión con Google Calendar: {e}") from e
+                    error = CalendarUnavailableError(f"Error de conexión con Google Calendar: {e}")
+                    cause = e
+            
+            if attempt >= CALENDAR_MAX_RETRIES:
+                logger.error(f"❌ {error} (sin más reintentos)")
+                raise error from cause
+            
+            delay = backoff_delay(attempt, CALENDAR_BACKOFF_BASE_SECONDS, CALENDAR_BACKOFF_MAX_SECONDS)
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            logger.warning(f"⚠️  {error}; reintento {attempt + 1}/{CALENDAR_MAX_RETRIES} en {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+    
+    def _invalidate_busy(self, calendar_id: str, start_datetime: datetime, end_datetime: datetime):
+        """Invalidar en el índice los días tocados por una escritura propia"""
+        tz = pytz.timezone(TIMEZONE)
+        day = start_datetime.astimezone(tz).date()
+        while day <= end_datetime.astimezone(tz).date():
+            self.busy_index.invalidate(calendar_id, day)
+            day += timedelta(days=1)
+    
+    def _mirror_write(self, calendar_id: str, event: Optional[Dict[str, Any]] = None, deleted_event_id: Optional[str] = None):
+        """Reflejar una escritura propia en el mirror local (si está activo)"""
+        mirror = self.mirror
+        if mirror:
+            mirror.apply_local_write(calendar_id, event=event, deleted_event_id=deleted_event_id)
+    
     def list_calendars(self) -> List[Dict[str, Any]]:
         """
         Listar calendarios disponibles
@@ -98,14 +434,17 @@ class GoogleCalendarClient:
             return []
         
         try:
-            calendar_list = self.service.calendarList().list().execute()
+            calendar_list = self.single_flight.do(
+                ('calendarList',),
+                lambda: self._execute(self._get_service().calendarList().list(fields=CALENDAR_LIST_FIELDS))
+            )
             calendars = calendar_list.get('items', [])
             return calendars
         except HttpError as e:
             logger.error(f"Error listando calendarios: {e}")
             return []
     
-    def create_event(
+    def _build_event(
         self,
         court_name: str,
         date: datetime,
@@ -113,6 +452,71 @@ class GoogleCalendarClient:
         duration_minutes: int = 60,
         name: Optional[str] = None,
         description: Optional[str] = None
+    ) -> Tuple[str, Dict[str, Any], datetime, datetime]:
+        """
+        Construir el cuerpo de un evento de reserva
+        
+        Returns:
+            Tupla (calendar_id, evento, inicio, fin)
+        """
+        # Obtener el calendario específico para esta cancha
+        calendar_id = COURT_CALENDAR_MAPPING.get(court_name, GOOGLE_CALENDAR_ID)
+        
+        # Parsear hora
+        hour, minute = map(int, time_slot.split(':'))
+        
+        # Crear datetime con la hora especificada
+        start_datetime = date.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        
+        # Aplicar timezone
+        tz = pytz.timezone(TIMEZONE)
+        if start_datetime.tzinfo is None:
+            start_datetime = tz.localize(start_datetime)
+        
+        # Calcular hora de fin
+        end_datetime = start_datetime + timedelta(minutes=duration_minutes)
+        
+        # Formatear para Google Calendar API (RFC3339)
+        start_time = start_datetime.isoformat()
+        end_time = end_datetime.isoformat()
+        
+        # Crear título del evento
+        title = f"Reserva Pádel - {court_name}"
+        if name:
+            title = f"Reserva Pádel - {court_name} - {name}"
+        
+        # Crear descripción
+        event_description = f"Cancha: {court_name}\n"
+        if name:
+            event_description += f"Reservado por: {name}\n"
+        if description:
+            event_description += f"\n{description}"
+        
+        # Crear evento
+        event = {
+            'summary': title,
+            'description': event_description,
+            'start': {
+                'dateTime': start_time,
+                'timeZone': TIMEZONE,
+            },
+            'end': {
+                'dateTime': end_time,
+                'timeZone': TIMEZONE,
+            },
+        }
+        
+        return calendar_id, event, start_datetime, end_datetime
+    
+    def create_event(
+        self,
+        court_name: str,
+        date: datetime,
+        time_slot: str,
+        duration_minutes: int = 60,
+        name: Optional[str] = None,
+        description: Optional[str] = None,
+        event_id: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Crear un evento en Google Calendar
@@ -124,6 +528,9 @@ class GoogleCalendarClient:
             duration_minutes: Duración en minutos (default: 60)
             name: Nombre del reservante (opcional)
             description: Descripción adicional (opcional)
+            event_id: ID determinístico del evento (opcional, ver reservation_event_id).
+                Con ID la creación es idempotente: si el evento ya existe se devuelve
+                el existente y la petición se puede reintentar sin crear duplicados.
         
         Returns:
             Dict con información del evento creado (incluye 'id' y 'htmlLink'), None si falló
@@ -133,60 +540,26 @@ class GoogleCalendarClient:
             return None
         
         try:
-            # Obtener el calendario específico para esta cancha
-            calendar_id = COURT_CALENDAR_MAPPING.get(court_name, GOOGLE_CALENDAR_ID)
-            
-            # Parsear hora
-            hour, minute = map(int, time_slot.split(':'))
-            
-            # Crear datetime con la hora especificada
-            start_datetime = date.replace(hour=hour, minute=minute, second=0, microsecond=0)
-            
-            # Aplicar timezone
-            tz = pytz.timezone(TIMEZONE)
-            if start_datetime.tzinfo is None:
-                start_datetime = tz.localize(start_datetime)
-            
-            # Calcular hora de fin
-            end_datetime = start_datetime + timedelta(minutes=duration_minutes)
-            
-            # Formatear para Google Calendar API (RFC3339)
-            start_time = start_datetime.isoformat()
-            end_time = end_datetime.isoformat()
-            
-            # Crear título del evento
-            title = f"Reserva Pádel - {court_name}"
-            if name:
-                title = f"Reserva Pádel - {court_name} - {name}"
-            
-            # Crear descripción
-            event_description = f"Cancha: {court_name}\n"
-            if name:
-                event_description += f"Reservado por: {name}\n"
-            if description:
-                event_description += f"\n{description}"
-            
-            # Crear evento
-            event = {
-                'summary': title,
-                'description': event_description,
-                'start': {
-                    'dateTime': start_time,
-                    'timeZone': TIMEZONE,
-                },
-                'end': {
-                    'dateTime': end_time,
-                    'timeZone': TIMEZONE,
-                },
-            }
+            calendar_id, event, start_datetime, end_datetime = self._build_event(
+                court_name, date, time_slot, duration_minutes, name, description
+            )
+            if event_id:
+                event['id'] = event_id
             
-            # Insertar evento en el calendario
-            created_event = self.service.events().insert(
-                calendarId=calendar_id,
-                body=event
-            ).execute()
+            # Insertar evento en el calendario (con ID es seguro reintentar)
+            try:
+                created_event = self._execute(
+                    self._get_service().events().insert(calendarId=calendar_id, body=event, fields=EVENT_FIELDS),
+                    idempotent=bool(event_id)
+                )
+            except HttpError as e:
+                if not event_id or e.resp.status != 409:
+                    raise
+                created_event = self._get_existing_event(calendar_id, event_id, event)
             
             logger.info(f"✅ Evento creado en Google Calendar: {created_event.get('id')}")
+            self._invalidate_busy(calendar_id, start_datetime, end_datetime)
+            self._mirror_write(calendar_id, event=created_event)
             
             return {
                 'id': created_event.get('id'),
@@ -199,10 +572,38 @@ class GoogleCalendarClient:
         except HttpError as e:
             logger.error(f"❌ Error creando evento en Google Calendar: {e}")
             return None
+        except CalendarError:
+            # Cuota agotada o Google caído: que el llamador lo distinga de "sin resultados"
+            raise
         except Exception as e:
             logger.error(f"❌ Error inesperado creando evento: {e}")
             return None
     
+    def _get_existing_event(self, calendar_id: str, event_id: str, event: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Resolver un 409 al crear un evento con ID determinístico
+        
+        El evento ya existe (un intento anterior sí llegó a Google). Si quedó
+        cancelado, se reactiva con los datos nuevos.
+        """
+        existing = self._execute(self._get_service().events().get(
+            calendarId=calendar_id,
+            eventId=event_id,
+            fields=EVENT_FIELDS + ',status'
+        ))
+        
+        if existing.get('status') == 'cancelled':
+            existing = self._execute(self._get_service().events().update(
+                calendarId=calendar_id,
+                eventId=event_id,
+                body=dict(event, status='confirmed'),
+                fields=EVENT_FIELDS
+            ))
+            logger.info(f"🔄 Evento {event_id} reactivado")
+        else:
+            logger.info(f"♻️  El evento {event_id} ya existía, se reutiliza")
+        return existing
+    
     def delete_event(self, event_id: str, court_name: Optional[str] = None) -> bool:
         """
         Eliminar un evento de Google Calendar
@@ -222,17 +623,22 @@ class GoogleCalendarClient:
             # Obtener el calendario específico para esta cancha
             calendar_id = COURT_CALENDAR_MAPPING.get(court_name, GOOGLE_CALENDAR_ID) if court_name else GOOGLE_CALENDAR_ID
             
-            self.service.events().delete(
+            self._execute(self._get_service().events().delete(
                 calendarId=calendar_id,
                 eventId=event_id
-            ).execute()
+            ))
             
             logger.info(f"✅ Evento eliminado de Google Calendar: {event_id}")
+            # No conocemos la fecha del evento: invalidar todo el calendario
+            self.busy_index.invalidate(calendar_id)
+            self._mirror_write(calendar_id, deleted_event_id=event_id)
             return True
             
         except HttpError as e:
             logger.error(f"❌ Error eliminando evento de Google Calendar: {e}")
             return False
+        except CalendarError:
+            raise
         except Exception as e:
             logger.error(f"❌ Error inesperado eliminando evento: {e}")
             return False
@@ -263,18 +669,27 @@ class GoogleCalendarClient:
                 start_of_day = tz.localize(start_of_day)
             end_of_day = start_of_day + timedelta(days=1)
             
+            # Leer de la copia local si el mirror está al día
+            mirror = self.mirror
+            if mirror and mirror.is_fresh([calendar_id], start_of_day):
+                return mirror.get_events(calendar_id, start_of_day, end_of_day)
+            
             # Formatear para Google Calendar API
             time_min = start_of_day.isoformat()
             time_max = end_of_day.isoformat()
             
             # Obtener eventos
-            events_result = self.service.events().list(
-                calendarId=calendar_id,
-                timeMin=time_min,
-                timeMax=time_max,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
+            events_result = self.single_flight.do(
+                ('events', calendar_id, self.busy_index.generation(calendar_id), time_min, time_max),
+                lambda: self._execute(self._get_service().events().list(
+                    calendarId=calendar_id,
+                    timeMin=time_min,
+                    timeMax=time_max,
+                    singleEvents=True,
+                    orderBy='startTime',
+                    fields=EVENT_LIST_FIELDS
+                ))
+            )
             
             events = events_result.get('items', [])
             return events
@@ -282,10 +697,193 @@ class GoogleCalendarClient:
         except HttpError as e:
             logger.error(f"❌ Error obteniendo disponibilidad: {e}")
             return []
+        except CalendarError:
+            raise
         except Exception as e:
             logger.error(f"❌ Error inesperado obteniendo disponibilidad: {e}")
             return []
     
+    def get_busy_intervals(
+        self,
+        time_min: datetime,
+        time_max: datetime,
+        court_names: Optional[List[str]] = None
+    ) -> Dict[str, List[Tuple[datetime, datetime]]]:
+        """
+        Obtener los intervalos ocupados de varias canchas con una sola consulta FreeBusy
+        
+        Args:
+            time_min: Inicio del rango a consultar
+            time_max: Fin del rango a consultar
+            court_names: Canchas a consultar (opcional, todas si no se especifica)
+        
+        Returns:
+            Dict {cancha: [(inicio, fin), ...]} con los intervalos ocupados ordenados,
+            expresados en la zona horaria configurada. Los días ya consultados se
+            responden desde el índice en memoria mientras no expire su TTL.
+        
+        Raises:
+            CalendarError: No se pudo consultar FreeBusy (no se responde como libre)
+        """
+        if not self.authenticated or not self.service:
+            logger.error("No autenticado. Llama a authenticate() primero.")
+            return {}
+        
+        tz = pytz.timezone(TIMEZONE)
+        if time_min.tzinfo is None:
+            time_min = tz.localize(time_min)
+        if time_max.tzinfo is None:
+            time_max = tz.localize(time_max)
+        
+        if not court_names:
+            court_names = list(COURT_CALENDAR_MAPPING.keys())
+        
+        # Varias canchas pueden compartir calendario: consultar cada calendario una sola vez
+        calendars_by_court = {
+            cancha: COURT_CALENDAR_MAPPING.get(cancha, GOOGLE_CALENDAR_ID)
+            for cancha in court_names
+        }
+        calendar_ids = list(dict.fromkeys(calendars_by_court.values()))
+        
+        # Leer de la copia local si el mirror está al día
+        mirror = self.mirror
+        if mirror and mirror.is_fresh(calendar_ids, time_min):
+            busy_by_calendar = mirror.get_busy_intervals(calendar_ids, time_min, time_max)
+            return {
+                cancha: list(busy_by_calendar.get(calendar_id, []))
+                for cancha, calendar_id in calendars_by_court.items()
+            }
+        
+        # Días (locales) que toca la consulta
+        days = []
+        day = time_min.astimezone(tz).date()
+        last_day = max(time_min, time_max - timedelta(microseconds=1)).astimezone(tz).date()
+        while day <= last_day:
+            days.append(day)
+            day += timedelta(days=1)
+        
+        # Responder desde el índice en memoria cuando los días ya están cargados
+        busy_by_calendar = {}
+        missing_calendars = []
+        for calendar_id in calendar_ids:
+            cached = self.busy_index.get_overlapping(calendar_id, days, time_min, time_max)
+            if cached is None:
+                missing_calendars.append(calendar_id)
+            else:
+                busy_by_calendar[calendar_id] = cached
+        
+        if missing_calendars:
+            # Consultar los días completos para que las próximas preguntas sobre
+            # esos días se respondan sin llamar a Google
+            range_start = tz.localize(datetime.combine(days[0], datetime.min.time()))
+            range_end = tz.localize(datetime.combine(days[-1] + timedelta(days=1), datetime.min.time()))
+            # Generaciones antes de consultar: si escribimos durante la consulta, su
+            # resultado no se guarda en el índice
+            generations = {calendar_id: self.busy_index.generation(calendar_id) for calendar_id in missing_calendars}
+            fetched = self._query_freebusy(range_start, range_end, missing_calendars, generations)
+            
+            for calendar_id, intervals in fetched.items():
+                self.busy_index.store_days(calendar_id, days, intervals, generations[calendar_id])
+                busy_by_calendar[calendar_id] = [
+                    (start, end) for start, end in intervals
+                    if start < time_max and end > time_min
+                ]
+        
+        return {
+            cancha: list(busy_by_calendar.get(calendar_id, []))
+            for cancha, calendar_id in calendars_by_court.items()
+        }
+    
+    def _query_freebusy(
+        self,
+        time_min: datetime,
+        time_max: datetime,
+        calendar_ids: List[str],
+        generations: Optional[Dict[str, int]] = None
+    ) -> Dict[str, List[Tuple[datetime, datetime]]]:
+        """
+        Consultar FreeBusy para varios calendarios en una sola petición
+        
+        Args:
+            generations: Generación de cada calendario en el índice, leída antes de
+                consultar (por defecto la actual)
+        
+        Returns:
+            Dict {calendar_id: [(inicio, fin), ...]} ordenado
+        
+        Raises:
+            CalendarUnavailableError: Falló la petición o algún calendario vino con errores
+        """
+        tz = pytz.timezone(TIMEZONE)
+        
+        try:
+            # Varios usuarios preguntando por el mismo día comparten la consulta en curso,
+            # salvo que hayamos escrito en el calendario después de que empezara: la
+            # generación en la clave evita reutilizar un resultado anterior a la escritura
+            if generations is None:
+                generations = {calendar_id: self.busy_index.generation(calendar_id) for calendar_id in calendar_ids}
+            freebusy_result = self.single_flight.do(
+                (
+                    'freebusy', tuple(calendar_ids), tuple(generations[calendar_id] for calendar_id in calendar_ids),
+                    time_min.isoformat(), time_max.isoformat()
+                ),
+                lambda: self._execute(self._get_service().freebusy().query(body={
+                    'timeMin': time_min.isoformat(),
+                    'timeMax': time_max.isoformat(),
+                    'timeZone': TIMEZONE,
+                    'items': [{'id': calendar_id} for calendar_id in calendar_ids]
+                }, fields=FREEBUSY_FIELDS))
+            )
+        except HttpError as e:
+            logger.error(f"❌ Error consultando FreeBusy: {e}")
+            raise CalendarUnavailableError(f"FreeBusy falló: {e}", status=e.resp.status, reason=_error_reason(e)) from e
+        
+        calendars = freebusy_result.get('calendars', {})
+        busy_by_calendar = {}
+        for calendar_id in calendar_ids:
+            calendar_info = calendars.get(calendar_id)
+            # Un calendario con errores (notFound, forbidden, backendError...) o ausente
+            # no trae su lista de ocupados: tratarlo como libre ofrecería horarios
+            # ya reservados, así que la consulta completa se da por fallida
+            if calendar_info is None or calendar_info.get('errors'):
+                reasons = [error.get('reason') for error in (calendar_info or {}).get('errors', [])] or ['sin respuesta']
+                logger.error(f"❌ FreeBusy falló para {calendar_id}: {', '.join(map(str, reasons))}")
+                raise CalendarUnavailableError(
+                    f"FreeBusy falló para {calendar_id}: {', '.join(map(str, reasons))}",
+                    reason=reasons[0]
+                )
+            busy_by_calendar[calendar_id] = sorted(
+                (_parse_rfc3339(period['start']).astimezone(tz), _parse_rfc3339(period['end']).astimezone(tz))
+                for period in calendar_info.get('busy', [])
+            )
+        
+        return busy_by_calendar
+    
+    def get_busy_intervals_for_range(
+        self,
+        date: datetime,
+        days: int = 1,
+        court_names: Optional[List[str]] = None
+    ) -> Dict[str, List[Tuple[datetime, datetime]]]:
+        """
+        Obtener los intervalos ocupados de días completos (un día, una semana, etc.)
+        
+        Args:
+            date: Primer día del rango
+            days: Número de días a consultar (default: 1)
+            court_names: Canchas a consultar (opcional, todas si no se especifica)
+        
+        Returns:
+            Dict {cancha: [(inicio, fin), ...]} con los intervalos ocupados del rango
+        """
+        tz = pytz.timezone(TIMEZONE)
+        start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0)
+        if start_of_day.tzinfo is None:
+            start_of_day = tz.localize(start_of_day)
+        end_of_range = start_of_day + timedelta(days=days)
+        
+        return self.get_busy_intervals(start_of_day, end_of_range, court_names)
+    
     def check_time_availability(self, date: datetime, time_slot: str, duration_minutes: int = 60, court_name: Optional[str] = None) -> Dict[str, Any]:
         """
         Verificar si un horario específico está disponible en una cancha
@@ -303,6 +901,9 @@ class GoogleCalendarClient:
                 "canchas_disponibles": [lista de canchas disponibles],
                 "canchas_ocupadas": [lista de canchas ocupadas con razón]
             }
+        
+        Raises:
+            CalendarError: No se pudo consultar Google Calendar (no es "no disponible")
         """
         if not self.authenticated or not self.service:
             logger.error("No autenticado. Llama a authenticate() primero.")
@@ -321,9 +922,6 @@ class GoogleCalendarClient:
             # Calcular datetime de fin
             end_datetime = start_datetime + timedelta(minutes=duration_minutes)
             
-            canchas_disponibles = []
-            canchas_ocupadas = []
-            
             # Si se especifica una cancha, verificar solo esa
             if court_name:
                 canchas_a_verificar = [court_name]
@@ -331,49 +929,29 @@ class GoogleCalendarClient:
                 # Verificar todas las canchas
                 canchas_a_verificar = list(COURT_CALENDAR_MAPPING.keys())
             
+            # Una sola consulta FreeBusy para todas las canchas
+            busy_by_court = self.get_busy_intervals(start_datetime, end_datetime, canchas_a_verificar)
+            if not busy_by_court:
+                return {"disponible": False, "canchas_disponibles": [], "canchas_ocupadas": []}
+            
+            canchas_disponibles = []
+            canchas_ocupadas = []
+            day = start_datetime.date()
+            start_minutes = start_datetime.hour * 60 + start_datetime.minute
+            
             for cancha in canchas_a_verificar:
-                calendar_id = COURT_CALENDAR_MAPPING.get(cancha, GOOGLE_CALENDAR_ID)
-                
-                # Obtener eventos en el rango de tiempo
-                time_min = start_datetime.isoformat()
-                time_max = end_datetime.isoformat()
-                
-                events_result = self.service.events().list(
-                    calendarId=calendar_id,
-                    timeMin=time_min,
-                    timeMax=time_max,
-                    singleEvents=True,
-                    orderBy='startTime'
-                ).execute()
-                
-                events = events_result.get('items', [])
-                
-                # Verificar si hay conflictos
-                conflicto = False
-                razon = ""
-                
-                for event in events:
-                    event_start = event.get('start', {}).get('dateTime')
-                    event_end = event.get('end', {}).get('dateTime')
-                    
-                    if event_start and event_end:
-                        # Parsear fechas del evento
-                        event_start_dt = parse_date(event_start)
-                        event_end_dt = parse_date(event_end)
-                        
-                        # Verificar solapamiento
-                        if (start_datetime < event_end_dt and end_datetime > event_start_dt):
-                            conflicto = True
-                            # Formatear hora del conflicto
-                            event_start_str = event_start_dt.strftime("%H:%M")
-                            event_end_str = event_end_dt.strftime("%H:%M")
-                            razon = f"Ocupada de {event_start_str} a {event_end_str}"
-                            break
-                
-                if conflicto:
-                    canchas_ocupadas.append({"cancha": cancha, "razon": razon})
-                else:
+                busy = busy_by_court.get(cancha, [])
+                # Mismo bitmap de bloques de 15 minutos que get_free_slots y suggest_alternatives
+                if DayBitmap.from_intervals(busy, day).is_free(start_minutes, duration_minutes):
                     canchas_disponibles.append(cancha)
+                    continue
+                
+                # El intervalo que se solapa (o el más cercano, si el conflicto es por redondeo)
+                conflicto = min(busy, key=lambda interval: max(
+                    interval[0] - end_datetime, start_datetime - interval[1], timedelta(0)
+                ))
+                razon = f"Ocupada de {conflicto[0].strftime('%H:%M')} a {conflicto[1].strftime('%H:%M')}"
+                canchas_ocupadas.append({"cancha": cancha, "razon": razon})
             
             return {
                 "disponible": len(canchas_disponibles) > 0,
@@ -381,10 +959,139 @@ class GoogleCalendarClient:
                 "canchas_ocupadas": canchas_ocupadas
             }
             
+        except CalendarError:
+            raise
         except Exception as e:
             logger.error(f"❌ Error verificando disponibilidad: {e}")
             return {"disponible": False, "canchas_disponibles": [], "canchas_ocupadas": []}
     
+    def _free_starts(
+        self,
+        busy: List[Tuple[datetime, datetime]],
+        day,
+        court_name: str,
+        duration_minutes: int,
+        not_before: Optional[datetime] = None
+    ) -> List[datetime]:
+        """
+        Horas de inicio libres de una cancha en un día, dada su lista de intervalos ocupados
+        
+        Construye el bitmap de bloques de 15 minutos del día y busca bloques libres
+        contiguos dentro del horario de operación (COURT_HOURS), con horarios de
+        inicio cada SLOT_STEP_MINUTES.
+        """
+        tz = pytz.timezone(TIMEZONE)
+        hours = COURT_HOURS.get(court_name, {})
+        opening = datetime.strptime(hours.get("inicio", "06:00"), "%H:%M")
+        closing = datetime.strptime(hours.get("fin", "23:00"), "%H:%M")
+        
+        bitmap = DayBitmap.from_intervals(busy, day)
+        start_minutes = bitmap.free_starts(
+            duration_minutes,
+            open_minutes=opening.hour * 60 + opening.minute,
+            close_minutes=closing.hour * 60 + closing.minute,
+            step_minutes=SLOT_STEP_MINUTES
+        )
+        
+        midnight = datetime.combine(day, datetime.min.time())
+        starts = [tz.localize(midnight + timedelta(minutes=minutes)) for minutes in start_minutes]
+        if not_before is not None:
+            starts = [slot_start for slot_start in starts if slot_start >= not_before]
+        return starts
+    
+    def get_free_slots(
+        self,
+        date: datetime,
+        duration_minutes: int = 60,
+        courts: Optional[List[str]] = None
+    ) -> Dict[str, List[str]]:
+        """
+        Obtener todos los horarios libres del día para cada cancha
+        
+        Consulta los intervalos ocupados una sola vez y recorre el horario de
+        operación de cada cancha (COURT_HOURS) en pasos de SLOT_STEP_MINUTES.
+        
+        Args:
+            date: Fecha a consultar
+            duration_minutes: Duración de la reserva en minutos
+            courts: Canchas a consultar (opcional, todas si no se especifica)
+        
+        Returns:
+            Dict {cancha: ["HH:MM", ...]} con las horas de inicio libres
+        
+        Raises:
+            CalendarError: No se pudo consultar Google Calendar
+        """
+        if not courts:
+            courts = list(COURT_CALENDAR_MAPPING.keys())
+        
+        busy_by_court = self.get_busy_intervals_for_range(date, days=1, court_names=courts)
+        if not busy_by_court:
+            return {}
+        
+        now = datetime.now(pytz.timezone(TIMEZONE))
+        day = date.date() if isinstance(date, datetime) else date
+        
+        return {
+            cancha: [
+                slot_start.strftime("%H:%M")
+                for slot_start in self._free_starts(busy_by_court.get(cancha, []), day, cancha, duration_minutes, now)
+            ]
+            for cancha in courts
+        }
+    
+    def suggest_alternatives(
+        self,
+        date: datetime,
+        time_slot: str,
+        duration_minutes: int = 60,
+        court_name: Optional[str] = None,
+        k: int = 3
+    ) -> List[Dict[str, Any]]:
+        """
+        Sugerir los k horarios libres más cercanos a uno solicitado
+        
+        Con una sola consulta de intervalos ocupados busca bloques contiguos de
+        `duration_minutes` (60, 90, 120...) en todas las canchas: la misma cancha a
+        otras horas y otras canchas a la misma hora o a horas cercanas.
+        
+        Args:
+            date: Fecha solicitada
+            time_slot: Hora solicitada en formato "HH:MM"
+            duration_minutes: Duración de la reserva en minutos
+            court_name: Cancha preferida (opcional)
+            k: Número máximo de sugerencias
+        
+        Returns:
+            Lista ordenada por cercanía de {"cancha", "hora", "duracion"}, [] si no hay
+        
+        Raises:
+            CalendarError: No se pudo consultar Google Calendar
+        """
+        courts = list(COURT_CALENDAR_MAPPING.keys())
+        busy_by_court = self.get_busy_intervals_for_range(date, days=1, court_names=courts)
+        if not busy_by_court:
+            return []
+        
+        tz = pytz.timezone(TIMEZONE)
+        day = date.date() if isinstance(date, datetime) else date
+        hour, minute = map(int, time_slot.split(':'))
+        requested = tz.localize(datetime.combine(day, datetime.min.time()).replace(hour=hour, minute=minute))
+        now = datetime.now(tz)
+        
+        candidates = []
+        for cancha in courts:
+            for slot_start in self._free_starts(busy_by_court.get(cancha, []), day, cancha, duration_minutes, now):
+                distance = abs((slot_start - requested).total_seconds())
+                # A igual distancia, primero la cancha preferida y luego horarios posteriores
+                candidates.append((distance, cancha != court_name, slot_start < requested, slot_start, cancha))
+        
+        candidates.sort()
+        return [
+            {"cancha": cancha, "hora": slot_start.strftime("%H:%M"), "duracion": duration_minutes}
+            for _, _, _, slot_start, cancha in candidates[:k]
+        ]
+    
     def update_event_duration(self, event_id: str, new_duration_minutes: int, court_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         Actualizar la duración de un evento existente
@@ -405,11 +1112,12 @@ class GoogleCalendarClient:
             # Obtener el calendario específico para esta cancha
             calendar_id = COURT_CALENDAR_MAPPING.get(court_name, GOOGLE_CALENDAR_ID) if court_name else GOOGLE_CALENDAR_ID
             
-            # Obtener el evento actual
-            event = self.service.events().get(
+            # Obtener solo los campos que se modifican
+            event = self._execute(self._get_service().events().get(
                 calendarId=calendar_id,
-                eventId=event_id
-            ).execute()
+                eventId=event_id,
+                fields='start,end,description'
+            ))
             
             if not event:
                 logger.error(f"Evento {event_id} no encontrado")
@@ -427,10 +1135,12 @@ class GoogleCalendarClient:
             # Calcular nueva hora de fin
             end_datetime = start_datetime + timedelta(minutes=new_duration_minutes)
             
-            # Actualizar evento
-            event['end'] = {
-                'dateTime': end_datetime.isoformat(),
-                'timeZone': TIMEZONE,
+            # Nueva hora de fin
+            changes = {
+                'end': {
+                    'dateTime': end_datetime.isoformat(),
+                    'timeZone': TIMEZONE,
+                }
             }
             
             # Actualizar descripción si existe
@@ -441,16 +1151,19 @@ class GoogleCalendarClient:
                 description = re.sub(r'Duración:\s*\d+\s*minutos?', f'Duración: {new_duration_minutes} minutos', description)
             else:
                 description += f"\nDuración: {new_duration_minutes} minutos"
-            event['description'] = description
+            changes['description'] = description
             
-            # Guardar cambios
-            updated_event = self.service.events().update(
+            # Guardar cambios (patch: el evento se leyó parcialmente, un update borraría el resto)
+            updated_event = self._execute(self._get_service().events().patch(
                 calendarId=calendar_id,
                 eventId=event_id,
-                body=event
-            ).execute()
+                body=changes,
+                fields=EVENT_FIELDS
+            ))
             
             logger.info(f"✅ Duración del evento actualizada a {new_duration_minutes} minutos")
+            self._invalidate_busy(calendar_id, start_datetime, end_datetime)
+            self._mirror_write(calendar_id, event=updated_event)
             
             return {
                 'id': updated_event.get('id'),
@@ -462,13 +1175,328 @@ class GoogleCalendarClient:
         except HttpError as e:
             logger.error(f"❌ Error actualizando duración del evento: {e}")
             return None
+        except CalendarError:
+            raise
         except Exception as e:
             logger.error(f"❌ Error inesperado actualizando duración: {e}")
             return None
+    
+    def _execute_batch(self, requests: List[Any], parse: Callable[[Any], Any] = None) -> List[Dict[str, Any]]:
+        """
+        Ejecutar varias peticiones con el endpoint batch (una petición HTTP por cada 50)
+        
+        Args:
+            requests: Peticiones de la API (sin ejecutar)
+            parse: Función opcional para transformar cada respuesta exitosa
+        
+        Returns:
+            Lista en el mismo orden que `requests` con
+            {"ok": bool, "result": respuesta o None, "error": mensaje o None,
+            "status": código HTTP del error o None}
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        throttled: List[int] = []
+        
+        def callback(request_id, response, exception):
+            index = int(request_id)
+            if exception is not None:
+                status = exception.resp.status if isinstance(exception, HttpError) else None
+                if status and _is_rate_limited(status, _error_reason(exception)):
+                    throttled.append(index)
+                results[index] = {"ok": False, "result": None, "error": str(exception), "status": status}
+            else:
+                results[index] = {"ok": True, "result": parse(response) if parse else response, "error": None, "status": None}
+        
+        service = self._get_service()
+        pending = list(range(len(requests)))
+        attempt = 0
+        while pending:
+            for chunk_start in range(0, len(pending), BATCH_MAX_REQUESTS):
+                chunk = pending[chunk_start:chunk_start + BATCH_MAX_REQUESTS]
+                batch = service.new_batch_http_request(callback=callback)
+                for index in chunk:
+                    results[index] = None
+                    batch.add(requests[index], request_id=str(index))
+                try:
+                    # El lote puede contener inserts sin ID: solo se reintenta ante errores de cuota
+                    self._execute(batch, idempotent=False)
+                except (HttpError, CalendarError) as e:
+                    # Falló el lote completo: marcar como fallidas las peticiones sin respuesta
+                    logger.error(f"❌ Error ejecutando lote de Google Calendar: {e}")
+                    for index in chunk:
+                        if results[index] is None:
+                            results[index] = {"ok": False, "result": None, "error": str(e), "status": None}
+            
+            # Reintentar solo las peticiones del lote rechazadas por cuota
+            if not throttled or attempt >= CALENDAR_MAX_RETRIES:
+                break
+            self.rate_limiter.on_throttled()
+            pending = sorted(throttled)
+            throttled.clear()
+            delay = backoff_delay(attempt, CALENDAR_BACKOFF_BASE_SECONDS, CALENDAR_BACKOFF_MAX_SECONDS)
+            logger.warning(f"⚠️  {len(pending)} peticiones del lote limitadas por cuota; reintento en {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+        
+        return results
+    
+    def create_events_batch(self, reservations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Crear varios eventos en una sola petición batch
+        
+        Cada evento lleva su ID determinístico (ver reservation_event_id), así que el
+        lote se puede reintentar: un 409 devuelve el evento que ya existía.
+        
+        Args:
+            reservations: Lista de dicts con los mismos argumentos que create_event
+                (court_name, date, time_slot, duration_minutes, name, description) y
+                'event_id', o 'phone_number' para calcularlo con reservation_event_id
+        
+        Returns:
+            Lista en el mismo orden con {"ok", "result", "error", "status"}; "result" tiene el
+            mismo formato que devuelve create_event
+        """
+        if not self.authenticated or not self.service:
+            logger.error("No autenticado. Llama a authenticate() primero.")
+            return [{"ok": False, "result": None, "error": "No autenticado", "status": None} for _ in reservations]
+        
+        def parse(created_event):
+            return {
+                'id': created_event.get('id'),
+                'htmlLink': created_event.get('htmlLink'),
+                'summary': created_event.get('summary'),
+                'start': created_event.get('start'),
+                'end': created_event.get('end')
+            }
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(reservations)
+        requests = []
+        touched = []
+        for index, reservation in enumerate(reservations):
+            reservation = dict(reservation)
+            event_id = reservation.pop('event_id', None)
+            phone_number = reservation.pop('phone_number', None)
+            calendar_id, event, start_datetime, end_datetime = self._build_event(**reservation)
+            if not event_id and phone_number:
+                event_id = reservation_event_id(reservation['court_name'], start_datetime, phone_number)
+            if not event_id:
+                # Sin ID un reintento del lote duplicaría el evento
+                results[index] = {"ok": False, "result": None, "error": "Falta event_id o phone_number", "status": None}
+                continue
+            event['id'] = event_id
+            requests.append(self._get_service().events().insert(calendarId=calendar_id, body=event, fields=EVENT_FIELDS))
+            touched.append((index, calendar_id, event, start_datetime, end_datetime))
+        
+        batch_results = self._execute_batch(requests, parse=parse) if requests else []
+        
+        for (index, calendar_id, event, start_datetime, end_datetime), result in zip(touched, batch_results):
+            if result["status"] == 409:
+                # Un intento anterior ya lo creó: devolver el existente
+                try:
+                    existing = self._get_existing_event(calendar_id, event['id'], event)
+                    result = {"ok": True, "result": parse(existing), "error": None, "status": None}
+                except (HttpError, CalendarError) as e:
+                    logger.error(f"❌ Error resolviendo evento existente {event['id']}: {e}")
+            results[index] = result
+            self._invalidate_busy(calendar_id, start_datetime, end_datetime)
+            if result["ok"]:
+                self._mirror_write(calendar_id, event=result["result"])
+        
+        created = sum(1 for result in results if result["ok"])
+        logger.info(f"✅ Lote de creación: {created}/{len(results)} eventos creados")
+        return results
+    
+    def get_events_batch(self, events: List[Dict[str, Any]], fields: str = EVENT_FIELDS) -> List[Dict[str, Any]]:
+        """
+        Leer varios eventos en una sola petición batch
+        
+        Args:
+            events: Lista de dicts con 'event_id' y 'court_name' (opcional)
+            fields: Campos del evento a pedir
+        
+        Returns:
+            Lista en el mismo orden con {"ok", "result", "error", "status"}; un evento
+            eliminado llega como status 404/410 o con result['status'] == 'cancelled'
+        """
+        if not self.authenticated or not self.service:
+            logger.error("No autenticado. Llama a authenticate() primero.")
+            return [{"ok": False, "result": None, "error": "No autenticado", "status": None} for _ in events]
+        
+        requests = []
+        for event in events:
+            court_name = event.get('court_name')
+            calendar_id = COURT_CALENDAR_MAPPING.get(court_name, GOOGLE_CALENDAR_ID) if court_name else GOOGLE_CALENDAR_ID
+            requests.append(self._get_service().events().get(calendarId=calendar_id, eventId=event['event_id'], fields=fields))
+        
+        return self._execute_batch(requests)
+    
+    def delete_events_batch(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Eliminar varios eventos en una sola petición batch
+        
+        Args:
+            events: Lista de dicts con 'event_id' y 'court_name' (opcional)
+        
+        Returns:
+            Lista en el mismo orden con {"ok", "result", "error", "status"}
+        """
+        if not self.authenticated or not self.service:
+            logger.error("No autenticado. Llama a authenticate() primero.")
+            return [{"ok": False, "result": None, "error": "No autenticado", "status": None} for _ in events]
+        
+        requests = []
+        calendar_ids = []
+        for event in events:
+            court_name = event.get('court_name')
+            calendar_id = COURT_CALENDAR_MAPPING.get(court_name, GOOGLE_CALENDAR_ID) if court_name else GOOGLE_CALENDAR_ID
+            requests.append(self._get_service().events().delete(calendarId=calendar_id, eventId=event['event_id']))
+            calendar_ids.append(calendar_id)
+        
+        results = self._execute_batch(requests)
+        
+        for calendar_id in set(calendar_ids):
+            self.busy_index.invalidate(calendar_id)
+        for event, calendar_id, result in zip(events, calendar_ids, results):
+            if result["ok"]:
+                self._mirror_write(calendar_id, deleted_event_id=event['event_id'])
+        
+        deleted = sum(1 for result in results if result["ok"])
+        logger.info(f"✅ Lote de eliminación: {deleted}/{len(results)} eventos eliminados")
+        return results
+    
+    def update_events_batch(self, updates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Modificar varios eventos en una sola petición batch (events.patch)
+        
+        Args:
+            updates: Lista de dicts con 'event_id', 'court_name' (opcional) y
+                'changes' (campos del evento a modificar, ej. {'end': {...}})
+        
+        Returns:
+            Lista en el mismo orden con {"ok", "result", "error", "status"}
+        """
+        if not self.authenticated or not self.service:
+            logger.error("No autenticado. Llama a authenticate() primero.")
+            return [{"ok": False, "result": None, "error": "No autenticado", "status": None} for _ in updates]
+        
+        requests = []
+        calendar_ids = []
+        for update in updates:
+            court_name = update.get('court_name')
+            calendar_id = COURT_CALENDAR_MAPPING.get(court_name, GOOGLE_CALENDAR_ID) if court_name else GOOGLE_CALENDAR_ID
+            requests.append(self._get_service().events().patch(
+                calendarId=calendar_id,
+                eventId=update['event_id'],
+                body=update['changes'],
+                fields=EVENT_FIELDS
+            ))
+            calendar_ids.append(calendar_id)
+        
+        results = self._execute_batch(requests, parse=lambda updated_event: {
+            'id': updated_event.get('id'),
+            'htmlLink': updated_event.get('htmlLink'),
+            'summary': updated_event.get('summary'),
+            'start': updated_event.get('start'),
+            'end': updated_event.get('end')
+        })
+        
+        for calendar_id in set(calendar_ids):
+            self.busy_index.invalidate(calendar_id)
+        for calendar_id, result in zip(calendar_ids, results):
+            if result["ok"]:
+                self._mirror_write(calendar_id, event=result["result"])
+        
+        updated = sum(1 for result in results if result["ok"])
+        logger.info(f"✅ Lote de actualización: {updated}/{len(results)} eventos actualizados")
+        return results
+
+
+class AsyncGoogleCalendarClient:
+    """
+    Fachada asíncrona de GoogleCalendarClient
+    
+    Ejecuta cada llamada en el executor acotado del cliente para no bloquear
+    el event loop; cada worker usa su propio transporte HTTP autorizado.
+    """
+    
+    def __init__(self, client: GoogleCalendarClient):
+        self.client = client
+    
+    @property
+    def authenticated(self) -> bool:
+        return self.client.authenticated
+    
+    async def _run(self, func, *args, **kwargs):
+        """Ejecutar un método bloqueante del cliente en el executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.client.executor,
+            functools.partial(func, *args, **kwargs)
+        )
+    
+    async def list_calendars(self) -> List[Dict[str, Any]]:
+        return await self._run(self.client.list_calendars)
+    
+    async def create_event(self, *args, **kwargs) -> Optional[Dict[str, Any]]:
+        return await self._run(self.client.create_event, *args, **kwargs)
+    
+    async def delete_event(self, *args, **kwargs) -> bool:
+        return await self._run(self.client.delete_event, *args, **kwargs)
+    
+    async def get_availability(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return await self._run(self.client.get_availability, *args, **kwargs)
+    
+    async def get_busy_intervals(self, *args, **kwargs) -> Dict[str, List[Tuple[datetime, datetime]]]:
+        return await self._run(self.client.get_busy_intervals, *args, **kwargs)
+    
+    async def get_busy_intervals_for_range(self, *args, **kwargs) -> Dict[str, List[Tuple[datetime, datetime]]]:
+        return await self._run(self.client.get_busy_intervals_for_range, *args, **kwargs)
+    
+    async def check_time_availability(self, *args, **kwargs) -> Dict[str, Any]:
+        return await self._run(self.client.check_time_availability, *args, **kwargs)
+    
+    async def get_free_slots(self, *args, **kwargs) -> Dict[str, List[str]]:
+        return await self._run(self.client.get_free_slots, *args, **kwargs)
+    
+    async def suggest_alternatives(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return await self._run(self.client.suggest_alternatives, *args, **kwargs)
+    
+    async def update_event_duration(self, *args, **kwargs) -> Optional[Dict[str, Any]]:
+        return await self._run(self.client.update_event_duration, *args, **kwargs)
+    
+    async def create_events_batch(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return await self._run(self.client.create_events_batch, *args, **kwargs)
+    
+    async def get_events_batch(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return await self._run(self.client.get_events_batch, *args, **kwargs)
+    
+    async def delete_events_batch(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return await self._run(self.client.delete_events_batch, *args, **kwargs)
+    
+    async def update_events_batch(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return await self._run(self.client.update_events_batch, *args, **kwargs)
 
 
 # Instancia global del cliente
 _calendar_client: Optional[GoogleCalendarClient] = None
+_async_calendar_client: Optional[AsyncGoogleCalendarClient] = None
+# Cada mensaje se procesa en su propio thread/event loop: el lock debe ser de threading
+_calendar_client_lock = threading.Lock()
+
+
+def _get_or_create_calendar_client() -> GoogleCalendarClient:
+    """Crear y autenticar el cliente una sola vez aunque lo pidan varios threads a la vez"""
+    global _calendar_client, _async_calendar_client
+    
+    with _calendar_client_lock:
+        if _calendar_client is None:
+            client = GoogleCalendarClient()
+            if not client.authenticate():
+                raise Exception("No se pudo autenticar con Google Calendar")
+            _async_calendar_client = AsyncGoogleCalendarClient(client)
+            _calendar_client = client
+    
+    return _calendar_client
 
 
 async def get_google_calendar_instance() -> GoogleCalendarClient:
@@ -478,14 +1506,20 @@ async def get_google_calendar_instance() -> GoogleCalendarClient:
     Returns:
         GoogleCalendarClient: Instancia autenticada del cliente
     """
-    global _calendar_client
+    if _calendar_client is not None:
+        return _calendar_client
     
-    if _calendar_client is None:
-        _calendar_client = GoogleCalendarClient()
-        if not _calendar_client.authenticate():
-            raise Exception("No se pudo autenticar con Google Calendar")
-    
-    return _calendar_client
-
+    # La autenticación es bloqueante: se hace fuera del event loop
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _get_or_create_calendar_client)
 
 
+async def get_async_google_calendar_instance() -> AsyncGoogleCalendarClient:
+    """
+    Obtener instancia singleton de la fachada asíncrona de Google Calendar
+    
+    Returns:
+        AsyncGoogleCalendarClient: Fachada sobre el cliente autenticado
+    """
+    await get_google_calendar_instance()
+    return _async_calendar_client
@@ -4,9 +4,21 @@ Aplicación principal del sistema de reservas de pádel
 import asyncio
 import logging
 import sys
-from database import init_db
+from database import init_db, SessionLocal
+from reservation_ledger import backfill_slot_ledger
 from whatsapp_bot_twilio import PadelReservationBotTwilio as PadelReservationBot
 from google_calendar_client import get_google_calendar_instance
+from calendar_mirror import start_calendar_mirror, get_calendar_mirror
+from calendar_sync import start_calendar_sync_worker, get_calendar_sync_worker
+from slot_holds import get_slot_hold_manager
+from calendar_reconciliation import start_calendar_reconciler, get_calendar_reconciler
+from availability_refresh import start_availability_refresher, get_availability_refresher
+from config import (
+    CALENDAR_MIRROR_ENABLED,
+    CALENDAR_WRITE_BEHIND,
+    CALENDAR_RECONCILE_ENABLED,
+    AVAILABILITY_REFRESH_ENABLED
+)
 import signal
 
 # Configurar logging para que se muestre correctamente en consola de Windows
@@ -44,14 +56,40 @@ class PadelReservationApp:
         # Inicializar base de datos
         logger.info("Inicializando base de datos...")
         init_db()
+        db = SessionLocal()
+        try:
+            backfill_slot_ledger(db)
+        finally:
+            db.close()
         
         # Iniciar Google Calendar
         logger.info("Iniciando módulo Google Calendar...")
         self.google_calendar = await get_google_calendar_instance()
         
+        # Mirror local de los calendarios (opcional)
+        if CALENDAR_MIRROR_ENABLED:
+            logger.info("Iniciando mirror local de calendarios...")
+            start_calendar_mirror(self.google_calendar)
+        
         # Iniciar bot de WhatsApp
         logger.info("Iniciando bot de WhatsApp...")
         self.bot = PadelReservationBot()
+        
+        # Reservas confirmadas localmente y sincronizadas con Google Calendar en segundo plano
+        if CALENDAR_WRITE_BEHIND:
+            logger.info("Iniciando sincronización de reservas (write-behind)...")
+            start_calendar_sync_worker(self.google_calendar, on_failed=self.bot.notify_calendar_sync_failed)
+        
+        # Conciliación periódica de las reservas con Google Calendar
+        if CALENDAR_RECONCILE_ENABLED:
+            logger.info("Iniciando conciliación de reservas con Google Calendar...")
+            start_calendar_reconciler(self.google_calendar)
+        
+        # Refresco en proceso de la disponibilidad de Playtomic (por tramos de fechas)
+        if AVAILABILITY_REFRESH_ENABLED:
+            logger.info("Iniciando refresco de disponibilidad de Playtomic...")
+            await start_availability_refresher()
+        
         await self.bot.start()
         
         self.running = True
@@ -63,6 +101,26 @@ class PadelReservationApp:
         logger.info("Deteniendo sistema...")
         self.running = False
         
+        mirror = get_calendar_mirror()
+        if mirror:
+            mirror.stop()
+        
+        sync_worker = get_calendar_sync_worker()
+        if sync_worker:
+            sync_worker.stop()
+        
+        slot_holds = get_slot_hold_manager()
+        if slot_holds:
+            slot_holds.stop()
+        
+        reconciler = get_calendar_reconciler()
+        if reconciler:
+            reconciler.stop()
+        
+        refresher = get_availability_refresher()
+        if refresher:
+            await refresher.stop()
+        
         if self.google_calendar:
             # Google Calendar no requiere cierre explícito
             logger.info("Google Calendar desconectado")
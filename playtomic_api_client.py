@@ -5,11 +5,12 @@ import aiohttp
 import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import json
 from urllib.parse import urlencode
 import os
-from config import PLAYTOMIC_TENANT_ID, PLAYTOMIC_COURT_MAPPING
+import pytz
+from config import PLAYTOMIC_TENANT_ID, PLAYTOMIC_COURT_MAPPING, TIMEZONE
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +22,7 @@ class PlaytomicAPIClient:
         self.session: Optional[aiohttp.ClientSession] = None
         self.base_url = "https://playtomic.com"
         self.api_base = f"{self.base_url}/api/web-app"
+        self.public_api_base = f"{self.base_url}/api/v1"
         self.logged_in = False
         self.user_data = None
         
@@ -325,41 +327,58 @@ class PlaytomicAPIClient:
             traceback.print_exc()
             return None
     
-    async def get_availability(self, date: datetime, court_name: str = None) -> Dict[str, Any]:
+    async def get_availability(self, date: datetime, court_name: str = None) -> Optional[List[Dict[str, Any]]]:
         """
-        Obtener disponibilidad para una fecha específica
+        Obtener disponibilidad del club para una fecha específica
+        Usa el endpoint público de disponibilidad, no requiere login
         
         Args:
-            date: Fecha para consultar disponibilidad
+            date: Fecha (día local del club, TIMEZONE) para consultar disponibilidad
             court_name: Nombre específico de cancha (opcional)
         
         Returns:
-            dict: Información de disponibilidad
+            list: Una entrada por cancha con sus horarios libres en UTC:
+                  [{'resource_id', 'start_date', 'slots': [{'start_time', 'duration', 'price'}]}]
+                  None si la consulta falla (distinto de un día sin horarios libres)
         """
-        if not self.logged_in:
-            logger.error("❌ No hay sesión activa. Debes hacer login primero.")
-            return {}
+        if not self.session:
+            logger.error("❌ Sesión HTTP no iniciada. Llama a start() primero.")
+            return None
         
         try:
-            # Construir URL para consultar disponibilidad
-            date_str = date.strftime('%Y-%m-%d')
-            availability_url = f"{self.api_base}/availability/{self.tenant_id}/{date_str}"
+            # El día local completo del club, expresado en UTC como espera la API
+            timezone = pytz.timezone(TIMEZONE)
+            start_min = timezone.localize(datetime(date.year, date.month, date.day)).astimezone(pytz.utc)
+            start_max = start_min + timedelta(days=1, seconds=-1)
+            params = {
+                'sport_id': 'PADEL',
+                'tenant_id': self.tenant_id,
+                'start_min': start_min.strftime('%Y-%m-%dT%H:%M:%S'),
+                'start_max': start_max.strftime('%Y-%m-%dT%H:%M:%S')
+            }
+            availability_url = f"{self.public_api_base}/availability?{urlencode(params)}"
             
-            logger.info(f"🔍 Consultando disponibilidad para {date_str}")
+            logger.info(f"🔍 Consultando disponibilidad para {date.strftime('%Y-%m-%d')}")
             
-            async with self.session.get(availability_url) as response:
+            async with self.session.get(availability_url, headers={'Accept': 'application/json'}) as response:
                 if response.status == 200:
                     result = await response.json()
-                    logger.info("✅ Disponibilidad obtenida")
+                    if not isinstance(result, list):
+                        logger.error(f"❌ Respuesta de disponibilidad inesperada: {str(result)[:200]}")
+                        return None
+                    if court_name:
+                        resource_id = self.court_mapping.get(court_name.upper())
+                        result = [r for r in result if r.get('resource_id') == resource_id]
+                    logger.info(f"✅ Disponibilidad obtenida: {len(result)} canchas")
                     return result
                 else:
                     error_text = await response.text()
                     logger.error(f"❌ Error obteniendo disponibilidad: {response.status} - {error_text}")
-                    return {}
+                    return None
                     
         except Exception as e:
             logger.error(f"❌ Excepción consultando disponibilidad: {e}")
-            return {}
+            return None
     
     async def __aenter__(self):
         """Context manager entry"""
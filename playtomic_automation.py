@@ -5,8 +5,11 @@ Reemplaza la automatización basada en Selenium con llamadas HTTP directas
 import asyncio
 import logging
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Set
+import pytz
 from playtomic_api_client import PlaytomicAPIClient
+from slot_records import DaySlots, Slot
+from config import TIMEZONE
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +23,8 @@ class PlaytomicAutomation:
     def __init__(self):
         self.api_client: Optional[PlaytomicAPIClient] = None
         self.logged_in = False
+        # Canchas de Playtomic sin mapeo ya avisadas (para avisar una sola vez)
+        self._warned_unknown: Set[str] = set()
         
     async def start(self):
         """Inicializar el cliente API"""
@@ -27,6 +32,11 @@ class PlaytomicAutomation:
             self.api_client = PlaytomicAPIClient()
             await self.api_client.start()
             logger.info("✅ Cliente API de Playtomic iniciado")
+            unmapped = [name for name, resource_id in self.api_client.court_mapping.items() if not resource_id]
+            if unmapped:
+                logger.warning(
+                    f"⚠️  Canchas sin ID de Playtomic configurado, no se consultará su disponibilidad: {', '.join(unmapped)}"
+                )
             return True
         except Exception as e:
             logger.error(f"❌ Error iniciando cliente API: {e}")
@@ -113,6 +123,79 @@ class PlaytomicAutomation:
             logger.error(f"❌ Error durante reserva: {e}")
             return None
     
+    def _normalize_availability(self, resources: List[Dict[str, Any]], date: datetime) -> DaySlots:
+        """
+        Convertir la respuesta de la API en horarios libres por cancha
+        
+        La API devuelve, por cancha (resource_id), un horario por cada duración
+        reservable y con la hora en UTC. Se deja un horario por cancha y hora
+        (el de 60 minutos, o el más corto) con la hora local del club.
+        
+        Returns:
+            DaySlots del día, ordenados por hora y cancha
+        """
+        timezone = pytz.timezone(TIMEZONE)
+        court_names = {resource_id: name for name, resource_id in self.api_client.court_mapping.items() if resource_id}
+        date_str = date.strftime('%Y-%m-%d')
+        slots = []
+        unknown = set()
+        
+        for resource in resources or []:
+            name = court_names.get(resource.get('resource_id'))
+            if not name:
+                unknown.add(resource.get('resource_id'))
+                continue
+            for slot in sorted(resource.get('slots', []), key=lambda s: (s.get('duration') != 60, s.get('duration') or 0)):
+                try:
+                    start = datetime.strptime(f"{resource['start_date']} {slot['start_time']}", '%Y-%m-%d %H:%M:%S')
+                except (KeyError, ValueError):
+                    continue
+                local_start = pytz.utc.localize(start).astimezone(timezone)
+                if local_start.strftime('%Y-%m-%d') != date_str:
+                    continue
+                slots.append(Slot(name, local_start.strftime('%H:%M'), date_str, slot.get('price')))
+        
+        new_unknown = unknown - self._warned_unknown
+        if new_unknown:
+            self._warned_unknown.update(new_unknown)
+            logger.warning(f"⚠️  Canchas de Playtomic sin mapeo en PLAYTOMIC_COURT_MAPPING ignoradas: {', '.join(map(str, sorted(new_unknown, key=str)))}")
+        return DaySlots(date_str, slots)
+    
+    async def get_available_courts(
+        self,
+        date: datetime,
+        time_slot: str = None,
+        club_name: str = None,
+        club_url: str = None
+    ) -> Optional[DaySlots]:
+        """
+        Obtener las canchas libres de una fecha (y opcionalmente de una hora)
+        
+        Args:
+            date: Fecha a consultar
+            time_slot: Hora en formato "HH:MM" (opcional, todas si es None)
+            club_name: Compatibilidad con la versión anterior (el club es PLAYTOMIC_TENANT_ID)
+            club_url: Compatibilidad con la versión anterior (no se usa)
+        
+        Returns:
+            DaySlots: Horarios libres, o None si la consulta falló (no es lo mismo
+            que un día sin horarios libres)
+        """
+        if not self.api_client:
+            logger.error("Cliente API no iniciado")
+            return None
+        
+        try:
+            resources = await self.api_client.get_availability(date)
+            if resources is None:
+                return None
+            courts = self._normalize_availability(resources, date)
+            return courts.at(time_slot) if time_slot else courts
+            
+        except Exception as e:
+            logger.error(f"❌ Error consultando canchas disponibles: {e}")
+            return None
+    
     async def get_availability(self, date: datetime, court_name: str = None) -> List[Dict[str, Any]]:
         """
         Obtener disponibilidad para una fecha específica
@@ -128,40 +211,21 @@ class PlaytomicAutomation:
             logger.error("Cliente API no iniciado")
             return []
         
-        if not self.logged_in:
-            logger.error("No hay sesión activa. Debes hacer login primero.")
-            return []
+        logger.info(f"🔍 Consultando disponibilidad para {date.strftime('%d/%m/%Y')}")
         
-        try:
-            logger.info(f"🔍 Consultando disponibilidad para {date.strftime('%d/%m/%Y')}")
-            
-            availability_data = await self.api_client.get_availability(date, court_name)
-            
-            # Convertir el formato de la API a la estructura esperada por el resto del sistema
-            availability_list = []
-            
-            if availability_data:
-                # Procesar la respuesta de la API y convertirla al formato esperado
-                # Esto dependerá del formato exacto que devuelva la API de Playtomic
-                logger.info(f"✅ Disponibilidad obtenida: {len(availability_data)} elementos")
-                
-                # Por ahora, devolvemos la estructura básica
-                # Puedes ajustar esto según el formato real de la API
-                for item in availability_data.get('slots', []):
-                    availability_list.append({
-                        'time': item.get('time'),
-                        'court': item.get('court'),
-                        'available': item.get('available', False),
-                        'price': item.get('price')
-                    })
-            else:
-                logger.warning("No se obtuvo disponibilidad")
-            
-            return availability_list
-            
-        except Exception as e:
-            logger.error(f"❌ Error consultando disponibilidad: {e}")
+        courts = await self.get_available_courts(date)
+        if courts is None:
             return []
+        return [
+            {
+                'time': court.time,
+                'court': court.name,
+                'available': True,
+                'price': court.price
+            }
+            for court in courts
+            if not court_name or court.name == court_name.upper()
+        ]
     
     async def search_and_navigate_to_club(self, club_name: str) -> bool:
         """
@@ -0,0 +1,316 @@
+"""
+Registro local de reservas (fuente de verdad de las reservas del bot)
+La reserva se confirma al guardarse en la BD junto con sus bloques de 15 minutos en
+slot_ledger, en la misma transacción: la restricción única de esa tabla garantiza
+que no haya dos reservas solapadas de la misma cancha aunque haya varios workers.
+Los mismos bloques sirven para retener una cancha unos minutos mientras el usuario
+confirma (ver slot_holds.py)
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+import pytz
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from database import Reservation, SlotLedger, User
+from slot_bitmap import SLOT_MINUTES
+from config import TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+
+class SlotUnavailableError(Exception):
+    """La cancha ya tiene una reserva activa en ese horario"""
+
+
+def _local_naive(value: datetime) -> datetime:
+    """Hora local sin tzinfo, como se guarda en la columna Reservation.date"""
+    if value.tzinfo is not None:
+        value = value.astimezone(pytz.timezone(TIMEZONE)).replace(tzinfo=None)
+    return value
+
+
+def slot_starts(start: datetime, duration_minutes: int) -> List[datetime]:
+    """
+    Inicios de los bloques de 15 minutos que cubren [start, start + duración)
+
+    Los bordes se redondean hacia afuera, igual que DayBitmap.
+    """
+    start = _local_naive(start)
+    end = start + timedelta(minutes=duration_minutes)
+    slot = start.replace(minute=start.minute - start.minute % SLOT_MINUTES, second=0, microsecond=0)
+    starts = []
+    while slot < end:
+        starts.append(slot)
+        slot += timedelta(minutes=SLOT_MINUTES)
+    return starts
+
+
+def _slot_rows(court_name: str, start: datetime, duration_minutes: int) -> List[SlotLedger]:
+    return [
+        SlotLedger(court_name=court_name, slot_start=slot_start)
+        for slot_start in slot_starts(start, duration_minutes)
+    ]
+
+
+def _clear_holds(db: Session, court_name: str, starts: List[datetime], holder: Optional[str] = None):
+    """Borrar (sin commit) las retenciones vencidas de esos bloques y las del propio usuario"""
+    releasable = SlotLedger.expires_at <= datetime.utcnow()
+    if holder:
+        releasable = or_(releasable, SlotLedger.holder == holder)
+    db.query(SlotLedger).filter(
+        SlotLedger.reservation_id.is_(None),
+        SlotLedger.expires_at.isnot(None),
+        SlotLedger.court_name == court_name,
+        SlotLedger.slot_start.in_(starts),
+        releasable
+    ).delete(synchronize_session=False)
+
+
+def book_reservation(
+    db: Session,
+    user: User,
+    court_name: str,
+    date_time: datetime,
+    duration_minutes: int,
+    idempotency_key: str,
+    name: Optional[str] = None
+) -> Tuple[Reservation, bool]:
+    """
+    Registrar una reserva confirmada, pendiente de sincronizar con Google Calendar
+
+    Args:
+        db: Sesión de base de datos
+        user: Usuario que reserva
+        court_name: Nombre de la cancha
+        date_time: Fecha y hora de inicio
+        duration_minutes: Duración en minutos
+        idempotency_key: Clave determinística de la reserva (ver reservation_event_id)
+        name: Nombre del reservante (opcional)
+
+    Returns:
+        Tupla (reserva, creada): creada es False si la reserva ya existía
+
+    Raises:
+        SlotUnavailableError: Otra reserva activa (o la retención de otro usuario)
+            se solapa con ese horario
+    """
+    existing = db.query(Reservation).filter(
+        Reservation.idempotency_key == idempotency_key
+    ).first()
+    if existing and existing.status != "cancelled":
+        logger.info(f"♻️  Reserva {idempotency_key} ya existía, no se duplica")
+        return existing, False
+
+    # La retención del propio usuario se convierte en reserva en la misma transacción
+    _clear_holds(db, court_name, slot_starts(date_time, duration_minutes), holder=user.phone_number)
+
+    if existing:
+        # La misma reserva se canceló antes (ej. falló Google Calendar): reactivarla
+        reservation = existing
+        reservation.status = "confirmed"
+        reservation.confirmed = True
+        reservation.duration_minutes = duration_minutes
+        reservation.name = name
+        reservation.slots = _slot_rows(court_name, date_time, duration_minutes)
+    else:
+        reservation = Reservation(
+            user_id=user.id,
+            court_name=court_name,
+            date=_local_naive(date_time),
+            duration_minutes=duration_minutes,
+            status="confirmed",
+            confirmed=True,
+            name=name,
+            idempotency_key=idempotency_key,
+            slots=_slot_rows(court_name, date_time, duration_minutes)
+        )
+        db.add(reservation)
+    reservation.calendar_sync_status = "pending"
+    reservation.calendar_sync_attempts = 0
+    reservation.calendar_sync_error = None
+    reservation.calendar_sync_next_at = None
+
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        # Otra petición concurrente guardó la misma reserva primero
+        existing = db.query(Reservation).filter(
+            Reservation.idempotency_key == idempotency_key,
+            Reservation.status != "cancelled"
+        ).first()
+        if existing:
+            return existing, False
+        raise SlotUnavailableError(f"{court_name} ya está reservada el {date_time.strftime('%d/%m/%Y %H:%M')}")
+
+    logger.info(f"📝 Reserva {reservation.id} registrada: {court_name} {date_time.strftime('%d/%m/%Y %H:%M')}")
+    return reservation, True
+
+
+def resize_reservation(db: Session, reservation: Reservation, duration_minutes: int):
+    """
+    Cambiar la duración de una reserva tomando o liberando los bloques necesarios
+
+    Raises:
+        SlotUnavailableError: La nueva duración se solapa con otra reserva
+    """
+    wanted = set(slot_starts(reservation.date, duration_minutes))
+    current = {slot.slot_start: slot for slot in reservation.slots}
+    _clear_holds(db, reservation.court_name, sorted(wanted - current.keys()))
+    for slot_start, slot in current.items():
+        if slot_start not in wanted:
+            reservation.slots.remove(slot)
+    for slot_start in sorted(wanted - current.keys()):
+        reservation.slots.append(SlotLedger(court_name=reservation.court_name, slot_start=slot_start))
+    reservation.duration_minutes = duration_minutes
+
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise SlotUnavailableError(
+            f"{reservation.court_name} no está libre {duration_minutes} minutos desde las {reservation.date.strftime('%H:%M')}"
+        )
+
+
+def release_reservation(db: Session, reservation: Reservation, reason: Optional[str] = None):
+    """Cancelar una reserva del registro local (libera el horario)"""
+    reservation.status = "cancelled"
+    reservation.confirmed = False
+    reservation.slots = []
+    if reason:
+        reservation.calendar_sync_error = reason
+    db.commit()
+    logger.info(f"🗑️  Reserva {reservation.id} liberada{f': {reason}' if reason else ''}")
+
+
+def place_hold(
+    db: Session,
+    holder: str,
+    court_name: str,
+    start: datetime,
+    duration_minutes: int,
+    ttl_seconds: int
+) -> datetime:
+    """
+    Retener los bloques de una cancha para un usuario durante ttl_seconds
+
+    Reemplaza la retención anterior del mismo usuario (una selección a la vez).
+
+    Returns:
+        datetime: Vencimiento de la retención (UTC)
+
+    Raises:
+        SlotUnavailableError: La cancha ya está reservada o retenida por otro usuario
+    """
+    starts = slot_starts(start, duration_minutes)
+    expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
+    db.query(SlotLedger).filter(
+        SlotLedger.reservation_id.is_(None),
+        SlotLedger.holder == holder
+    ).delete(synchronize_session=False)
+    _clear_holds(db, court_name, starts)
+    db.add_all([
+        SlotLedger(court_name=court_name, slot_start=slot_start, holder=holder, expires_at=expires_at)
+        for slot_start in starts
+    ])
+
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise SlotUnavailableError(f"{court_name} no está libre el {start.strftime('%d/%m/%Y %H:%M')}")
+
+    logger.info(f"⏳ {court_name} {start.strftime('%d/%m/%Y %H:%M')} retenida para {holder}")
+    return expires_at
+
+
+def release_holds(db: Session, holder: str) -> int:
+    """
+    Liberar las retenciones de un usuario
+
+    Returns:
+        int: Número de bloques liberados
+    """
+    released = db.query(SlotLedger).filter(
+        SlotLedger.reservation_id.is_(None),
+        SlotLedger.holder == holder
+    ).delete(synchronize_session=False)
+    db.commit()
+    return released
+
+
+def purge_expired_holds(db: Session) -> int:
+    """
+    Borrar las retenciones vencidas
+
+    Returns:
+        int: Número de bloques liberados
+    """
+    purged = db.query(SlotLedger).filter(
+        SlotLedger.reservation_id.is_(None),
+        SlotLedger.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.commit()
+    return purged
+
+
+def busy_slots(db: Session, day: datetime, exclude_holder: Optional[str] = None) -> Dict[str, Set[datetime]]:
+    """
+    Bloques tomados de un día por cancha: reservas y retenciones vigentes
+
+    Args:
+        db: Sesión de base de datos
+        day: Día a consultar
+        exclude_holder: No contar las retenciones de este usuario (las suyas no lo bloquean)
+
+    Returns:
+        Dict[str, Set[datetime]]: Inicios de bloque (hora local) por cancha
+    """
+    start = _local_naive(day).replace(hour=0, minute=0, second=0, microsecond=0)
+    active_hold = SlotLedger.expires_at > datetime.utcnow()
+    if exclude_holder:
+        active_hold = active_hold & (SlotLedger.holder != exclude_holder)
+    rows = db.query(SlotLedger.court_name, SlotLedger.slot_start).filter(
+        SlotLedger.slot_start >= start,
+        SlotLedger.slot_start < start + timedelta(days=1),
+        or_(SlotLedger.reservation_id.isnot(None), active_hold)
+    ).all()
+
+    busy: Dict[str, Set[datetime]] = {}
+    for court_name, slot_start in rows:
+        busy.setdefault(court_name, set()).add(slot_start)
+    return busy
+
+
+def backfill_slot_ledger(db: Session) -> int:
+    """
+    Tomar los bloques de las reservas activas que todavía no los tienen
+
+    Para reservas creadas antes de existir slot_ledger. Las que se solapan con otra
+    se registran en el log y se dejan sin bloques para revisarlas a mano.
+
+    Returns:
+        int: Número de reservas actualizadas
+    """
+    since = _local_naive(datetime.now(pytz.timezone(TIMEZONE))) - timedelta(days=1)
+    reservations = db.query(Reservation).filter(
+        Reservation.status.in_(["pending", "confirmed"]),
+        Reservation.date >= since,
+        ~Reservation.slots.any()
+    ).all()
+
+    updated = 0
+    for reservation in reservations:
+        reservation.slots = _slot_rows(reservation.court_name, reservation.date, reservation.duration_minutes or 60)
+        try:
+            db.commit()
+            updated += 1
+        except IntegrityError:
+            db.rollback()
+            logger.warning(f"⚠️  La reserva {reservation.id} se solapa con otra; revisar manualmente")
+    if updated:
+        logger.info(f"📝 {updated} reservas existentes registradas en slot_ledger")
+    return updated
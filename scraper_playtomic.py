@@ -1,56 +1,134 @@
 """
-Script independiente para hacer web scraping de Playtomic
-Se ejecuta periódicamente y guarda disponibilidad en archivo JSON
+Script independiente para scrapear la disponibilidad de Playtomic
+Consulta la API HTTP pública de disponibilidad del club (sin navegador ni login),
+se ejecuta periódicamente y guarda la disponibilidad en la base de datos
+(tabla availability_slots, ver availability_store.py)
 
 Uso:
     python scraper_playtomic.py [días]
 
 Ejemplo:
-    python scraper_playtomic.py      # Scrapear 3 días (hoy + 2 días más) - por defecto
+    python scraper_playtomic.py      # Scrapear SCRAPER_MAX_DAYS días (14 por defecto)
     python scraper_playtomic.py 3    # Scrapear 3 días (hoy + 2 días más)
     
-Nota: El scraper está limitado a máximo 3 días para optimizar el rendimiento.
+Nota: Los días se consultan en paralelo (SCRAPER_CONCURRENCY a la vez), con al
+menos SCRAPER_MIN_INTERVAL_SECONDS entre peticiones al mismo host.
 """
 import asyncio
-import json
 import sys
-import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import pytz
 from playtomic_automation import get_playtomic_instance
+from database import init_db, SessionLocal
+from availability_store import update_date_slots, purge_changes
+from slot_records import DaySlots
+from config import TIMEZONE, SCRAPER_MAX_DAYS, SCRAPER_CONCURRENCY, SCRAPER_MIN_INTERVAL_SECONDS
 import logging
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)],
-    force=True
-)
-
 logger = logging.getLogger(__name__)
 
-# Configurar encoding para Windows
-if hasattr(sys.stdout, 'reconfigure'):
+# Las escrituras de los días scrapeados en paralelo salen del event loop y van de a
+# una (SQLite admite un solo escritor a la vez)
+_db_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scraper-db")
+
+
+class HostRateLimiter:
+    """
+    Separación mínima entre peticiones al mismo host
+
+    Reemplaza las pausas fijas entre días: las peticiones concurrentes salen
+    escalonadas cada `min_interval` segundos en vez de todas a la vez.
+    """
+
+    def __init__(self, min_interval: float = SCRAPER_MIN_INTERVAL_SECONDS):
+        self.min_interval = min_interval
+        self._next_at: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, host: str):
+        """Esperar el turno para enviar una petición a `host`"""
+        async with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_at.get(host, now))
+            self._next_at[host] = start_at + self.min_interval
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+
+def _save_day(date_str: str, courts: DaySlots) -> List[Dict[str, Any]]:
+    """Guardar los horarios de una fecha con su propia sesión (corre en _db_writer)"""
+    db = SessionLocal()
     try:
-        sys.stdout.reconfigure(encoding='utf-8')
-    except:
-        pass
+        return update_date_slots(db, date_str, courts)
+    finally:
+        db.close()
 
-CACHE_FILE = 'availability_cache.json'
-MAX_CACHE_AGE_HOURS = 1  # Cache válido por 1 hora
 
+async def scrape_day(
+    playtomic,
+    date: datetime,
+    semaphore: asyncio.Semaphore,
+    rate_limiter: HostRateLimiter,
+    club_name=None,
+    club_url=None
+) -> Tuple[str, Optional[DaySlots]]:
+    """
+    Scrapear un día y guardar en la base de datos lo que cambió en sus horarios
 
-async def scrape_availability(days=3, club_name=None, club_url=None):
+    Returns:
+        Tupla (fecha YYYY-MM-DD, DaySlots encontrados); si la consulta falla los
+        horarios son None, no se toca la base de datos ni el feed de cambios y se
+        conservan los guardados antes
     """
-    Scrapear disponibilidad de Playtomic y guardar en archivo JSON
+    date_str = date.strftime('%Y-%m-%d')
+    host = urlparse(playtomic.api_client.base_url).netloc if playtomic.api_client else 'playtomic.com'
+    try:
+        async with semaphore:
+            await rate_limiter.wait(host)
+            logger.info(f"📅 Scrapeando {date_str} ({date.strftime('%d/%m/%Y')})...")
+            courts = await playtomic.get_available_courts(
+                date,
+                time_slot=None,
+                club_name=club_name,
+                club_url=club_url
+            )
+        if courts is None:
+            logger.warning(f"⚠️  {date_str}: no se pudo consultar Playtomic, se conservan los horarios guardados")
+            return date_str, None
+
+        loop = asyncio.get_running_loop()
+        changes = await loop.run_in_executor(_db_writer, _save_day, date_str, courts)
+        logger.info(f"✅ {date_str}: {len(courts)} canchas encontradas, {len(changes)} cambios")
+        return date_str, courts
+
+    except Exception as e:
+        logger.error(f"❌ Error scrapeando {date_str}: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return date_str, None
+
+
+async def scrape_availability(days=SCRAPER_MAX_DAYS, club_name=None, club_url=None, playtomic=None):
+    """
+    Scrapear disponibilidad de Playtomic y guardarla en la base de datos
+    
+    Los días se consultan en paralelo (SCRAPER_CONCURRENCY a la vez). Cada fecha
+    se compara con sus horarios guardados y solo se escribe lo que cambió, en una
+    sola transacción; si una fecha falla se conservan sus horarios anteriores.
     
     Args:
-        days: Número de días a scrapear (por defecto 3)
+        days: Número de días a scrapear (por defecto SCRAPER_MAX_DAYS)
         club_name: Nombre del club (opcional, usa config por defecto)
         club_url: URL del club (opcional, usa config por defecto)
+        playtomic: Instancia de PlaytomicAutomation a reutilizar (opcional; si no
+            se pasa se crea una y se cierra al terminar)
     
     Returns:
-        Diccionario con la disponibilidad por fecha
+        Diccionario con la disponibilidad por fecha (sin las fechas que fallaron)
     """
     try:
         logger.info("=" * 80)
@@ -58,67 +136,32 @@ async def scrape_availability(days=3, club_name=None, club_url=None):
         logger.info(f"📅 Días a scrapear: {days}")
         logger.info("=" * 80)
         
-        # Obtener instancia de Playtomic
-        logger.info("🔧 Obteniendo instancia de Playtomic...")
-        playtomic = await get_playtomic_instance()
-        logger.info("✅ Instancia obtenida")
-        
-        availability = {}
-        today = datetime.now()
+        own_instance = playtomic is None
+        if own_instance:
+            logger.info("🔧 Obteniendo instancia de Playtomic...")
+            playtomic = await get_playtomic_instance()
+            logger.info("✅ Instancia obtenida")
         
-        for day_offset in range(days):
-            date = today + timedelta(days=day_offset)
-            date_str = date.strftime('%Y-%m-%d')
-            date_formatted = date.strftime('%d/%m/%Y')
-            
-            logger.info("=" * 60)
-            logger.info(f"📅 Scrapeando {date_str} ({date_formatted})...")
-            logger.info("=" * 60)
-            
+        init_db()
+        started = time.perf_counter()
+        today = datetime.now(pytz.timezone(TIMEZONE)).replace(tzinfo=None)  # Día local del club
+        semaphore = asyncio.Semaphore(SCRAPER_CONCURRENCY)
+        rate_limiter = HostRateLimiter()
+        try:
+            results = await asyncio.gather(*[
+                scrape_day(playtomic, today + timedelta(days=day_offset), semaphore, rate_limiter, club_name, club_url)
+                for day_offset in range(days)
+            ])
+            db = SessionLocal()
             try:
-                # Scrapear canchas disponibles para este día
-                courts = await playtomic.get_available_courts(
-                    date, 
-                    time_slot=None,
-                    club_name=club_name,
-                    club_url=club_url
-                )
-                
-                availability[date_str] = courts
-                
-                logger.info(f"✅ {date_str}: {len(courts)} canchas encontradas")
-                
-                # Mostrar resumen de canchas encontradas
-                if courts:
-                    logger.info("📋 Canchas encontradas:")
-                    for i, court in enumerate(courts[:5], 1):
-                        logger.info(f"   {i}. {court.get('name', 'N/A')} - {court.get('time', 'N/A')}")
-                    if len(courts) > 5:
-                        logger.info(f"   ... y {len(courts) - 5} más")
-                
-                # Pausa entre días para no sobrecargar
-                if day_offset < days - 1:  # No esperar después del último día
-                    logger.info("⏳ Esperando 2 segundos antes del siguiente día...")
-                    await asyncio.sleep(2)
-                    
-            except Exception as e:
-                logger.error(f"❌ Error scrapeando {date_str}: {e}")
-                import traceback
-                logger.error(traceback.format_exc())
-                availability[date_str] = []
-        
-        # Guardar en archivo JSON
-        cache_data = {
-            'timestamp': datetime.now().isoformat(),
-            'scraped_days': days,
-            'availability': availability
-        }
-        
-        logger.info("=" * 60)
-        logger.info(f"💾 Guardando disponibilidad en {CACHE_FILE}...")
-        
-        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, indent=2, ensure_ascii=False)
+                purge_changes(db)
+            finally:
+                db.close()
+        finally:
+            if own_instance:
+                await playtomic.close()
+        availability = {date_str: courts for date_str, courts in results if courts is not None}
+        failed_days = days - len(availability)
         
         # Calcular estadísticas
         total_courts = sum(len(courts) for courts in availability.values())
@@ -128,7 +171,10 @@ async def scrape_availability(days=3, club_name=None, club_url=None):
         logger.info("✅ SCRAPING COMPLETADO")
         logger.info(f"📊 Total de canchas encontradas: {total_courts}")
         logger.info(f"📅 Días con disponibilidad: {days_with_courts}/{days}")
-        logger.info(f"💾 Cache guardado en: {CACHE_FILE}")
+        if failed_days:
+            logger.warning(f"⚠️  Días que no se pudieron consultar: {failed_days}")
+        logger.info(f"⏱️  Tiempo total: {time.perf_counter() - started:.1f}s")
+        logger.info("💾 Disponibilidad guardada en la base de datos")
         logger.info("=" * 80)
         
         return availability
@@ -140,70 +186,47 @@ async def scrape_availability(days=3, club_name=None, club_url=None):
         return {}
 
 
-def load_availability_cache():
-    """
-    Cargar disponibilidad desde cache JSON
-    
-    Returns:
-        Diccionario con disponibilidad si el cache es válido, None si no
-    """
-    try:
-        if not os.path.exists(CACHE_FILE):
-            logger.debug(f"Cache file {CACHE_FILE} no existe")
-            return None
-        
-        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Verificar que el cache no sea muy viejo
-        cache_time = datetime.fromisoformat(data['timestamp'])
-        age_hours = (datetime.now() - cache_time).total_seconds() / 3600
-        
-        if age_hours > MAX_CACHE_AGE_HOURS:
-            logger.info(f"⚠️  Cache expirado (edad: {age_hours:.1f} horas)")
-            return None
-        
-        logger.info(f"✅ Cache válido (edad: {age_hours:.1f} horas)")
-        return data.get('availability', {})
-        
-    except Exception as e:
-        logger.warning(f"⚠️  Error cargando cache: {e}")
-        return None
-
-
 async def main():
     """Función principal"""
     # Obtener número de días desde argumentos
-    # Por defecto: 3 días (hoy + 2 días más)
-    days = 3
+    # Por defecto: todo el horizonte (SCRAPER_MAX_DAYS)
+    days = SCRAPER_MAX_DAYS
     if len(sys.argv) > 1:
         try:
             days = int(sys.argv[1])
-            if days < 1 or days > 30:
-                logger.warning(f"⚠️  Número de días inválido ({days}), usando 3 por defecto")
-                days = 3
+            if days < 1:
+                logger.warning(f"⚠️  Número de días inválido ({days}), usando {SCRAPER_MAX_DAYS} por defecto")
+                days = SCRAPER_MAX_DAYS
         except ValueError:
-            logger.warning(f"⚠️  Argumento inválido, usando 3 días por defecto")
+            logger.warning(f"⚠️  Argumento inválido, usando {SCRAPER_MAX_DAYS} días por defecto")
     
-    # Limitar a máximo 3 días (hoy + 2 días más)
-    if days > 3:
-        logger.info(f"⚠️  Limitando a 3 días (hoy + 2 días más). Solicitado: {days}")
-        days = 3
+    # Limitar al horizonte configurado
+    if days > SCRAPER_MAX_DAYS:
+        logger.info(f"⚠️  Limitando a {SCRAPER_MAX_DAYS} días (SCRAPER_MAX_DAYS). Solicitado: {days}")
+        days = SCRAPER_MAX_DAYS
     
     logger.info(f"📅 Scrapeando {days} días: hoy + {days-1} días más")
     
-    # Ejecutar scraping
+    # Ejecutar scraping (cierra su instancia de Playtomic al terminar)
     await scrape_availability(days=days)
-    
-    # Cerrar instancia de Playtomic
-    try:
-        playtomic = await get_playtomic_instance()
-        await playtomic.close()
-    except:
-        pass
 
 
 if __name__ == "__main__":
+    # Configurar logging (solo al ejecutarlo como script; el bot lo importa)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)],
+        force=True
+    )
+    
+    # Configurar encoding para Windows
+    if hasattr(sys.stdout, 'reconfigure'):
+        try:
+            sys.stdout.reconfigure(encoding='utf-8')
+        except:
+            pass
+    
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -0,0 +1,74 @@
+"""
+Coalescencia de llamadas idénticas concurrentes ("single-flight")
+Si varias peticiones piden lo mismo al mismo tiempo, solo una llega a la red
+y el resto espera y reutiliza su resultado
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    """Llamada en curso compartida por todos los que piden la misma clave"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Ejecuta como máximo una llamada en curso por clave
+
+    No guarda resultados: cuando la llamada termina, la siguiente petición con la
+    misma clave vuelve a ejecutarse, así que no introduce datos viejos. El
+    resultado se comparte entre todos los que esperaban y no debe modificarse.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Ejecutar func(*args, **kwargs) o esperar el resultado de la llamada en curso
+
+        Args:
+            key: Clave que identifica peticiones equivalentes
+            func: Función a ejecutar si no hay una llamada en curso
+
+        Returns:
+            Resultado de la llamada (propio o compartido)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """Número de llamadas en curso"""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,172 @@
+"""
+Representación compacta de la disponibilidad de una cancha en un día
+Cada día se divide en 96 bloques de 15 minutos guardados como bits de un entero.
+La usan el cliente de Google Calendar (horarios libres, sugerencias y verificación
+de solapamientos) y el cache del scraper (horarios libres de más de una hora)
+"""
+from datetime import date, datetime, time
+from typing import Iterable, List, Optional, Tuple
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+
+
+def _slot_floor(minutes: int) -> int:
+    return max(0, min(SLOTS_PER_DAY, minutes // SLOT_MINUTES))
+
+
+def _slot_ceil(minutes: int) -> int:
+    return max(0, min(SLOTS_PER_DAY, -(-minutes // SLOT_MINUTES)))
+
+
+def _range_mask(first_slot: int, last_slot: int) -> int:
+    """Máscara con los bits [first_slot, last_slot) encendidos"""
+    if last_slot <= first_slot:
+        return 0
+    return ((1 << (last_slot - first_slot)) - 1) << first_slot
+
+
+class DayBitmap:
+    """
+    Bloques ocupados de un día: el bit i representa el bloque que empieza en el
+    minuto i * 15 (hora local). Bit encendido = ocupado.
+
+    Los intervalos se redondean hacia afuera a bloques de 15 minutos, así que un
+    evento de 18:10 a 19:05 ocupa de 18:00 a 19:15.
+    """
+
+    __slots__ = ('bits',)
+
+    def __init__(self, bits: int = 0):
+        self.bits = bits & FULL_DAY_MASK
+
+    @classmethod
+    def from_intervals(cls, intervals: Iterable[Tuple[datetime, datetime]], day: date) -> 'DayBitmap':
+        """
+        Crear el bitmap de un día a partir de intervalos ocupados
+
+        Args:
+            intervals: Intervalos (inicio, fin) en la zona horaria local; pueden
+                empezar antes o terminar después del día
+            day: Día representado
+        """
+        midnight = datetime.combine(day, time.min)
+        bits = 0
+        for start, end in intervals:
+            start_minutes = int((start.replace(tzinfo=None) - midnight).total_seconds() // 60)
+            end_minutes = int(-((midnight - end.replace(tzinfo=None)).total_seconds() // 60))
+            bits |= _range_mask(_slot_floor(start_minutes), _slot_ceil(end_minutes))
+        return cls(bits)
+
+    @classmethod
+    def from_start_times(cls, times: Iterable[str], duration_minutes: int = SLOT_MINUTES) -> 'DayBitmap':
+        """
+        Crear un bitmap con los bloques cubiertos por horarios "HH:MM" de cierta duración
+
+        Útil para representar listas de horarios (ej. la disponibilidad del scraper).
+        """
+        bits = 0
+        blocks = _slot_ceil(duration_minutes)
+        for value in times:
+            hour, minute = map(int, value.split(':'))
+            first = _slot_floor(hour * 60 + minute)
+            bits |= _range_mask(first, min(SLOTS_PER_DAY, first + blocks))
+        return cls(bits)
+
+    def mark(self, start_minutes: int, end_minutes: int):
+        """Marcar como ocupado el rango [start_minutes, end_minutes) del día"""
+        self.bits |= _range_mask(_slot_floor(start_minutes), _slot_ceil(end_minutes))
+
+    def is_free(self, start_minutes: int, duration_minutes: int) -> bool:
+        """Indica si el rango que empieza en start_minutes está completamente libre"""
+        first = _slot_floor(start_minutes)
+        last = _slot_ceil(start_minutes + duration_minutes)
+        return not self.bits & _range_mask(first, last)
+
+    def free_starts(
+        self,
+        duration_minutes: int,
+        open_minutes: int = 0,
+        close_minutes: int = 24 * 60,
+        step_minutes: int = SLOT_MINUTES
+    ) -> List[int]:
+        """
+        Minutos de inicio con `duration_minutes` libres y contiguos
+
+        Args:
+            duration_minutes: Duración buscada
+            open_minutes: Apertura de la cancha (minutos desde medianoche)
+            close_minutes: Cierre de la cancha (minutos desde medianoche)
+            step_minutes: Separación entre horarios de inicio (múltiplo de 15)
+
+        Returns:
+            Lista de minutos desde medianoche, en orden
+        """
+        blocks = _slot_ceil(duration_minutes)
+        first = _slot_ceil(open_minutes)
+        last = _slot_floor(close_minutes) - blocks + 1
+        if blocks <= 0 or last <= first:
+            return []
+
+        free = ~self.bits & FULL_DAY_MASK
+        # El bit j de `runs` queda encendido si los bloques j..j+blocks-1 están libres
+        runs = free
+        width = 1
+        while width < blocks:
+            shift = min(width, blocks - width)
+            runs &= runs >> shift
+            width += shift
+        runs &= _range_mask(first, last)
+
+        step = max(1, step_minutes // SLOT_MINUTES)
+        starts = []
+        while runs:
+            low = runs & -runs
+            slot = low.bit_length() - 1
+            if (slot - first) % step == 0:
+                starts.append(slot * SLOT_MINUTES)
+            runs ^= low
+        return starts
+
+    def union(self, other: 'DayBitmap') -> 'DayBitmap':
+        """Bloques ocupados en cualquiera de los dos bitmaps"""
+        return DayBitmap(self.bits | other.bits)
+
+    def intersection(self, other: 'DayBitmap') -> 'DayBitmap':
+        """Bloques ocupados en ambos bitmaps (ej. horas sin ninguna cancha libre)"""
+        return DayBitmap(self.bits & other.bits)
+
+    __or__ = union
+    __and__ = intersection
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, DayBitmap) and self.bits == other.bits
+
+    def __hash__(self) -> int:
+        return hash(self.bits)
+
+    def __repr__(self) -> str:
+        return f"DayBitmap({self.to_hex()})"
+
+    def count_busy(self) -> int:
+        """Número de bloques ocupados"""
+        return bin(self.bits).count('1')
+
+    def to_hex(self) -> str:
+        """Serializar a 24 caracteres hexadecimales"""
+        return f"{self.bits:024x}"
+
+    @classmethod
+    def from_hex(cls, value: Optional[str]) -> 'DayBitmap':
+        """Deserializar desde to_hex()"""
+        return cls(int(value, 16) if value else 0)
+
+    def to_bytes(self) -> bytes:
+        """Serializar a 12 bytes"""
+        return self.bits.to_bytes(SLOTS_PER_DAY // 8, 'big')
+
+    @classmethod
+    def from_bytes(cls, value: bytes) -> 'DayBitmap':
+        """Deserializar desde to_bytes()"""
+        return cls(int.from_bytes(value, 'big'))
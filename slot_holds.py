@@ -0,0 +1,137 @@
+"""
+Retenciones temporales de canchas entre mostrar la disponibilidad y confirmar
+Cuando el usuario elige una cancha se guardan sus bloques en slot_ledger con un
+vencimiento; mientras tanto no aparecen en la disponibilidad de otros usuarios y
+nadie más puede reservarlos. Un thread libera las retenciones al vencer
+"""
+import heapq
+import logging
+import threading
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from reservation_ledger import place_hold, release_holds, purge_expired_holds
+from config import SLOT_HOLD_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class SlotHoldManager:
+    """
+    Retenciones de canchas con vencimiento
+
+    Los vencimientos pendientes se guardan en un min-heap: el thread duerme hasta el
+    más próximo y entonces borra de la BD todas las retenciones vencidas (incluidas
+    las de otros procesos o de una ejecución anterior).
+    """
+
+    def __init__(self, ttl_seconds: int = SLOT_HOLD_TTL_SECONDS):
+        """
+        Args:
+            ttl_seconds: Duración de cada retención en segundos
+        """
+        self.ttl_seconds = ttl_seconds
+        self._expirations: List[datetime] = []
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def hold(self, db: Session, holder: str, court_name: str, start: datetime, duration_minutes: int = 60) -> datetime:
+        """
+        Retener una cancha para un usuario (reemplaza su retención anterior)
+
+        Returns:
+            datetime: Vencimiento de la retención (UTC)
+
+        Raises:
+            SlotUnavailableError: La cancha ya está reservada o retenida por otro usuario
+        """
+        expires_at = place_hold(db, holder, court_name, start, duration_minutes, self.ttl_seconds)
+        with self._condition:
+            heapq.heappush(self._expirations, expires_at)
+            if self._expirations[0] == expires_at:
+                self._condition.notify()
+        return expires_at
+
+    def release(self, db: Session, holder: str) -> int:
+        """Liberar las retenciones de un usuario (ej. no confirmó la reserva)"""
+        return release_holds(db, holder)
+
+    def purge_expired(self) -> int:
+        """
+        Liberar las retenciones vencidas
+
+        Returns:
+            int: Número de bloques liberados
+        """
+        db = SessionLocal()
+        try:
+            purged = purge_expired_holds(db)
+            if purged:
+                logger.info(f"⌛ {purged} bloques retenidos liberados por vencimiento")
+            return purged
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error liberando retenciones vencidas: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def _run(self):
+        # Retenciones que quedaron de una ejecución anterior
+        self.purge_expired()
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if not self._expirations:
+                        self._condition.wait()
+                        continue
+                    delay = (self._expirations[0] - datetime.utcnow()).total_seconds()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                if self._stopped:
+                    return
+                now = datetime.utcnow()
+                while self._expirations and self._expirations[0] <= now:
+                    heapq.heappop(self._expirations)
+            self.purge_expired()
+
+    def start(self):
+        """Arrancar el thread que libera las retenciones vencidas"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="slot-holds", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Detener el thread"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+
+# Instancia global de las retenciones
+_slot_hold_manager: Optional[SlotHoldManager] = None
+
+
+def get_slot_hold_manager() -> Optional[SlotHoldManager]:
+    """Obtener el gestor de retenciones activo (None si no se inició)"""
+    return _slot_hold_manager
+
+
+def start_slot_hold_manager() -> SlotHoldManager:
+    """
+    Crear y arrancar el gestor de retenciones
+
+    Returns:
+        SlotHoldManager: Gestor activo
+    """
+    global _slot_hold_manager
+
+    if _slot_hold_manager is None:
+        _slot_hold_manager = SlotHoldManager()
+        _slot_hold_manager.start()
+    return _slot_hold_manager
@@ -0,0 +1,180 @@
+"""
+Registros compactos de horarios libres
+Un horario es una tupla (Slot) en vez de un dict con claves repetidas, y los horarios
+de un día se guardan en arrays paralelos (DaySlots): minutos desde medianoche e
+índices a tablas de canchas y precios (strings internados, compartidos por todos
+los días y conversaciones). Se usan en la salida del scraper, el cache de
+disponibilidad y el contexto de las conversaciones
+"""
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+
+class Slot(NamedTuple):
+    """Horario libre de una cancha"""
+    name: str
+    time: str  # HH:MM
+    date: str  # YYYY-MM-DD
+    price: Optional[str] = None
+
+
+def intern_name(name: str) -> str:
+    """Internar un nombre de cancha (o precio) para que todas sus copias compartan memoria"""
+    return sys.intern(name.strip())
+
+
+def _to_minutes(time_str: str) -> Optional[int]:
+    try:
+        hour, minute = str(time_str).split(':')
+        minutes = int(hour) * 60 + int(minute)
+    except (TypeError, ValueError):
+        return None
+    return minutes if 0 <= minutes < 24 * 60 else None
+
+
+# Texto HH:MM de cada minuto del día, para no formatear la hora en cada acceso
+_TIMES = tuple(sys.intern(f"{minutes // 60:02d}:{minutes % 60:02d}") for minutes in range(24 * 60))
+
+
+class DaySlots:
+    """
+    Horarios libres de un día, ordenados por hora y cancha y sin repetidos
+
+    Se recorre como una secuencia de Slot. Cada horario ocupa unos pocos bytes en
+    los arrays; las canchas y precios se guardan una sola vez por día.
+    """
+
+    __slots__ = ('date', '_courts', '_prices', '_minutes', '_court_ids', '_price_ids')
+
+    def __init__(self, date: str, slots: Iterable[Union[Slot, Dict[str, Any]]] = ()):
+        """
+        Args:
+            date: Fecha en formato YYYY-MM-DD
+            slots: Slot o dicts {'name', 'time', 'price'}; se descartan los que no
+                tienen hora HH:MM y, si se repite cancha y hora, queda el primero
+        """
+        self.date = date
+        entries = {}
+        for slot in slots:
+            if isinstance(slot, dict):
+                name, time_str, price = slot.get('name'), slot.get('time'), slot.get('price')
+            else:
+                name, time_str, price = slot.name, slot.time, slot.price
+            minutes = _to_minutes(time_str)
+            if minutes is None or not isinstance(name, str):
+                continue
+            entries.setdefault((minutes, intern_name(name)), None if price is None else str(price))
+
+        self._courts: List[str] = []
+        self._prices: List[Optional[str]] = []
+        self._minutes = array('H')
+        self._court_ids = array('H')
+        self._price_ids = array('H')
+        court_index: Dict[str, int] = {}
+        price_index: Dict[Optional[str], int] = {}
+        for (minutes, name), price in sorted(entries.items()):
+            if name not in court_index:
+                court_index[name] = len(self._courts)
+                self._courts.append(name)
+            if price not in price_index:
+                price_index[price] = len(self._prices)
+                self._prices.append(price if price is None else intern_name(price))
+            self._minutes.append(minutes)
+            self._court_ids.append(court_index[name])
+            self._price_ids.append(price_index[price])
+
+    @classmethod
+    def _from_arrays(cls, source: 'DaySlots', minutes, court_ids, price_ids) -> 'DaySlots':
+        day = cls.__new__(cls)
+        day.date = source.date
+        day._courts = source._courts
+        day._prices = source._prices
+        day._minutes = array('H', minutes)
+        day._court_ids = array('H', court_ids)
+        day._price_ids = array('H', price_ids)
+        return day
+
+    def __len__(self) -> int:
+        return len(self._minutes)
+
+    def __getitem__(self, index: int) -> Slot:
+        return Slot(
+            self._courts[self._court_ids[index]],
+            _TIMES[self._minutes[index]],
+            self.date,
+            self._prices[self._price_ids[index]]
+        )
+
+    def __iter__(self) -> Iterator[Slot]:
+        for index in range(len(self._minutes)):
+            yield self[index]
+
+    def __repr__(self) -> str:
+        return f"DaySlots({self.date!r}, {len(self)} horarios)"
+
+    def at(self, time_str: str) -> 'DaySlots':
+        """Horarios de una hora concreta (búsqueda binaria sobre los minutos ordenados)"""
+        minutes = _to_minutes(time_str)
+        if minutes is None:
+            return self._from_arrays(self, (), (), ())
+        start, end = bisect_left(self._minutes, minutes), bisect_right(self._minutes, minutes)
+        return self._from_arrays(self, self._minutes[start:end], self._court_ids[start:end], self._price_ids[start:end])
+
+    def filter(self, predicate: Callable[[Slot], bool]) -> 'DaySlots':
+        """Horarios que cumplen `predicate`"""
+        keep = [index for index, slot in enumerate(self) if predicate(slot)]
+        if len(keep) == len(self):
+            return self
+        return self._from_arrays(
+            self,
+            (self._minutes[i] for i in keep),
+            (self._court_ids[i] for i in keep),
+            (self._price_ids[i] for i in keep)
+        )
+
+    def by_time(self) -> Dict[str, List[str]]:
+        """Canchas agrupadas por hora, en orden"""
+        grouped: Dict[str, List[str]] = {}
+        courts = self._courts
+        for minutes, court_id in zip(self._minutes, self._court_ids):
+            time_str = _TIMES[minutes]
+            if time_str in grouped:
+                grouped[time_str].append(courts[court_id])
+            else:
+                grouped[time_str] = [courts[court_id]]
+        return grouped
+
+    def to_context(self) -> Dict[str, Any]:
+        """Forma compacta serializable a JSON (para el contexto de la conversación)"""
+        used_courts = sorted(set(self._court_ids))
+        used_prices = sorted(set(self._price_ids))
+        court_map = {old: new for new, old in enumerate(used_courts)}
+        price_map = {old: new for new, old in enumerate(used_prices)}
+        return {
+            'date': self.date,
+            'courts': [self._courts[i] for i in used_courts],
+            'prices': [self._prices[i] for i in used_prices],
+            'minutes': list(self._minutes),
+            'court_ids': [court_map[i] for i in self._court_ids],
+            'price_ids': [price_map[i] for i in self._price_ids]
+        }
+
+    @classmethod
+    def from_context(cls, data: Any, date: Optional[str] = None) -> 'DaySlots':
+        """
+        Reconstruir los horarios guardados con to_context()
+
+        También acepta la lista de dicts que guardaban las conversaciones anteriores.
+        """
+        if isinstance(data, dict) and 'minutes' in data:
+            day = cls.__new__(cls)
+            day.date = data.get('date') or date
+            day._courts = [intern_name(name) for name in data.get('courts', [])]
+            day._prices = [price if price is None else intern_name(price) for price in data.get('prices', [])]
+            day._minutes = array('H', data.get('minutes', []))
+            day._court_ids = array('H', data.get('court_ids', []))
+            day._price_ids = array('H', data.get('price_ids', []))
+            return day
+        return cls(date, data if isinstance(data, list) else [])
@@ -0,0 +1,93 @@
+"""
+Pruebas de la comparación entre scrapings (update_date_slots) y el feed de cambios
+Usa la base de datos SQLite temporal de conftest.py
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import SessionLocal, init_db
+from availability_store import (
+    CHANGE_OPENED,
+    CHANGE_TAKEN,
+    get_changes,
+    get_scrape_info,
+    get_slots,
+    subscribe_changes,
+    unsubscribe_changes,
+    update_date_slots
+)
+
+init_db()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def court(name: str, time: str, price: str = "20 EUR"):
+    return {"name": name, "time": time, "price": price}
+
+
+def test_primer_scraping_es_linea_base(db):
+    changes = update_date_slots(db, "2030-03-01", [court("Cancha 1", "18:00"), court("Cancha 2", "18:00")])
+    assert changes == []
+    assert get_changes(db, date_str="2030-03-01") == []
+    assert [(slot.name, slot.time) for slot in get_slots(db, "2030-03-01")] == [("Cancha 1", "18:00"), ("Cancha 2", "18:00")]
+
+
+def test_solo_se_registra_lo_que_cambio(db):
+    date_str = "2030-03-02"
+    first_at = datetime(2030, 3, 1, 12, 0)
+    update_date_slots(db, date_str, [court("Cancha 1", "18:00"), court("Cancha 2", "18:00")], scraped_at=first_at)
+
+    received = []
+    subscribe_changes(received.append)
+    try:
+        second_at = first_at + timedelta(minutes=5)
+        changes = update_date_slots(
+            db, date_str, [court("Cancha 1", "18:00"), court("Cancha 1", "19:00")], scraped_at=second_at
+        )
+    finally:
+        unsubscribe_changes(received.append)
+
+    assert [(change["time"], change["name"], change["change"]) for change in changes] == [
+        ("18:00", "Cancha 2", CHANGE_TAKEN),
+        ("19:00", "Cancha 1", CHANGE_OPENED),
+    ]
+    assert received == [changes]
+    assert get_changes(db, date_str=date_str) == changes
+    assert get_changes(db, since_id=changes[0]["id"], date_str=date_str) == changes[1:]
+    assert [(slot.name, slot.time) for slot in get_slots(db, date_str)] == [("Cancha 1", "18:00"), ("Cancha 1", "19:00")]
+    assert get_scrape_info(db, date_str) == (second_at, second_at)
+
+
+def test_sin_cambios_solo_actualiza_la_hora_del_scraping(db):
+    date_str = "2030-03-03"
+    first_at = datetime(2030, 3, 1, 12, 0)
+    update_date_slots(db, date_str, [court("Cancha 1", "18:00")], scraped_at=first_at)
+    second_at = first_at + timedelta(minutes=5)
+    assert update_date_slots(db, date_str, [court("Cancha 1", "18:00")], scraped_at=second_at) == []
+    assert get_scrape_info(db, date_str) == (second_at, first_at)
+
+
+def test_cambio_de_precio_no_es_un_cambio_de_disponibilidad(db):
+    date_str = "2030-03-04"
+    first_at = datetime(2030, 3, 1, 12, 0)
+    update_date_slots(db, date_str, [court("Cancha 1", "18:00", "20 EUR")], scraped_at=first_at)
+    second_at = first_at + timedelta(minutes=5)
+    assert update_date_slots(db, date_str, [court("Cancha 1", "18:00", "25 EUR")], scraped_at=second_at) == []
+    assert get_slots(db, date_str)[0].price == "25 EUR"
+    # El precio cambió, así que los lectores que cachean por changed_at deben releer
+    assert get_scrape_info(db, date_str) == (second_at, second_at)
+
+
+def test_canchas_invalidas_se_ignoran(db):
+    date_str = "2030-03-05"
+    update_date_slots(db, date_str, [court("Cancha 1", "18:00")])
+    changes = update_date_slots(db, date_str, [court("Cancha 1", "18:00"), court("Playtomic Logo", "19:00"), court("Abc", "19:00")])
+    assert changes == []
+    assert len(get_slots(db, date_str)) == 1
@@ -0,0 +1,41 @@
+"""
+Pruebas del índice de intervalos ocupados: TTL, invalidación y generaciones
+"""
+from datetime import date, datetime
+
+from calendar_busy_index import BusyIntervalIndex
+
+DAY = date(2030, 4, 1)
+BUSY = [(datetime(2030, 4, 1, 18, 0), datetime(2030, 4, 1, 19, 0))]
+WINDOW = (datetime(2030, 4, 1, 0, 0), datetime(2030, 4, 2, 0, 0))
+
+
+def test_guarda_y_responde_dias_completos():
+    index = BusyIntervalIndex(ttl_seconds=60)
+    assert index.get_overlapping("cal", [DAY], *WINDOW) is None
+    assert index.store_days("cal", [DAY], BUSY)
+    assert index.get_overlapping("cal", [DAY], *WINDOW) == BUSY
+    assert index.get_overlapping("cal", [DAY], datetime(2030, 4, 1, 19, 0), datetime(2030, 4, 1, 20, 0)) == []
+
+
+def test_consulta_anterior_a_una_escritura_no_se_guarda():
+    index = BusyIntervalIndex(ttl_seconds=60)
+    generation = index.generation("cal")
+    # Mientras la consulta está en curso se escribe en el calendario
+    index.invalidate("cal", DAY)
+    assert not index.store_days("cal", [DAY], BUSY, generation)
+    assert index.get_overlapping("cal", [DAY], *WINDOW) is None
+
+    # Una consulta que empezó después de la escritura sí se guarda
+    assert index.store_days("cal", [DAY], BUSY, index.generation("cal"))
+    assert index.get_overlapping("cal", [DAY], *WINDOW) == BUSY
+
+
+def test_generaciones_por_calendario():
+    index = BusyIntervalIndex(ttl_seconds=60)
+    generation = index.generation("otro")
+    index.invalidate("cal")
+    assert index.generation("otro") == generation
+    index.invalidate()
+    assert index.generation("otro") != generation
+    assert not index.store_days("otro", [DAY], BUSY, generation)
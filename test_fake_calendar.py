@@ -0,0 +1,182 @@
+"""
+Prueba del cliente de Google Calendar contra el servidor local (fake_calendar_server.py)
+No necesita red ni credenciales: crea eventos, consulta disponibilidad, usa el
+endpoint batch y mide el rendimiento con muchas reservas concurrentes y errores inyectados
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Como script usa una base de datos temporal (con pytest la configura conftest.py)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/fake_calendar.db")
+
+from google_calendar_client import AsyncGoogleCalendarClient, CalendarUnavailableError, reservation_event_id  # noqa: E402
+from calendar_mirror import CalendarMirror  # noqa: E402
+from config import COURT_CALENDAR_MAPPING, TIMEZONE  # noqa: E402
+from database import init_db  # noqa: E402
+from testing_support import FakeCalendar, start_fake_calendar, stop_fake_calendar  # noqa: E402
+import pytz  # noqa: E402
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Reservas simultáneas de la prueba de carga
+CONCURRENT_RESERVATIONS = 200
+
+
+def check(condition: bool, message: str):
+    if not condition:
+        logger.error(f"❌ {message}")
+        raise AssertionError(message)
+    logger.info(f"✅ {message}")
+
+
+async def run_fake_calendar(fake: FakeCalendar):
+    """Probar el cliente completo contra el servidor falso"""
+    logger.info("=" * 60)
+    logger.info(f"🧪 PRUEBA CONTRA GOOGLE CALENDAR FALSO ({fake.endpoint})")
+    logger.info("=" * 60)
+
+    fake_config = fake.config
+    calendar_client = fake.client
+    async_client = AsyncGoogleCalendarClient(calendar_client)
+    tz = pytz.timezone(TIMEZONE)
+    tomorrow = datetime.now(tz) + timedelta(days=1)
+    courts = list(COURT_CALENDAR_MAPPING.keys())
+
+    # 1. Crear un evento y verificar que ocupa el horario
+    event = calendar_client.create_event(courts[0], tomorrow, "18:00", 90, name="Prueba")
+    check(bool(event and event.get('id')), "Evento creado")
+    availability = calendar_client.check_time_availability(tomorrow, "18:30", 60, courts[0])
+    check(not availability["disponible"], "El horario reservado aparece ocupado")
+    free_slots = calendar_client.get_free_slots(tomorrow, 60, [courts[0]])
+    check("18:00" not in free_slots[courts[0]] and "20:00" in free_slots[courts[0]], "get_free_slots excluye la reserva")
+
+    # Un calendario con errores en FreeBusy no se reporta como libre
+    fake_config.update({"freebusy_error_calendar": COURT_CALENDAR_MAPPING[courts[0]]})
+    error_day = tomorrow + timedelta(days=5)
+    try:
+        calendar_client.get_free_slots(error_day, 60, [courts[0]])
+        failed = False
+    except CalendarUnavailableError:
+        failed = True
+    check(failed, "FreeBusy con errores se informa como Calendar no disponible")
+    fake_config.update({"freebusy_error_calendar": ""})
+
+    # 2. Reintentar la misma reserva con ID determinístico no la duplica
+    start = tz.localize(datetime.combine(tomorrow.date(), datetime.min.time()).replace(hour=10))
+    event_id = reservation_event_id(courts[0], start, "+5490000000000")
+    first = calendar_client.create_event(courts[0], tomorrow, "10:00", event_id=event_id)
+    second = calendar_client.create_event(courts[0], tomorrow, "10:00", event_id=event_id)
+    check(first['id'] == second['id'] == event_id, "Reserva idempotente (409 devuelve el evento existente)")
+
+    # 3. Batch: crear y borrar varios eventos en una petición
+    batch = [
+        {"court_name": court, "date": tomorrow, "time_slot": "07:00", "phone_number": "+5490000000000"}
+        for court in courts
+    ]
+    created = calendar_client.create_events_batch(batch)
+    check(all(result["ok"] for result in created), f"Batch de creación ({len(created)} eventos)")
+    retried = calendar_client.create_events_batch(batch)
+    check(
+        [result["result"]["id"] for result in retried] == [result["result"]["id"] for result in created],
+        "Reintentar el batch no duplica eventos (409 por evento)"
+    )
+    deleted = calendar_client.delete_events_batch([
+        {"event_id": result["result"]["id"], "court_name": court} for result, court in zip(created, courts)
+    ])
+    check(all(result["ok"] for result in deleted), "Batch de eliminación")
+
+    # 4. Carga: muchas reservas concurrentes con latencia y errores de cuota inyectados
+    fake_config.update({"latency_ms": 20, "latency_jitter_ms": 30, "rate_limit_rate": 0.1})
+    day = tomorrow + timedelta(days=1)
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        async_client.create_event(
+            courts[i % len(courts)],
+            day + timedelta(days=i // 64),
+            f"{6 + (i // len(courts)) % 16:02d}:00",
+            event_id=f"carga{i:05d}"
+        )
+        for i in range(CONCURRENT_RESERVATIONS)
+    ], return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    ok = sum(1 for result in results if isinstance(result, dict) and result.get('id'))
+    logger.info(
+        f"📊 {ok}/{CONCURRENT_RESERVATIONS} reservas en {elapsed:.2f}s "
+        f"({CONCURRENT_RESERVATIONS / elapsed:.0f}/s), límite de concurrencia final: {calendar_client.rate_limiter.limit}"
+    )
+    check(ok == CONCURRENT_RESERVATIONS, "Todas las reservas se completaron pese a los errores de cuota")
+    fake_config.update({"latency_ms": 0, "latency_jitter_ms": 0, "rate_limit_rate": 0})
+
+    # 5. Mirror: las reservas propias se ven enseguida en la copia local
+    init_db()
+    mirror = CalendarMirror(calendar_client)
+    mirror.sync_all()
+    calendar_client.mirror = mirror
+    try:
+        mirror_day = tomorrow + timedelta(days=10)
+        check(mirror.is_fresh([COURT_CALENDAR_MAPPING[courts[0]]]), "Mirror sincronizado")
+        event = calendar_client.create_event(courts[0], mirror_day, "19:00", 60, name="Mirror")
+        free_slots = calendar_client.get_free_slots(mirror_day, 60, [courts[0]])
+        check("19:00" not in free_slots[courts[0]], "El mirror refleja la reserva creada")
+        check(calendar_client.delete_event(event['id'], courts[0]), "Evento borrado")
+        free_slots = calendar_client.get_free_slots(mirror_day, 60, [courts[0]])
+        check("19:00" in free_slots[courts[0]], "El mirror refleja la reserva borrada")
+    finally:
+        calendar_client.mirror = None
+
+    logger.info("\n✅ Todas las pruebas pasaron")
+
+
+def test_fake_calendar(fake_calendar):
+    """Entrada para pytest (no necesita plugin de asyncio)"""
+    asyncio.run(run_fake_calendar(fake_calendar))
+
+
+
+def test_lectura_en_curso_no_oculta_una_reserva(fake_calendar, monkeypatch):
+    """Una consulta FreeBusy que empezó antes de reservar no se reutiliza ni se guarda después"""
+    calendar_client = fake_calendar.client
+    court = list(COURT_CALENDAR_MAPPING.keys())[0]
+    day = datetime.now(pytz.timezone(TIMEZONE)) + timedelta(days=20)
+
+    # La respuesta de FreeBusy (anterior a la reserva) tarda en llegar
+    execute = calendar_client._execute
+
+    def slow_freebusy(request, *args, **kwargs):
+        result = execute(request, *args, **kwargs)
+        if 'freeBusy' in request.uri:
+            time.sleep(0.3)
+        return result
+
+    monkeypatch.setattr(calendar_client, "_execute", slow_freebusy)
+    leader = {}
+    thread = threading.Thread(target=lambda: leader.update(calendar_client.get_free_slots(day, 60, [court])))
+    thread.start()
+    time.sleep(0.1)
+    calendar_client.create_event(court, day, "20:00", 60, name="Carrera")
+
+    assert "20:00" not in calendar_client.get_free_slots(day, 60, [court])[court]
+    thread.join()
+    assert "20:00" in leader[court]
+    assert "20:00" not in calendar_client.get_free_slots(day, 60, [court])[court]
+
+
+if __name__ == "__main__":
+    fake = start_fake_calendar()
+    try:
+        asyncio.run(run_fake_calendar(fake))
+    except AssertionError:
+        sys.exit(1)
+    finally:
+        stop_fake_calendar(fake)
@@ -140,17 +140,18 @@ async def cleanup_test_events(event_ids: list):
     try:
         calendar_client = await get_google_calendar_instance()
         
-        for event_info in event_ids:
-            court_name = event_info.get('court')
+        # Eliminar todos los eventos en una sola petición batch
+        results = calendar_client.delete_events_batch([
+            {'event_id': event_info.get('event_id'), 'court_name': event_info.get('court')}
+            for event_info in event_ids
+        ])
+        
+        for event_info, result in zip(event_ids, results):
             event_id = event_info.get('event_id')
-            
-            logger.info(f"🗑️  Eliminando evento de {court_name}...")
-            success = calendar_client.delete_event(event_id, court_name)
-            
-            if success:
+            if result['ok']:
                 logger.info(f"✅ Evento eliminado: {event_id}")
             else:
-                logger.warning(f"⚠️  No se pudo eliminar evento: {event_id}")
+                logger.warning(f"⚠️  No se pudo eliminar evento: {event_id} ({result['error']})")
         
         logger.info("✅ Limpieza completada")
         
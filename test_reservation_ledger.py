@@ -0,0 +1,108 @@
+"""
+Pruebas del registro local de reservas: conflictos entre reservas y cambios de duración
+Usa la base de datos SQLite temporal de conftest.py
+"""
+from datetime import datetime
+
+import pytest
+
+from database import SessionLocal, User, init_db
+from reservation_ledger import (
+    SlotUnavailableError,
+    book_reservation,
+    release_reservation,
+    resize_reservation,
+    slot_starts
+)
+
+init_db()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def make_user(db, phone: str) -> User:
+    user = User(phone_number=phone)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def slot_times(reservation):
+    return sorted(slot.slot_start.strftime("%H:%M") for slot in reservation.slots)
+
+
+def test_slot_starts_redondea_hacia_afuera():
+    starts = slot_starts(datetime(2030, 2, 1, 18, 10), 60)
+    assert [start.strftime("%H:%M") for start in starts] == ["18:00", "18:15", "18:30", "18:45", "19:00"]
+
+
+def test_reserva_solapada_se_rechaza(db):
+    user = make_user(db, "+5490000000101")
+    first, created = book_reservation(db, user, "Ledger Conflicto", datetime(2030, 2, 1, 18, 0), 90, "ledger-conflicto-1")
+    assert created
+    assert slot_times(first) == ["18:00", "18:15", "18:30", "18:45", "19:00", "19:15"]
+
+    # Se solapa un bloque (19:15) con la reserva anterior
+    with pytest.raises(SlotUnavailableError):
+        book_reservation(db, user, "Ledger Conflicto", datetime(2030, 2, 1, 19, 15), 60, "ledger-conflicto-2")
+
+    # Justo a continuación no hay conflicto, ni en otra cancha a la misma hora
+    _, created = book_reservation(db, user, "Ledger Conflicto", datetime(2030, 2, 1, 19, 30), 60, "ledger-conflicto-3")
+    assert created
+    _, created = book_reservation(db, user, "Ledger Otra", datetime(2030, 2, 1, 18, 0), 90, "ledger-conflicto-4")
+    assert created
+
+
+def test_reserva_repetida_no_se_duplica_y_liberada_se_reactiva(db):
+    user = make_user(db, "+5490000000102")
+    start = datetime(2030, 2, 2, 10, 0)
+    first, _ = book_reservation(db, user, "Ledger Idempotente", start, 60, "ledger-idempotente")
+    again, created = book_reservation(db, user, "Ledger Idempotente", start, 60, "ledger-idempotente")
+    assert not created
+    assert again.id == first.id
+
+    release_reservation(db, first, "prueba")
+    assert first.status == "cancelled"
+    assert first.slots == []
+
+    # Liberada, el horario vuelve a estar disponible para la misma reserva
+    reactivated, created = book_reservation(db, user, "Ledger Idempotente", start, 60, "ledger-idempotente")
+    assert created
+    assert reactivated.id == first.id
+    assert reactivated.status == "confirmed"
+    assert len(reactivated.slots) == 4
+
+
+def test_resize_agranda_y_achica(db):
+    user = make_user(db, "+5490000000103")
+    reservation, _ = book_reservation(db, user, "Ledger Resize", datetime(2030, 2, 3, 18, 0), 60, "ledger-resize")
+
+    resize_reservation(db, reservation, 90)
+    assert reservation.duration_minutes == 90
+    assert slot_times(reservation)[-1] == "19:15"
+
+    resize_reservation(db, reservation, 30)
+    assert reservation.duration_minutes == 30
+    assert slot_times(reservation) == ["18:00", "18:15"]
+
+    # Los bloques liberados quedan disponibles para otra reserva
+    _, created = book_reservation(db, user, "Ledger Resize", datetime(2030, 2, 3, 18, 30), 60, "ledger-resize-2")
+    assert created
+
+
+def test_resize_con_conflicto_no_cambia_la_reserva(db):
+    user = make_user(db, "+5490000000104")
+    reservation, _ = book_reservation(db, user, "Ledger Resize Conflicto", datetime(2030, 2, 4, 18, 0), 60, "ledger-rc-1")
+    book_reservation(db, user, "Ledger Resize Conflicto", datetime(2030, 2, 4, 19, 0), 60, "ledger-rc-2")
+
+    with pytest.raises(SlotUnavailableError):
+        resize_reservation(db, reservation, 90)
+
+    db.refresh(reservation)
+    assert reservation.duration_minutes == 60
+    assert slot_times(reservation) == ["18:00", "18:15", "18:30", "18:45"]
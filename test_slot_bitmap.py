@@ -0,0 +1,106 @@
+"""
+Pruebas de DayBitmap: horarios de inicio libres, solapamientos, operaciones entre
+canchas, serialización y bitmaps de los horarios del scraper
+"""
+from datetime import date, datetime
+
+from availability_cache import court_bitmaps
+from slot_bitmap import DayBitmap
+from slot_records import DaySlots
+
+DAY = date(2030, 1, 15)
+
+
+def busy(start: str, end: str):
+    """Intervalo ocupado del día de prueba a partir de horas HH:MM"""
+    return (
+        datetime.combine(DAY, datetime.strptime(start, "%H:%M").time()),
+        datetime.combine(DAY, datetime.strptime(end, "%H:%M").time())
+    )
+
+
+def times(minutes):
+    return [f"{m // 60:02d}:{m % 60:02d}" for m in minutes]
+
+
+def test_dia_libre_respeta_apertura_cierre_y_paso():
+    starts = DayBitmap().free_starts(60, open_minutes=6 * 60, close_minutes=23 * 60, step_minutes=30)
+    assert starts[0] == 6 * 60
+    assert starts[-1] == 22 * 60
+    assert len(starts) == 33
+    assert all(b - a == 30 for a, b in zip(starts, starts[1:]))
+
+
+def test_intervalo_ocupado_se_redondea_hacia_afuera():
+    # 18:10-19:05 ocupa los bloques de 18:00 a 19:15
+    bitmap = DayBitmap.from_intervals([busy("18:10", "19:05")], DAY)
+    starts = times(bitmap.free_starts(60, open_minutes=16 * 60, close_minutes=22 * 60, step_minutes=15))
+    assert "17:00" in starts
+    assert "17:15" not in starts
+    assert "19:00" not in starts
+    assert "19:15" in starts
+
+
+def test_busca_bloques_contiguos_de_la_duracion_pedida():
+    # Hueco de 60 minutos entre dos reservas: entra un turno de 60 pero no uno de 90
+    bitmap = DayBitmap.from_intervals([busy("08:00", "10:00"), busy("11:00", "13:00")], DAY)
+    assert times(bitmap.free_starts(60, open_minutes=8 * 60, close_minutes=13 * 60)) == ["10:00"]
+    assert bitmap.free_starts(90, open_minutes=8 * 60, close_minutes=13 * 60) == []
+
+
+def test_intervalos_fuera_del_dia_se_recortan():
+    previous_night = (datetime(2030, 1, 14, 22, 0), datetime(2030, 1, 15, 7, 0))
+    next_night = (datetime(2030, 1, 15, 22, 0), datetime(2030, 1, 16, 2, 0))
+    bitmap = DayBitmap.from_intervals([previous_night, next_night], DAY)
+    starts = times(bitmap.free_starts(60, open_minutes=6 * 60, close_minutes=23 * 60, step_minutes=60))
+    assert starts[0] == "07:00"
+    assert starts[-1] == "21:00"
+
+
+def test_apertura_no_alineada_y_duracion_mayor_al_horario():
+    # La apertura se redondea al bloque siguiente y el paso se cuenta desde ahí
+    starts = times(DayBitmap().free_starts(60, open_minutes=6 * 60 + 10, close_minutes=8 * 60, step_minutes=30))
+    assert starts == ["06:15", "06:45"]
+    assert DayBitmap().free_starts(180, open_minutes=6 * 60, close_minutes=8 * 60) == []
+
+
+def test_is_free_y_mark():
+    bitmap = DayBitmap()
+    bitmap.mark(18 * 60, 19 * 60 + 30)
+    assert not bitmap.is_free(19 * 60, 60)
+    assert bitmap.is_free(19 * 60 + 30, 60)
+    assert bitmap.is_free(17 * 60, 60)
+    assert not bitmap.is_free(17 * 60, 61)
+    assert bitmap.count_busy() == 6
+
+
+def test_union_e_interseccion_entre_canchas():
+    court_1 = DayBitmap.from_intervals([busy("18:00", "20:00")], DAY)
+    court_2 = DayBitmap.from_intervals([busy("19:00", "21:00")], DAY)
+    # Ocupadas las dos (ninguna cancha libre) solo de 19 a 20
+    assert (court_1 & court_2) == DayBitmap.from_intervals([busy("19:00", "20:00")], DAY)
+    assert (court_1 | court_2) == DayBitmap.from_intervals([busy("18:00", "21:00")], DAY)
+
+
+def test_serializacion():
+    bitmap = DayBitmap.from_intervals([busy("06:00", "07:30"), busy("22:45", "23:59")], DAY)
+    assert len(bitmap.to_hex()) == 24
+    assert DayBitmap.from_hex(bitmap.to_hex()) == bitmap
+    assert len(bitmap.to_bytes()) == 12
+    assert DayBitmap.from_bytes(bitmap.to_bytes()) == bitmap
+    assert DayBitmap.from_hex(None) == DayBitmap()
+
+
+def test_horarios_del_scraper_con_duracion():
+    # Cada horario libre del scraper cubre una hora desde su inicio
+    assert DayBitmap.from_start_times(["18:00", "18:30"], 60) == DayBitmap.from_intervals([busy("18:00", "19:30")], DAY)
+
+    courts = DaySlots("2030-01-15", [
+        {"name": "Cancha 1", "time": "18:00"},
+        {"name": "Cancha 1", "time": "18:30"},
+        {"name": "Cancha 2", "time": "18:00"},
+    ])
+    bitmaps = court_bitmaps(courts)
+    assert bitmaps["Cancha 1"].is_free(18 * 60, 90)
+    assert not bitmaps["Cancha 2"].is_free(18 * 60, 90)
+    assert bitmaps["Cancha 2"].is_free(18 * 60, 60)
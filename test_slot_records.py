@@ -0,0 +1,58 @@
+"""
+Pruebas de los registros compactos de horarios (DaySlots)
+"""
+import json
+
+from slot_records import DaySlots, Slot
+
+DATE = "2030-01-15"
+
+
+def make_day():
+    return DaySlots(DATE, [
+        {"name": "Cancha 2", "time": "18:00", "price": "20 EUR"},
+        Slot("Cancha 1", "18:00", DATE, "20 EUR"),
+        {"name": "Cancha 1", "time": "09:30", "price": 15},
+        {"name": "Cancha 1", "time": "18:00", "price": "99 EUR"},  # repetido: queda el primero
+        {"name": "Cancha 3", "time": "25:00"},  # hora inválida
+        {"name": None, "time": "10:00"},  # sin nombre
+    ])
+
+
+def test_ordena_descarta_invalidos_y_repetidos():
+    day = make_day()
+    assert list(day) == [
+        Slot("Cancha 1", "09:30", DATE, "15"),
+        Slot("Cancha 1", "18:00", DATE, "20 EUR"),
+        Slot("Cancha 2", "18:00", DATE, "20 EUR"),
+    ]
+    assert len(day) == 3
+    assert day[1].price == "20 EUR"
+
+
+def test_at_filter_y_by_time():
+    day = make_day()
+    assert [slot.name for slot in day.at("18:00")] == ["Cancha 1", "Cancha 2"]
+    assert len(day.at("07:00")) == 0
+    assert len(day.at("no-es-hora")) == 0
+    assert list(day.filter(lambda slot: slot.name == "Cancha 2")) == [Slot("Cancha 2", "18:00", DATE, "20 EUR")]
+    assert day.filter(lambda slot: True) is day
+    assert day.by_time() == {"09:30": ["Cancha 1"], "18:00": ["Cancha 1", "Cancha 2"]}
+
+
+def test_contexto_ida_y_vuelta():
+    day = make_day().at("18:00")
+    data = json.loads(json.dumps(day.to_context()))
+    # Solo viajan las canchas y precios que se usan
+    assert data["courts"] == ["Cancha 1", "Cancha 2"]
+    assert data["prices"] == ["20 EUR"]
+    restored = DaySlots.from_context(data)
+    assert restored.date == DATE
+    assert list(restored) == list(day)
+
+
+def test_contexto_anterior_como_lista_de_dicts():
+    legacy = [{"name": "Cancha 1", "time": "20:00", "price": "18 EUR"}]
+    restored = DaySlots.from_context(legacy, DATE)
+    assert list(restored) == [Slot("Cancha 1", "20:00", DATE, "18 EUR")]
+    assert len(DaySlots.from_context(None, DATE)) == 0
@@ -0,0 +1,37 @@
+"""
+Utilidades compartidas por las pruebas
+Arrancan el Google Calendar falso (fake_calendar_server.py) junto con un cliente que
+apunta a él, sin tocar GOOGLE_CALENDAR_API_ENDPOINT
+"""
+from typing import Any, NamedTuple
+
+from fake_calendar_server import FakeCalendarConfig, start_fake_calendar_server
+from google_calendar_client import GoogleCalendarClient
+
+
+class FakeCalendar(NamedTuple):
+    """Servidor falso en marcha y cliente autenticado contra él"""
+    config: FakeCalendarConfig
+    server: Any
+    endpoint: str
+    client: GoogleCalendarClient
+
+
+def start_fake_calendar() -> FakeCalendar:
+    """
+    Iniciar el servidor falso y un cliente de Google Calendar que lo usa
+
+    Returns:
+        FakeCalendar - detener con stop_fake_calendar()
+    """
+    config = FakeCalendarConfig()
+    server, endpoint = start_fake_calendar_server(config=config)
+    client = GoogleCalendarClient(api_endpoint=endpoint)
+    client.authenticate()
+    return FakeCalendar(config, server, endpoint, client)
+
+
+def stop_fake_calendar(fake: FakeCalendar):
+    """Detener el servidor falso y el executor del cliente"""
+    fake.client.executor.shutdown(wait=False)
+    fake.server.shutdown()
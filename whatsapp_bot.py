@@ -9,6 +9,7 @@ import json
 import logging
 from database import SessionLocal, User, Reservation, ConversationState
 from playtomic_automation import get_playtomic_instance
+from slot_records import DaySlots
 from config import TIMEZONE, WHATSAPP_SESSION_PATH
 import pytz
 # Intentar importar whatsapp-web.py, si no está disponible usar Selenium
@@ -155,13 +156,13 @@ class PadelReservationBot:
                 
                 if available_courts:
                     # Guardar canchas disponibles en contexto
-                    context["available_courts"] = available_courts
+                    context["available_courts"] = available_courts.to_context()
                     conv_state.context = json.dumps(context)
                     
                     # Mostrar opciones
                     message = "✅ Canchas disponibles:\n\n"
                     for i, court in enumerate(available_courts, 1):
-                        message += f"{i}. {court['name']} - {court['time']}\n"
+                        message += f"{i}. {court.name} - {court.time}\n"
                     message += "\n¿Cuál quieres? Responde con el número."
                     
                     await self.send_message(user.phone_number, message)
@@ -197,11 +198,10 @@ class PadelReservationBot:
             try:
                 court_index = int(text) - 1
                 context = json.loads(conv_state.context or "{}")
-                available_courts = context.get("available_courts", [])
+                available_courts = DaySlots.from_context(context.get("available_courts", []), context.get("date"))
                 
                 if 0 <= court_index < len(available_courts):
-                    selected_court = available_courts[court_index]
-                    context["selected_court"] = selected_court
+                    context["selected_court"] = available_courts[court_index]._asdict()
                     conv_state.context = json.dumps(context)
                     conv_state.state = "waiting_confirmation"
                     self.db.commit()
@@ -4,14 +4,31 @@ Implementación usando Twilio WhatsApp API
 """
 import asyncio
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 import json
 import logging
-import os
 from database import SessionLocal, User, Reservation, ConversationState
-from google_calendar_client import get_google_calendar_instance
+from google_calendar_client import (
+    get_async_google_calendar_instance,
+    reservation_event_id,
+    CalendarError,
+    CalendarRateLimitError
+)
+from reservation_ledger import (
+    book_reservation,
+    release_reservation,
+    resize_reservation,
+    busy_slots,
+    slot_starts,
+    SlotUnavailableError
+)
+from slot_holds import start_slot_hold_manager
+from availability_cache import get_availability_cache
+from availability_store import get_slots, is_valid_court
+from slot_records import DaySlots, Slot
+from calendar_sync import get_calendar_sync_worker, sync_reservation_by_id
 from ai_chatbot import PadelReservationChatbot
-from config import TIMEZONE
+from config import TIMEZONE, CALENDAR_WRITE_BEHIND, SLOT_HOLD_TTL_SECONDS
 import pytz
 from twilio.rest import Client
 from twilio.twiml.messaging_response import MessagingResponse
@@ -38,40 +55,14 @@ if hasattr(sys.stdout, 'reconfigure'):
 
 logger = logging.getLogger(__name__)
 
-# Archivo de cache de disponibilidad
-AVAILABILITY_CACHE_FILE = 'availability_cache.json'
-MAX_CACHE_AGE_HOURS = 24  # Cache válido por 24 horas (aumentado para pruebas)
 
-
-def load_availability_cache():
-    """
-    Cargar disponibilidad desde cache JSON
-    
-    Returns:
-        Diccionario con disponibilidad si el cache es válido, None si no
-    """
-    try:
-        if not os.path.exists(AVAILABILITY_CACHE_FILE):
-            logger.debug(f"Cache file {AVAILABILITY_CACHE_FILE} no existe")
-            return None
-        
-        with open(AVAILABILITY_CACHE_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Verificar que el cache no sea muy viejo
-        cache_time = datetime.fromisoformat(data['timestamp'])
-        age_hours = (datetime.now() - cache_time).total_seconds() / 3600
-        
-        if age_hours > MAX_CACHE_AGE_HOURS:
-            logger.info(f"⚠️  Cache expirado (edad: {age_hours:.1f} horas)")
-            return None
-        
-        logger.info(f"✅ Cache válido (edad: {age_hours:.1f} horas)")
-        return data.get('availability', {})
-        
-    except Exception as e:
-        logger.warning(f"⚠️  Error cargando cache: {e}")
-        return None
+def calendar_error_message(error: CalendarError) -> str:
+    """Mensaje para el usuario cuando Google Calendar está saturado o no responde"""
+    if isinstance(error, CalendarRateLimitError):
+        return ("⏳ El calendario está recibiendo demasiadas consultas en este momento.\n"
+                "Por favor intenta de nuevo en unos minutos.")
+    return ("⚠️ No pudimos conectar con el calendario en este momento.\n"
+            "Por favor intenta de nuevo en unos minutos.")
 
 
 class PadelReservationBotTwilio:
@@ -84,6 +75,7 @@ class PadelReservationBotTwilio:
         self.twilio_whatsapp_number = None
         self.app = Flask(__name__)
         self.chatbot = PadelReservationChatbot()  # Inicializar chatbot AI
+        self.slot_holds = start_slot_hold_manager()  # Retenciones mientras el usuario confirma
         self._setup_flask_routes()
         
     def _setup_flask_routes(self):
@@ -257,6 +249,24 @@ class PadelReservationBotTwilio:
                 logger.error(f"Error en status callback: {e}")
                 return '', 200
         
+        @self.app.route('/calendar/notifications', methods=['POST'])
+        def calendar_notifications():
+            """Endpoint para notificaciones push de Google Calendar (mirror local)"""
+            from calendar_mirror import get_calendar_mirror
+            
+            mirror = get_calendar_mirror()
+            if not mirror:
+                return '', 404
+            
+            channel_id = request.headers.get('X-Goog-Channel-ID', '')
+            resource_state = request.headers.get('X-Goog-Resource-State', '')
+            token = request.headers.get('X-Goog-Channel-Token')
+            logger.info(f"📆 Notificación de calendario - Canal: {channel_id}, Estado: {resource_state}")
+            
+            mirror.handle_notification(channel_id, resource_state, token)
+            # Google solo necesita un 2xx; cualquier otro código provoca reintentos
+            return '', 200
+        
         @self.app.route('/health', methods=['GET'])
         def health():
             """Endpoint de salud"""
@@ -283,6 +293,7 @@ class PadelReservationBotTwilio:
                 print("  - POST /webhook (para recibir mensajes de Twilio)")
                 print("  - POST / (alternativa)")
                 print("  - POST /status (para status callbacks)")
+                print("  - POST /calendar/notifications (notificaciones de Google Calendar)")
                 print("  - GET /health (para verificar que está funcionando)")
                 print("=" * 80)
                 logger.info("=" * 80)
@@ -428,6 +439,7 @@ class PadelReservationBotTwilio:
                     # Si tiene fecha y hora, consultar disponibilidad real en Google Calendar
                     fecha = reservation_info.get("fecha")
                     hora = reservation_info.get("hora")
+                    duracion = reservation_info.get("duracion") or 60
                     
                     if fecha and hora:
                         # Consultar disponibilidad real
@@ -435,11 +447,11 @@ class PadelReservationBotTwilio:
                             from datetime import datetime as dt
                             fecha_obj = dt.strptime(fecha, "%Y-%m-%d")
                             
-                            google_calendar = await get_google_calendar_instance()
-                            disponibilidad = google_calendar.check_time_availability(
+                            google_calendar = await get_async_google_calendar_instance()
+                            disponibilidad = await google_calendar.check_time_availability(
                                 date=fecha_obj,
                                 time_slot=hora,
-                                duration_minutes=60
+                                duration_minutes=duracion
                             )
                             
                             if disponibilidad.get("disponible"):
@@ -455,10 +467,31 @@ class PadelReservationBotTwilio:
                                     mensaje += "*Canchas ocupadas:*\n"
                                     for item in ocupadas:
                                         mensaje += f"• {item['cancha']}: {item['razon']}\n"
-                                mensaje += "\n💡 *¿Quieres consultar otro horario?*"
+                                
+                                # Sugerir directamente los horarios libres más cercanos
+                                alternativas = await google_calendar.suggest_alternatives(
+                                    date=fecha_obj,
+                                    time_slot=hora,
+                                    duration_minutes=duracion,
+                                    court_name=reservation_info.get("cancha"),
+                                    k=3
+                                )
+                                if alternativas:
+                                    mensaje += f"\n✅ *Horarios libres más cercanos ({duracion} min):*\n"
+                                    for alternativa in alternativas:
+                                        mensaje += f"🏓 *{alternativa['cancha']}* a las {alternativa['hora']}\n"
+                                    primera = alternativas[0]
+                                    mensaje += f"\n💡 *¿Reservamos alguno?* Por ejemplo: \"Reservar {primera['cancha']} el {fecha_obj.strftime('%d/%m/%Y')} a las {primera['hora']}\""
+                                else:
+                                    mensaje += "\n💡 *¿Quieres consultar otro horario?*"
                             
                             await self.send_message(user.phone_number, mensaje)
                             return
+                        except CalendarError as e:
+                            # No responder "no hay canchas" si en realidad no pudimos consultar
+                            logger.error(f"Google Calendar no disponible consultando disponibilidad: {e}")
+                            await self.send_message(user.phone_number, calendar_error_message(e))
+                            return
                         except Exception as e:
                             logger.error(f"Error consultando disponibilidad: {e}")
                             # Fallback a respuesta estándar
@@ -487,19 +520,23 @@ class PadelReservationBotTwilio:
                     ).order_by(Reservation.date.desc()).first()
                     
                     if reserva and reserva.google_calendar_event_id:
+                        duracion_anterior = reserva.duration_minutes or 60
                         try:
-                            google_calendar = await get_google_calendar_instance()
-                            resultado = google_calendar.update_event_duration(
-                                event_id=reserva.google_calendar_event_id,
-                                new_duration_minutes=nueva_duracion,
-                                court_name=reserva.court_name
-                            )
+                            # Tomar (o liberar) los bloques en el registro local antes de tocar el calendario
+                            resize_reservation(self.db, reserva, nueva_duracion)
+                            
+                            google_calendar = await get_async_google_calendar_instance()
+                            try:
+                                resultado = await google_calendar.update_event_duration(
+                                    event_id=reserva.google_calendar_event_id,
+                                    new_duration_minutes=nueva_duracion,
+                                    court_name=reserva.court_name
+                                )
+                            except CalendarError:
+                                resize_reservation(self.db, reserva, duracion_anterior)
+                                raise
                             
                             if resultado:
-                                # Actualizar en BD
-                                reserva.duration_minutes = nueva_duracion
-                                self.db.commit()
-                                
                                 await self.send_message(
                                     user.phone_number,
                                     f"✅ *Duración actualizada*\n\n"
@@ -507,10 +544,20 @@ class PadelReservationBotTwilio:
                                     f"📆 Evento actualizado en Google Calendar"
                                 )
                             else:
+                                resize_reservation(self.db, reserva, duracion_anterior)
                                 await self.send_message(
                                     user.phone_number,
                                     "❌ No se pudo actualizar la duración. Por favor intenta más tarde."
                                 )
+                        except SlotUnavailableError as e:
+                            logger.info(f"No se puede extender la reserva {reserva.id}: {e}")
+                            await self.send_message(
+                                user.phone_number,
+                                f"❌ La cancha no está libre {nueva_duracion} minutos desde las {reserva.date.strftime('%H:%M')}."
+                            )
+                        except CalendarError as e:
+                            logger.error(f"Google Calendar no disponible actualizando duración: {e}")
+                            await self.send_message(user.phone_number, calendar_error_message(e))
                         except Exception as e:
                             logger.error(f"Error actualizando duración: {e}")
                             await self.send_message(
@@ -599,76 +646,64 @@ class PadelReservationBotTwilio:
                 print("BUSCANDO CANCHAS DISPONIBLES")
                 print("=" * 80)
                 
-                # Intentar cargar del cache JSON primero
-                available_courts = []
-                cache = load_availability_cache()
-                
-                print(f"🔍 DEBUG: date_str buscado: '{date_str}'")
-                print(f"🔍 DEBUG: cache cargado: {cache is not None}")
-                if cache:
-                    print(f"🔍 DEBUG: keys en cache: {list(cache.keys())}")
-                    print(f"🔍 DEBUG: ¿Existe {date_str} en cache? {date_str in cache}")
-                logger.info(f"🔍 DEBUG: date_str buscado: '{date_str}'")
-                logger.info(f"🔍 DEBUG: cache cargado: {cache is not None}")
-                if cache:
-                    logger.info(f"🔍 DEBUG: keys en cache: {list(cache.keys())}")
-                    logger.info(f"🔍 DEBUG: ¿Existe {date_str} en cache? {date_str in cache}")
+                # Disponibilidad en vivo: una sola consulta a Google Calendar para todo el día
+                available_courts = DaySlots(date_str)
+                free_slots = {}
+                availability_source = "calendar"
+                try:
+                    google_calendar = await get_async_google_calendar_instance()
+                    free_slots = await google_calendar.get_free_slots(
+                        date, duration_minutes=self.selected_duration(context)
+                    )
+                except CalendarError as e:
+                    logger.warning(f"⚠️  Google Calendar no disponible, se usa el cache del scraper: {e}")
+                except Exception as e:
+                    logger.error(f"Error consultando horarios libres en Google Calendar: {e}")
                 
-                if cache and date_str in cache:
-                    print("✅ Usando cache de disponibilidad para esta fecha")
-                    logger.info(f"✅ Usando cache de disponibilidad para {date_str}")
-                    cache_data = cache[date_str]
-                    
-                    # Validar y filtrar datos del cache
-                    if isinstance(cache_data, list):
-                        # Filtrar entradas inválidas (como "Playtomic Logo")
-                        available_courts = [
-                            court for court in cache_data 
-                            if isinstance(court, dict) and 
-                            court.get('name') and 
-                            court.get('name') not in ['Playtomic Logo', 'Logo', ''] and
-                            len(court.get('name', '')) > 3
-                        ]
-                        print(f"Canchas encontradas en cache: {len(cache_data)} (válidas: {len(available_courts)})")
-                        logger.info(f"Canchas en cache: {len(cache_data)} totales, {len(available_courts)} válidas")
-                    else:
-                        logger.warning(f"⚠️  Formato de cache inválido para {date_str}: {type(cache_data)}")
-                        available_courts = []
+                if free_slots:
+                    print("✅ Usando disponibilidad en vivo de Google Calendar")
+                    logger.info(f"✅ Disponibilidad en vivo para {date_str}")
+                    available_courts = DaySlots(date_str, (
+                        Slot(court_name, time_slot, date_str)
+                        for court_name, times in free_slots.items()
+                        for time_slot in times
+                    ))
                 else:
-                    print("⚠️  Fecha no encontrada en cache. Solo usamos cache para pruebas.")
-                    logger.info(f"⚠️  Fecha {date_str} no encontrada en cache. Usando solo cache.")
+                    # Respaldo: cache del scraper (en memoria, ya filtrado)
+                    cached_courts = get_availability_cache().get_courts(date_str, self.selected_duration(context))
+                    if cached_courts is not None:
+                        print("✅ Usando cache de disponibilidad para esta fecha")
+                        logger.info(f"✅ Usando cache de disponibilidad para {date_str} ({len(cached_courts)} canchas)")
+                        available_courts = cached_courts
+                        availability_source = "scraper"
+                    else:
+                        print("⚠️  Fecha no encontrada en cache. Solo usamos cache para pruebas.")
+                        logger.info(f"⚠️  Fecha {date_str} no encontrada en cache. Usando solo cache.")
                     
-                    # NO hacer scraping, solo usar cache
-                    await self.send_message(
-                        user.phone_number,
-                        f"❌ *No hay disponibilidad en cache para esta fecha*\n\n"
-                        f"📅 Fecha: {date.strftime('%d/%m/%Y')}\n\n"
-                        f"💡 Por favor ejecuta el scraper primero o intenta con otra fecha que esté en el cache.\n"
-                        f"Responde con *'reservar'* para intentar con otra fecha."
-                    )
-                    conv_state.state = "idle"
-                    self.db.commit()
-                    return
+                        # NO hacer scraping, solo usar cache
+                        await self.send_message(
+                            user.phone_number,
+                            f"❌ *No hay disponibilidad en cache para esta fecha*\n\n"
+                            f"📅 Fecha: {date.strftime('%d/%m/%Y')}\n\n"
+                            f"💡 Por favor ejecuta el scraper primero o intenta con otra fecha que esté en el cache.\n"
+                            f"Responde con *'reservar'* para intentar con otra fecha."
+                        )
+                        conv_state.state = "idle"
+                        self.db.commit()
+                        return
                 
                 # Procesar canchas encontradas (ya sea del cache o de búsqueda nueva)
                 if available_courts:
                     print("PASO 3: Procesando canchas encontradas...")
                     logger.info("PASO 3: Procesando canchas encontradas...")
                     
-                    # Validar formato de canchas
-                    valid_courts = []
-                    for court in available_courts:
-                        if isinstance(court, dict) and court.get('name'):
-                            # Filtrar nombres inválidos
-                            court_name = court.get('name', '').strip()
-                            if court_name and court_name not in ['Playtomic Logo', 'Logo', ''] and len(court_name) > 3:
-                                valid_courts.append(court)
-                            else:
-                                logger.debug(f"Filtrando cancha inválida: {court_name}")
-                        else:
-                            logger.warning(f"Cancha con formato inválido: {court}")
+                    # Validar formato de canchas (las del cache ya vienen filtradas)
+                    valid_courts = available_courts.filter(is_valid_court)
                     
-                    available_courts = valid_courts
+                    # Quitar horarios ya reservados o retenidos por otro usuario en el registro local
+                    available_courts = self.exclude_taken_slots(
+                        user, date, valid_courts, self.selected_duration(context)
+                    )
                     logger.info(f"Canchas válidas después de filtrar: {len(available_courts)}")
                     
                     if not available_courts:
@@ -682,20 +717,15 @@ class PadelReservationBotTwilio:
                         self.db.commit()
                         return
                     
-                    # Agrupar canchas por horario
-                    courts_by_time = {}
-                    for court in available_courts:
-                        time = court.get('time', 'Sin horario')
-                        if time not in courts_by_time:
-                            courts_by_time[time] = []
-                        courts_by_time[time].append(court.get('name', 'Cancha'))
+                    # Agrupar canchas por horario (ya vienen ordenadas por hora)
+                    courts_by_time = available_courts.by_time()
                     
                     print(f"Canchas agrupadas por horario: {len(courts_by_time)} horarios diferentes")
                     logger.info(f"Canchas agrupadas por horario: {len(courts_by_time)} horarios diferentes")
                     
-                    # Guardar canchas disponibles en contexto
-                    context["available_courts"] = available_courts
-                    context["courts_by_time"] = courts_by_time
+                    # Guardar canchas disponibles en contexto (forma compacta)
+                    context["available_courts"] = available_courts.to_context()
+                    context["availability_source"] = availability_source
                     conv_state.context = json.dumps(context)
                     self.db.commit()
                     print("✅ Contexto guardado en base de datos")
@@ -710,26 +740,13 @@ class PadelReservationBotTwilio:
                     message += f"📊 Total de opciones disponibles: {total_courts}\n\n"
                     
                     # Mostrar horarios ordenados
-                    sorted_times = sorted([t for t in courts_by_time.keys() if t != 'Disponible' and ':' in str(t)])
+                    sorted_times = list(courts_by_time)
                     
                     print(f"Horarios ordenados: {len(sorted_times)} horarios")
                     
-                    if sorted_times:
-                        message += "⏰ *Horarios disponibles:*\n"
-                        message += "─" * 30 + "\n"
-                        for time in sorted_times[:20]:  # Mostrar máximo 20 horarios
-                            courts = courts_by_time[time]
-                            message += f"\n🕐 *{time}* ({len(courts)} cancha{'s' if len(courts) > 1 else ''}):\n"
-                            for court_name in courts[:5]:  # Máximo 5 canchas por horario
-                                message += f"   • {court_name}\n"
-                            if len(courts) > 5:
-                                message += f"   ... y {len(courts) - 5} más\n"
-                    else:
-                        # Si no hay horarios específicos, mostrar todas las canchas
-                        message += "📋 *Canchas disponibles:*\n"
-                        message += "─" * 30 + "\n"
-                        for i, court in enumerate(available_courts[:20], 1):
-                            message += f"{i}. {court.get('name', 'Cancha')} - {court.get('time', 'Disponible')}\n"
+                    message += "⏰ *Horarios disponibles:*\n"
+                    message += "─" * 30 + "\n"
+                    message += self.format_times_by_period(courts_by_time)
                     
                     message += "\n" + "─" * 30 + "\n"
                     message += "💡 *Responde con el horario que prefieres*\n"
@@ -769,20 +786,27 @@ class PadelReservationBotTwilio:
                 print(f"Horario seleccionado: {time_slot}")
                 context = json.loads(conv_state.context or "{}")
                 context["time"] = time_slot
-                courts_by_time = context.get("courts_by_time", {})
                 
                 # Filtrar canchas para ese horario específico
-                available_courts = []
-                if time_slot in courts_by_time:
-                    for court_name in courts_by_time[time_slot]:
-                        available_courts.append({
-                            'name': court_name,
-                            'time': time_slot,
-                            'date': context.get("date")
-                        })
+                if context.get("availability_source") == "scraper":
+                    # Lo último que guardó el scraper, filtrado por la duración elegida;
+                    # sin cache se usa la consulta indexada por fecha y hora
+                    date = datetime.fromisoformat(context.get("date"))
+                    date_str = date.strftime('%Y-%m-%d')
+                    duration = self.selected_duration(context)
+                    cached_courts = get_availability_cache().get_courts(date_str, duration)
+                    if cached_courts is not None:
+                        courts = cached_courts.at(time_slot)
+                    else:
+                        courts = get_slots(self.db, date_str, time_slot)
+                    available_courts = self.exclude_taken_slots(user, date, courts, duration)
+                else:
+                    available_courts = DaySlots.from_context(
+                        context.get("available_courts", []), context.get("date")
+                    ).at(time_slot)
                 
                 if available_courts:
-                    context["available_courts"] = available_courts
+                    context["available_courts"] = available_courts.to_context()
                     context["time"] = time_slot
                     conv_state.context = json.dumps(context)
                     
@@ -792,7 +816,7 @@ class PadelReservationBotTwilio:
                     message += "─" * 30 + "\n"
                     message += "🏓 *Canchas disponibles:*\n\n"
                     for i, court in enumerate(available_courts, 1):
-                        message += f"{i}. {court['name']}\n"
+                        message += f"{i}. {court.name}\n"
                     message += "\n" + "─" * 30 + "\n"
                     message += "💡 *¿Cuál quieres? Responde con el número.*"
                     
@@ -811,11 +835,12 @@ class PadelReservationBotTwilio:
                 try:
                     court_index = int(text) - 1
                     context = json.loads(conv_state.context or "{}")
-                    available_courts = context.get("available_courts", [])
+                    available_courts = DaySlots.from_context(context.get("available_courts", []), context.get("date"))
                     
                     if 0 <= court_index < len(available_courts):
-                        selected_court = available_courts[court_index]
-                        context["selected_court"] = selected_court
+                        context["selected_court"] = available_courts[court_index]._asdict()
+                        if not await self.hold_selected_court(user, context):
+                            return
                         conv_state.context = json.dumps(context)
                         conv_state.state = "waiting_confirmation"
                         self.db.commit()
@@ -849,11 +874,12 @@ class PadelReservationBotTwilio:
             try:
                 court_index = int(text) - 1
                 context = json.loads(conv_state.context or "{}")
-                available_courts = context.get("available_courts", [])
+                available_courts = DaySlots.from_context(context.get("available_courts", []), context.get("date"))
                 
                 if 0 <= court_index < len(available_courts):
-                    selected_court = available_courts[court_index]
-                    context["selected_court"] = selected_court
+                    context["selected_court"] = available_courts[court_index]._asdict()
+                    if not await self.hold_selected_court(user, context):
+                        return
                     conv_state.context = json.dumps(context)
                     conv_state.state = "waiting_confirmation"
                     self.db.commit()
@@ -874,10 +900,12 @@ class PadelReservationBotTwilio:
             if text in ["si", "sí", "confirmar", "confirmo", "ok"]:
                 context = json.loads(conv_state.context or "{}")
                 await self.confirm_reservation(user, context)
+                self.slot_holds.release(self.db, user.phone_number)
                 conv_state.state = "idle"
                 conv_state.context = None
                 self.db.commit()
             elif text in ["no", "cancelar", "cancel"]:
+                self.slot_holds.release(self.db, user.phone_number)
                 await self.send_message(
                     user.phone_number,
                     "❌ Reserva cancelada. ¿Quieres intentar con otra fecha? (responde 'reservar')"
@@ -922,11 +950,209 @@ Puedo ayudarte a:
 🏓 Cancha: {court_name}
 📅 Fecha: {date.strftime('%d/%m/%Y')}
 ⏰ Hora: {time}
+⏱️ Duración: {self.selected_duration(context)} minutos
 
+⏳ Te guardamos la cancha {self.format_hold_time()}.
 ¿Confirmas esta reserva? Responde 'sí' para confirmar o 'no' para cancelar."""
         
         await self.send_message(user.phone_number, message)
     
+    def format_times_by_period(self, courts_by_time: Dict[str, List[str]]) -> str:
+        """
+        Listar todos los horarios agrupados por franja del día (mañana, tarde y noche)
+        
+        Cada horario va en una línea con la cantidad de canchas libres; las canchas
+        se muestran cuando el usuario elige el horario. Así entran todos los horarios
+        del día en un solo mensaje de WhatsApp.
+        """
+        periods = [("🌅 *Mañana*", "00:00"), ("☀️ *Tarde*", "13:00"), ("🌙 *Noche*", "19:00")]
+        text = ""
+        for index, (title, start) in enumerate(periods):
+            end = periods[index + 1][1] if index + 1 < len(periods) else "24:00"
+            times = [time for time in courts_by_time if start <= time < end]
+            if not times:
+                continue
+            text += f"\n{title}\n"
+            for time in times:
+                count = len(courts_by_time[time])
+                text += f"🕐 *{time}* · {count} cancha{'s' if count > 1 else ''}\n"
+        return text
+    
+    def selected_duration(self, context: Dict) -> int:
+        """Duración en minutos que pidió el usuario (60 si no indicó otra)"""
+        try:
+            return int(context.get("duracion") or 60)
+        except (TypeError, ValueError):
+            return 60
+    
+    def format_hold_time(self) -> str:
+        """Tiempo de retención para mostrar al usuario (en segundos si es menos de un minuto)"""
+        if SLOT_HOLD_TTL_SECONDS < 60:
+            return f"{SLOT_HOLD_TTL_SECONDS} segundos"
+        minutes = -(-SLOT_HOLD_TTL_SECONDS // 60)
+        return f"{minutes} minuto{'s' if minutes > 1 else ''}"
+    
+    def exclude_taken_slots(self, user: User, date: datetime, courts: DaySlots,
+                            duration_minutes: int = 60) -> DaySlots:
+        """Quitar las opciones cuya duración se solapa con reservas o retenciones de otros usuarios"""
+        busy = busy_slots(self.db, date, exclude_holder=user.phone_number)
+        if not busy:
+            return courts
+        
+        def is_free(court: Slot) -> bool:
+            taken = busy.get(court.name)
+            if not taken:
+                return True
+            start = datetime.combine(date.date(), datetime.strptime(court.time, "%H:%M").time())
+            return not taken.intersection(slot_starts(start, duration_minutes))
+        
+        free_courts = courts.filter(is_free)
+        
+        if len(free_courts) < len(courts):
+            logger.info(f"⏳ {len(courts) - len(free_courts)} opciones ocultas por reservas o retenciones")
+        return free_courts
+    
+    async def hold_selected_court(self, user: User, context: Dict) -> bool:
+        """
+        Retener la cancha elegida mientras el usuario confirma
+        
+        Returns:
+            bool: False si otro usuario la tomó (ya se le avisó al usuario)
+        """
+        selected_court = context.get("selected_court", {})
+        try:
+            date = datetime.fromisoformat(context.get("date"))
+            time_slot = context.get("time") or selected_court.get("time")
+            start = datetime.combine(date.date(), datetime.strptime(time_slot, "%H:%M").time())
+        except (TypeError, ValueError):
+            # Sin horario concreto no hay nada que retener
+            return True
+        
+        try:
+            self.slot_holds.hold(
+                self.db, user.phone_number, selected_court.get("name"), start,
+                duration_minutes=self.selected_duration(context)
+            )
+        except SlotUnavailableError as e:
+            logger.info(f"Cancha no disponible para retener: {e}")
+            await self.send_message(
+                user.phone_number,
+                "❌ Esa cancha acaba de ser apartada por otra persona. Por favor elige otra de la lista."
+            )
+            return False
+        except Exception as e:
+            # La retención es una optimización: si falla se sigue sin ella
+            self.db.rollback()
+            logger.error(f"Error reteniendo cancha: {e}")
+        return True
+    
+    async def create_reservation(
+        self,
+        user: User,
+        court_name: str,
+        date_time: datetime,
+        duration_minutes: int = 60,
+        name: Optional[str] = None
+    ) -> Optional[Reservation]:
+        """
+        Registrar la reserva y crear su evento en Google Calendar de forma idempotente
+        
+        La reserva se guarda primero en el registro local, que garantiza una sola
+        reserva activa por cancha y horario. La clave de la reserva (cancha + hora +
+        teléfono) es también el ID del evento, así que confirmar dos veces no duplica
+        nada. Con CALENDAR_WRITE_BEHIND la reserva queda confirmada al guardarse y el
+        evento se crea en segundo plano (calendar_sync.py); si no, se crea aquí y si
+        falla se libera el horario. Si Google Calendar falla a mitad de la creación, el
+        evento se borra por su ID antes de liberar el horario; si tampoco se puede
+        borrar, la reserva queda pendiente para el sincronizador o la conciliación.
+        
+        Returns:
+            Reserva confirmada (nueva o existente), None si no se pudo crear el evento
+        
+        Raises:
+            SlotUnavailableError: La cancha ya está reservada a esa hora
+            CalendarError: Google Calendar saturado o caído (solo sin write-behind)
+        """
+        idempotency_key = reservation_event_id(court_name, date_time, user.phone_number)
+        reservation, created = book_reservation(
+            self.db, user, court_name, date_time, duration_minutes, idempotency_key, name
+        )
+        if not created:
+            return reservation
+        
+        sync_worker = get_calendar_sync_worker()
+        if CALENDAR_WRITE_BEHIND and sync_worker:
+            sync_worker.notify()
+            return reservation
+        
+        google_calendar = await get_async_google_calendar_instance()
+        loop = asyncio.get_running_loop()
+        try:
+            # El thread del executor usa su propia sesión; luego se releen los cambios
+            synced = await loop.run_in_executor(
+                google_calendar.client.executor,
+                sync_reservation_by_id, google_calendar.client, reservation.id
+            )
+            self.db.refresh(reservation)
+        except CalendarError:
+            # El evento pudo llegar a Google antes del error: borrarlo por su ID para
+            # no dejarlo huérfano al liberar el horario
+            try:
+                await google_calendar.delete_event(idempotency_key, court_name)
+            except CalendarError as e:
+                # Sigue caída: la reserva queda pendiente y se termina de sincronizar
+                # después; reintentarla devuelve esta misma reserva
+                logger.warning(f"⚠️  Reserva {reservation.id} pendiente de sincronizar con Google Calendar: {e}")
+                if sync_worker:
+                    sync_worker.notify()
+                raise
+            release_reservation(self.db, reservation, "Google Calendar no disponible")
+            raise
+        
+        if not synced:
+            release_reservation(self.db, reservation, reservation.calendar_sync_error)
+            return None
+        return reservation
+    
+    def notify_calendar_sync_failed(self, reservation: Reservation):
+        """
+        Avisar al usuario que su reserva no se pudo registrar en Google Calendar
+        
+        Lo llama el sincronizador (calendar_sync.py) desde su propio thread.
+        """
+        if not reservation.user:
+            return
+        message = (
+            f"⚠️ Tu reserva de {reservation.court_name} el {reservation.date.strftime('%d/%m/%Y')} "
+            f"a las {reservation.date.strftime('%H:%M')} está confirmada, pero no pudimos "
+            "agregarla al calendario del club. Te contactaremos si hace falta algún ajuste."
+        )
+        try:
+            asyncio.run(self.send_message(reservation.user.phone_number, message))
+        except Exception as e:
+            logger.error(f"Error avisando fallo de sincronización de la reserva {reservation.id}: {e}")
+    
+    async def send_reservation_confirmed(self, user: User, reservation: Reservation, date: datetime, time_slot: str):
+        """Enviar el mensaje de reserva confirmada"""
+        if reservation.google_calendar_event_id:
+            calendar_line = "📆 Evento creado en Google Calendar"
+        else:
+            calendar_line = "📆 La reserva se agregará a Google Calendar en unos instantes"
+        
+        message = f"""✅ ¡Reserva confirmada!
+
+🏓 Cancha: {reservation.court_name}
+📅 Fecha: {date.strftime('%d/%m/%Y')}
+⏰ Hora: {time_slot}
+{calendar_line}
+
+¡Nos vemos!"""
+        
+        if reservation.google_calendar_link:
+            message += f"\n\n🔗 Ver en calendario: {reservation.google_calendar_link}"
+        
+        await self.send_message(user.phone_number, message)
+    
     async def process_ai_reservation(self, user: User, reservation_info: Dict):
         """Procesar reserva directamente desde información del chatbot AI"""
         try:
@@ -954,53 +1180,36 @@ Puedo ayudarte a:
                 )
                 return
             
-            # Realizar reserva en Google Calendar
-            await self.send_message(user.phone_number, "🔄 Confirmando reserva en Google Calendar...")
+            # Sin write-behind la confirmación espera a Google Calendar
+            if not CALENDAR_WRITE_BEHIND:
+                await self.send_message(user.phone_number, "🔄 Confirmando reserva en Google Calendar...")
             
-            google_calendar = await get_google_calendar_instance()
-            event_result = google_calendar.create_event(
+            reservation = await self.create_reservation(
+                user,
                 court_name=court_name,
-                date=date,
-                time_slot=hora,
+                date_time=date_time,
                 duration_minutes=duracion,
-                name=nombre if nombre else (user.name if user.name else None)
+                name=nombre if nombre else None
             )
             
-            if event_result and event_result.get('id'):
-                # Crear reserva en BD
-                reservation = Reservation(
-                    user_id=user.id,
-                    google_calendar_event_id=event_result.get('id'),
-                    google_calendar_link=event_result.get('htmlLink'),
-                    court_name=court_name,
-                    date=date_time,
-                    status="confirmed",
-                    confirmed=True,
-                    name=nombre if nombre else None
-                )
-                self.db.add(reservation)
-                self.db.commit()
-                
-                calendar_link = event_result.get('htmlLink', '')
-                message = f"""✅ ¡Reserva confirmada!
-
-🏓 Cancha: {court_name}
-📅 Fecha: {date.strftime('%d/%m/%Y')}
-⏰ Hora: {hora}
-📆 Evento creado en Google Calendar
-
-¡Nos vemos!"""
-                
-                if calendar_link:
-                    message += f"\n\n🔗 Ver en calendario: {calendar_link}"
-                
-                await self.send_message(user.phone_number, message)
+            if reservation:
+                await self.send_reservation_confirmed(user, reservation, date, hora)
             else:
                 await self.send_message(
                     user.phone_number,
                     "❌ No se pudo completar la reserva. Por favor intenta más tarde o contacta soporte."
                 )
                 
+        except SlotUnavailableError as e:
+            logger.info(f"Horario ocupado procesando reserva AI: {e}")
+            await self.send_message(
+                user.phone_number,
+                "❌ Ese horario acaba de ser reservado. Por favor elige otro horario o cancha."
+            )
+        except CalendarError as e:
+            # La reserva es idempotente: el usuario puede reintentar sin duplicarla
+            logger.error(f"Google Calendar no disponible procesando reserva AI: {e}")
+            await self.send_message(user.phone_number, calendar_error_message(e))
         except Exception as e:
             logger.error(f"Error procesando reserva AI: {e}")
             await self.send_message(
@@ -1029,52 +1238,35 @@ Puedo ayudarte a:
                 )
                 return
             
-            # Realizar reserva en Google Calendar
-            await self.send_message(user.phone_number, "🔄 Confirmando reserva en Google Calendar...")
+            # Sin write-behind la confirmación espera a Google Calendar
+            if not CALENDAR_WRITE_BEHIND:
+                await self.send_message(user.phone_number, "🔄 Confirmando reserva en Google Calendar...")
             
-            google_calendar = await get_google_calendar_instance()
-            event_result = google_calendar.create_event(
+            reservation = await self.create_reservation(
+                user,
                 court_name=court_name,
-                date=date,
-                time_slot=time,
-                duration_minutes=60,
-                name=user.name if user.name else None
+                date_time=date_time,
+                duration_minutes=self.selected_duration(context)
             )
             
-            if event_result and event_result.get('id'):
-                # Crear reserva en BD
-                reservation = Reservation(
-                    user_id=user.id,
-                    google_calendar_event_id=event_result.get('id'),
-                    google_calendar_link=event_result.get('htmlLink'),
-                    court_name=court_name,
-                    date=date_time,
-                    status="confirmed",
-                    confirmed=True
-                )
-                self.db.add(reservation)
-                self.db.commit()
-                
-                calendar_link = event_result.get('htmlLink', '')
-                message = f"""✅ ¡Reserva confirmada!
-
-🏓 Cancha: {court_name}
-📅 Fecha: {date.strftime('%d/%m/%Y')}
-⏰ Hora: {time}
-📆 Evento creado en Google Calendar
-
-¡Nos vemos!"""
-                
-                if calendar_link:
-                    message += f"\n\n🔗 Ver en calendario: {calendar_link}"
-                
-                await self.send_message(user.phone_number, message)
+            if reservation:
+                await self.send_reservation_confirmed(user, reservation, date, time)
             else:
                 await self.send_message(
                     user.phone_number,
                     "❌ No se pudo completar la reserva. Por favor intenta más tarde o contacta soporte."
                 )
                 
+        except SlotUnavailableError as e:
+            logger.info(f"Horario ocupado confirmando reserva: {e}")
+            await self.send_message(
+                user.phone_number,
+                "❌ Ese horario acaba de ser reservado. Por favor elige otro horario o cancha."
+            )
+        except CalendarError as e:
+            # La reserva es idempotente: el usuario puede reintentar sin duplicarla
+            logger.error(f"Google Calendar no disponible confirmando reserva: {e}")
+            await self.send_message(user.phone_number, calendar_error_message(e))
         except Exception as e:
             logger.error(f"Error confirmando reserva: {e}")
             await self.send_message(